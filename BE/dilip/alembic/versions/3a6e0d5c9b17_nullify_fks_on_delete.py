@@ -0,0 +1,38 @@
+"""set nullable foreign keys to NULL on delete
+
+Revision ID: 3a6e0d5c9b17
+Revises: f41c9b2d7a65
+Create Date: 2026-10-19 16:20:44.107392
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3a6e0d5c9b17'
+down_revision: Union[str, None] = 'f41c9b2d7a65'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (constraint, table, column, referred table)
+_FOREIGN_KEYS = (
+    ('service_requests_device_id_fkey', 'service_requests', 'device_id', 'devices'),
+    ('service_requests_assigned_to_fkey', 'service_requests', 'assigned_to', 'users'),
+    ('company_assets_assigned_to_fkey', 'company_assets', 'assigned_to', 'users'),
+    ('asset_requests_asset_id_fkey', 'asset_requests', 'asset_id', 'company_assets'),
+)
+
+
+def upgrade() -> None:
+    for name, table, column, referred in _FOREIGN_KEYS:
+        op.drop_constraint(name, table, type_='foreignkey')
+        op.create_foreign_key(name, table, referred, [column], ['id'], ondelete='SET NULL')
+
+
+def downgrade() -> None:
+    for name, table, column, referred in _FOREIGN_KEYS:
+        op.drop_constraint(name, table, type_='foreignkey')
+        op.create_foreign_key(name, table, referred, [column], ['id'])
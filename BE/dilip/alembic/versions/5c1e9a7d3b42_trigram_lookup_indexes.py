@@ -0,0 +1,31 @@
+"""trigram lookup indexes
+
+Revision ID: 5c1e9a7d3b42
+Revises: 273a0a79804f
+Create Date: 2026-10-19 09:12:04.118342
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c1e9a7d3b42'
+down_revision: Union[str, None] = '273a0a79804f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.create_index('ix_devices_serial_number_trgm', 'devices', ['serial_number'], unique=False, postgresql_using='gin', postgresql_ops={'serial_number': 'gin_trgm_ops'})
+    op.create_index('ix_devices_device_code_trgm', 'devices', ['device_code'], unique=False, postgresql_using='gin', postgresql_ops={'device_code': 'gin_trgm_ops'})
+    op.create_index('ix_company_assets_asset_tag_trgm', 'company_assets', ['asset_tag'], unique=False, postgresql_using='gin', postgresql_ops={'asset_tag': 'gin_trgm_ops'})
+
+
+def downgrade() -> None:
+    op.drop_index('ix_company_assets_asset_tag_trgm', table_name='company_assets')
+    op.drop_index('ix_devices_device_code_trgm', table_name='devices')
+    op.drop_index('ix_devices_serial_number_trgm', table_name='devices')
@@ -0,0 +1,49 @@
+"""background jobs
+
+Revision ID: 8c2f6a4e1d93
+Revises: 3a6e0d5c9b17
+Create Date: 2026-10-19 17:05:52.940118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8c2f6a4e1d93'
+down_revision: Union[str, None] = '3a6e0d5c9b17'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('jobs',
+    sa.Column('id', sa.BigInteger(), nullable=False),
+    sa.Column('queue', sa.Text(), server_default='default', nullable=False),
+    sa.Column('name', sa.Text(), nullable=False),
+    sa.Column('payload', sa.Text(), server_default='{}', nullable=False),
+    sa.Column('priority', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('status', sa.Text(), server_default='queued', nullable=False),
+    sa.Column('attempts', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('max_attempts', sa.Integer(), nullable=False),
+    sa.Column('run_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('locked_by', sa.Text(), nullable=True),
+    sa.Column('locked_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('last_error', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+    sa.CheckConstraint("status IN ('queued', 'running', 'succeeded', 'failed')", name='valid_job_status'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_jobs_id'), 'jobs', ['id'], unique=False)
+    op.create_index('ix_jobs_claimable', 'jobs', ['queue', 'priority', 'run_at'], unique=False, postgresql_where=sa.text("status = 'queued'"))
+    op.create_index('ix_jobs_queue_status', 'jobs', ['queue', 'status'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_jobs_queue_status', table_name='jobs')
+    op.drop_index('ix_jobs_claimable', table_name='jobs', postgresql_where=sa.text("status = 'queued'"))
+    op.drop_index(op.f('ix_jobs_id'), table_name='jobs')
+    op.drop_table('jobs')
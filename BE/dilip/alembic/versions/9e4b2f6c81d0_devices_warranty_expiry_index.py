@@ -0,0 +1,26 @@
+"""devices warranty expiry index
+
+Revision ID: 9e4b2f6c81d0
+Revises: 5c1e9a7d3b42
+Create Date: 2026-10-19 10:03:41.552019
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9e4b2f6c81d0'
+down_revision: Union[str, None] = '5c1e9a7d3b42'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_devices_warranty_expiry_client_id', 'devices', ['warranty_expiry', 'client_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_devices_warranty_expiry_client_id', table_name='devices')
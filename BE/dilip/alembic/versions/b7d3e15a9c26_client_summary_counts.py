@@ -0,0 +1,44 @@
+"""client summary counts
+
+Revision ID: b7d3e15a9c26
+Revises: 9e4b2f6c81d0
+Create Date: 2026-10-19 11:26:09.870512
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7d3e15a9c26'
+down_revision: Union[str, None] = '9e4b2f6c81d0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('client_summary_counts',
+    sa.Column('client_id', sa.BigInteger(), nullable=False),
+    sa.Column('metric', sa.Text(), nullable=False),
+    sa.Column('key', sa.Text(), nullable=False),
+    sa.Column('count', sa.BigInteger(), nullable=False),
+    sa.CheckConstraint("metric IN ('device_type', 'device_status', 'open_ticket_priority')", name='valid_summary_metric'),
+    sa.ForeignKeyConstraint(['client_id'], ['clients.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('client_id', 'metric', 'key')
+    )
+    # Backfill from existing rows; afterwards the services keep the counters current
+    op.execute("""
+        INSERT INTO client_summary_counts (client_id, metric, key, count)
+        SELECT client_id, 'device_type', device_type, count(*) FROM devices GROUP BY client_id, device_type
+        UNION ALL
+        SELECT client_id, 'device_status', status, count(*) FROM devices GROUP BY client_id, status
+        UNION ALL
+        SELECT client_id, 'open_ticket_priority', priority, count(*) FROM service_requests
+        WHERE status IN ('open', 'assigned', 'in_progress') GROUP BY client_id, priority
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table('client_summary_counts')
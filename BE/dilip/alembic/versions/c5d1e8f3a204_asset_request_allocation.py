@@ -0,0 +1,35 @@
+"""asset request allocation
+
+Revision ID: c5d1e8f3a204
+Revises: 8c2f6a4e1d93
+Create Date: 2026-10-19 17:41:09.532870
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5d1e8f3a204'
+down_revision: Union[str, None] = '8c2f6a4e1d93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('asset_requests', sa.Column('asset_type', sa.Text(), nullable=True))
+    op.create_check_constraint(
+        'valid_asset_request_asset_type', 'asset_requests',
+        "asset_type IN ('Laptop', 'Desktop', 'Monitor', 'Network_Equipment', 'Tool', 'Other')"
+    )
+    op.create_index('ix_asset_requests_pending', 'asset_requests', ['created_at'], unique=False, postgresql_where=sa.text("status = 'pending'"))
+    op.create_index('ix_company_assets_available_type', 'company_assets', ['asset_type'], unique=False, postgresql_where=sa.text("status = 'available'"))
+
+
+def downgrade() -> None:
+    op.drop_index('ix_company_assets_available_type', table_name='company_assets', postgresql_where=sa.text("status = 'available'"))
+    op.drop_index('ix_asset_requests_pending', table_name='asset_requests', postgresql_where=sa.text("status = 'pending'"))
+    op.drop_constraint('valid_asset_request_asset_type', 'asset_requests', type_='check')
+    op.drop_column('asset_requests', 'asset_type')
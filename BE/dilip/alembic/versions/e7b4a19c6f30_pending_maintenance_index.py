@@ -0,0 +1,26 @@
+"""pending maintenance index
+
+Revision ID: e7b4a19c6f30
+Revises: c5d1e8f3a204
+Create Date: 2026-10-19 18:22:47.106315
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7b4a19c6f30'
+down_revision: Union[str, None] = 'c5d1e8f3a204'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_asset_requests_pending_maintenance', 'asset_requests', ['asset_id'], unique=False, postgresql_where=sa.text("request_type = 'maintenance' AND status = 'pending'"))
+
+
+def downgrade() -> None:
+    op.drop_index('ix_asset_requests_pending_maintenance', table_name='asset_requests', postgresql_where=sa.text("request_type = 'maintenance' AND status = 'pending'"))
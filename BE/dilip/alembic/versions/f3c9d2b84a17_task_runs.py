@@ -0,0 +1,30 @@
+"""task runs
+
+Revision ID: f3c9d2b84a17
+Revises: e7b4a19c6f30
+Create Date: 2026-10-19 21:05:12.448190
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3c9d2b84a17'
+down_revision: Union[str, None] = 'e7b4a19c6f30'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('task_runs',
+    sa.Column('name', sa.Text(), nullable=False),
+    sa.Column('last_run_at', sa.DateTime(timezone=True), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('task_runs')
@@ -0,0 +1,30 @@
+"""row versions for optimistic concurrency
+
+Revision ID: f41c9b2d7a65
+Revises: d2a8c4f07e13
+Create Date: 2026-10-19 15:02:11.684213
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f41c9b2d7a65'
+down_revision: Union[str, None] = 'd2a8c4f07e13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+_VERSIONED_TABLES = ('devices', 'service_requests', 'company_assets', 'asset_requests')
+
+
+def upgrade() -> None:
+    for table in _VERSIONED_TABLES:
+        op.add_column(table, sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade() -> None:
+    for table in _VERSIONED_TABLES:
+        op.drop_column(table, 'version')
@@ -1,19 +1,156 @@
-from sqlalchemy import create_engine
+import logging
+import os
+import threading
+import time
+from contextvars import ContextVar
+from typing import Callable, Optional
+from sqlalchemy import Engine, create_engine, event, make_url
+from sqlalchemy.pool import QueuePool
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
-from app.config import settings
+from sqlalchemy.orm import Session, sessionmaker
+from app.config import Settings, settings
 
-# Create database engine
-engine = create_engine(settings.DATABASE_URL)
+logger = logging.getLogger(__name__)
 
-# Create SessionLocal class
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+class PoolWaitStats:
+    """How long connection checkouts wait on the pool, for admission control"""
+
+    def __init__(self, alpha: float = 0.1):
+        self.alpha = alpha
+        self.average = 0.0  # seconds, moving average of recent checkouts
+        self.waiting = 0  # checkouts in progress right now
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            self.waiting += 1
+
+    def finish(self, seconds: float):
+        with self._lock:
+            self.waiting -= 1
+            self.average += self.alpha * (seconds - self.average)
+
+pool_wait = PoolWaitStats()
+
+class TimedQueuePool(QueuePool):
+    def _do_get(self):
+        pool_wait.start()
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            pool_wait.finish(time.perf_counter() - started)
+
+def _pool_options(engine_settings: Settings) -> dict:
+    # In-memory SQLite needs its single-connection pool; everything else uses a timed queue pool
+    parsed = make_url(engine_settings.DATABASE_URL)
+    if parsed.get_backend_name() == "sqlite" and parsed.database in (None, "", ":memory:"):
+        return {}
+    return {"poolclass": TimedQueuePool, "pool_size": engine_settings.DB_POOL_SIZE, "max_overflow": engine_settings.DB_MAX_OVERFLOW}
+
+def _create_engine(engine_settings: Settings) -> Engine:
+    engine = create_engine(engine_settings.DATABASE_URL, **_pool_options(engine_settings))
+
+    if engine.dialect.name == "sqlite":
+        # SQLite test mode: pysqlite's implicit transactions break SAVEPOINT, so let SQLAlchemy emit BEGIN itself
+        @event.listens_for(engine, "connect")
+        def _disable_pysqlite_transactions(dbapi_connection, connection_record):
+            dbapi_connection.isolation_level = None
+
+        @event.listens_for(engine, "begin")
+        def _begin_sqlite_transaction(connection):
+            connection.exec_driver_sql("BEGIN")
+
+    return engine
+
+_engine: Optional[Engine] = None
+_engine_pid: Optional[int] = None
+_engine_settings: Settings = settings
+_engine_lock = threading.Lock()
+
+def get_engine(engine_settings: Optional[Settings] = None) -> Engine:
+    """This process's engine, created on first use.
+
+    Nothing connects at import, so a launcher can import the app and then
+    fork; each worker gets an engine and pool of its own the first time it
+    asks, and never reuses connections opened in its parent. Passing
+    settings (create_app does) rebuilds the engine from them if it was built
+    from others; every session opened afterwards uses it."""
+    global _engine, _engine_pid, _engine_settings
+    if engine_settings is None or engine_settings is _engine_settings:
+        if _engine is not None and _engine_pid == os.getpid():
+            return _engine
+    with _engine_lock:
+        if engine_settings is not None and engine_settings is not _engine_settings:
+            if _engine is not None and _engine_pid == os.getpid():
+                _engine.dispose()
+                _engine = None
+            _engine_settings = engine_settings
+        if _engine is None or _engine_pid != os.getpid():
+            if _engine is not None:
+                # Inherited from the parent: drop its pool without closing the parent's connections
+                _engine.dispose(close=False)
+            _engine = _create_engine(_engine_settings)
+            _engine_pid = os.getpid()
+    return _engine
+
+def warm_pool(connections: int):
+    """Open up to `connections` pooled connections now rather than on the first requests"""
+    engine = get_engine()
+    if not isinstance(engine.pool, QueuePool):
+        return
+    opened = []
+    try:
+        for _ in range(min(connections, engine.pool.size())):
+            connection = engine.connect()
+            connection.exec_driver_sql("SELECT 1")
+            opened.append(connection)
+    finally:
+        for connection in opened:
+            connection.close()
+
+# Rows returned by UPDATE ... RETURNING stay usable after commit without a reload
+_sessionmaker = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False)
+
+def SessionLocal(**kwargs) -> Session:
+    """A new session, on this process's engine unless given another bind"""
+    if "bind" not in kwargs:
+        kwargs["bind"] = get_engine()
+    return _sessionmaker(**kwargs)
 
 # Create Base class
 Base = declarative_base()
 
+# Set by POST /batch so that all of its sub-requests share one session and transaction
+batch_session: ContextVar[Optional[Session]] = ContextVar("batch_session", default=None)
+
+def after_commit(db: Session, callback: Callable[..., None], *args):
+    """Run callback(*args), for in-process state, once db's changes are committed for good.
+
+    Services call this right after db.commit(). On a session of its own that
+    commit is final and callback runs at once. In POST /batch's shared session
+    it only released a savepoint, so callback waits for the batch to commit
+    (run_after_commit) and is dropped if the batch rolls back."""
+    if db is batch_session.get():
+        db.info.setdefault("after_commit", []).append((callback, args))
+    else:
+        callback(*args)
+
+def run_after_commit(db: Session):
+    """Run the callbacks queued by after_commit() once the batch transaction has committed"""
+    for callback, args in db.info.pop("after_commit", []):
+        try:
+            callback(*args)
+        except Exception:
+            # The data is committed; a failed in-process update must not turn that into an error
+            logger.exception("after-commit callback %r failed", callback)
+
 # Dependency to get database session
 def get_db():
+    shared = batch_session.get()
+    if shared is not None:
+        yield shared
+        return
     db = SessionLocal()
     try:
         yield db
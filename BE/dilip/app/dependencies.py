@@ -0,0 +1,89 @@
+from fastapi import Depends, Header, HTTPException, Query, status
+from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy.orm import Session
+from typing import List, Optional
+from app.config import settings
+from app.database import get_db
+from app.schemas import User
+from app.services.principal_cache import principals
+from app.services.user_service import UserService
+import jwt
+
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
+
+def check_batch_size(ids: List[int]) -> List[int]:
+    if len(ids) > settings.BATCH_GET_MAX_IDS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {settings.BATCH_GET_MAX_IDS} ids per batch"
+        )
+    return ids
+
+def batch_ids(ids: str = Query(..., description="Comma-separated IDs, e.g. 1,2,3")) -> List[int]:
+    """Parse the ?ids= list of a batch-get endpoint"""
+    try:
+        parsed = [int(part) for part in ids.split(",") if part.strip()]
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="ids must be a comma-separated list of integers"
+        )
+    return check_batch_size(parsed)
+
+def etag(version: int) -> str:
+    return f'"{version}"'
+
+def if_match_version(if_match: Optional[str] = Header(None)) -> Optional[int]:
+    """The row version a PUT expects, from an If-Match header as sent back from an ETag"""
+    if if_match is None or if_match.strip() == "*":
+        return None
+    value = if_match.strip()
+    if value.startswith("W/"):
+        value = value[2:]
+    try:
+        return int(value.strip('"'))
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="If-Match must be a version ETag such as \"3\""
+        )
+
+async def principal(db: Session, token: str) -> Optional[User]:
+    """The user a bearer token belongs to, or None for a bad token or a deleted user.
+
+    From the principal cache when possible; the session is only used on a
+    cache miss, so a hit never touches the database."""
+    try:
+        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        user_id = int(payload.get("sub"))
+    except Exception:
+        return None
+    user = principals.get(user_id)
+    if user is not None:
+        return user
+    generation = principals.generation
+    db_user = await UserService.get_by_id(db, user_id)
+    if db_user is None:
+        return None
+    user = User.model_validate(db_user)
+    principals.put(user, generation)
+    return user
+
+async def current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> User:
+    """The user a bearer token belongs to (see principal)"""
+    user = await principal(db, token)
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return user
+
+async def require_admin(user: User = Depends(current_user)) -> User:
+    if user.role != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin access required"
+        )
+    return user
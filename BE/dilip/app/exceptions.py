@@ -0,0 +1,14 @@
+class VersionConflictError(Exception):
+    """Raised when a row's version no longer matches the one the caller read"""
+
+    def __init__(self, model_name: str, row_id: int, current_version: int):
+        super().__init__(f"{model_name} {row_id} was modified by someone else (now at version {current_version})")
+        self.model_name = model_name
+        self.row_id = row_id
+        self.current_version = current_version
+
+class AssetAllocationError(Exception):
+    """Raised when an asset request cannot be approved as things stand"""
+
+class PermanentJobError(Exception):
+    """Raised by a background job handler for a failure that retrying cannot fix"""
@@ -1,31 +1,227 @@
-from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
-from app.routers import users, clients, devices, service_requests, asset_requests, company_assets, dashboard, notifications, auth
-from app.config import settings
-
-app = FastAPI(title="IT Management System API")
-app = FastAPI(debug=True)
-
-# CORS
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=settings.BACKEND_CORS_ORIGINS,
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+"""Application factory.
+
+Importing this module is cheap: routers, services and FastAPI itself are
+only imported by create_app(). `app.main:app` still works for uvicorn and
+`from app.main import app`; the module builds that app on first access.
+"""
+import importlib
+import logging
+from contextlib import asynccontextmanager
+from typing import TYPE_CHECKING, Callable, Iterable, Optional
+from app.config import Settings, settings
+
+if TYPE_CHECKING:
+    from fastapi import FastAPI
+
+logger = logging.getLogger(__name__)
+
+# Router groups by module name under app.routers, in registration order
+ROUTER_MODULES = (
+    "users",
+    "clients",
+    "client_records",
+    "devices",
+    "service_requests",
+    "asset_requests",
+    "company_assets",
+    "dashboard",
+    "notifications",
+    "auth",
+    "search",
+    "batch",
+    "debug",
 )
 
-# Routers
-app.include_router(users.router)
-app.include_router(clients.router)
-app.include_router(devices.router)
-app.include_router(service_requests.router)
-app.include_router(asset_requests.router)
-app.include_router(company_assets.router)
-app.include_router(dashboard.router)
-app.include_router(notifications.router)
-app.include_router(auth.router)
-
-@app.get("/")
-def root():
-    return {"message": "IT Management System API is running"} 
\ No newline at end of file
+class _RouterLoader:
+    """Imports router groups and adds them to the app, once"""
+
+    def __init__(self, app: "FastAPI", modules: Iterable[str]):
+        self.app = app
+        self.pending = list(modules)
+
+    def load(self):
+        if not self.pending:
+            return
+        modules, self.pending = self.pending, []
+        for name in modules:
+            self.app.include_router(importlib.import_module(f"app.routers.{name}").router)
+        self.app.openapi_schema = None
+
+class _LoadRoutersOnFirstRequest:
+    def __init__(self, app, loader: _RouterLoader):
+        self.app = app
+        self.loader = loader
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] in ("http", "websocket"):
+            self.loader.load()
+        await self.app(scope, receive, send)
+
+class _BuildOnFirstCall:
+    """Builds a middleware, with build(app), the first time the stack is called.
+
+    Keeps the middleware modules, and the database layer they import, out
+    of create_app() itself."""
+
+    def __init__(self, app, build: Callable):
+        self.app = app
+        self.build = build
+        self.middleware = None
+
+    async def __call__(self, scope, receive, send):
+        if self.middleware is None:
+            self.middleware = self.build(self.app)
+        await self.middleware(scope, receive, send)
+
+def _scheduler(app_settings: Settings):
+    from app.middleware.idempotency import purge_expired_idempotency_keys
+    from app.scheduler import PeriodicJob, PeriodicTask, Scheduler
+
+    scheduler = Scheduler()
+    # Sweeps are enqueued for the job workers, once per interval however many API processes schedule them
+    if app_settings.WARRANTY_SWEEP_ENABLED:
+        scheduler.add(PeriodicJob(
+            "warranty.expiry_sweep",
+            app_settings.WARRANTY_SWEEP_INTERVAL_HOURS * 3600,
+            {"within_days": app_settings.WARRANTY_SWEEP_WITHIN_DAYS},
+        ))
+
+    if app_settings.MAINTENANCE_SWEEP_ENABLED:
+        scheduler.add(PeriodicJob("maintenance.sweep", app_settings.MAINTENANCE_SWEEP_INTERVAL_HOURS * 3600))
+
+    scheduler.add(PeriodicTask("idempotency-key-purge", 3600, purge_expired_idempotency_keys))
+    return scheduler
+
+async def _warm_asset_indexes():
+    from app.database import SessionLocal
+    from app.services.asset_service import AssetService
+    from app.services.maintenance_service import MaintenanceService
+
+    # Best effort: both indexes also load themselves on first use
+    db = SessionLocal()
+    try:
+        await AssetService.load_availability(db)
+        await MaintenanceService.load_schedule(db)
+    except Exception:
+        logger.exception("Could not preload the asset indexes")
+    finally:
+        db.close()
+
+def create_app(
+    app_settings: Optional[Settings] = None,
+    routers: Optional[Iterable[str]] = None,
+    lazy_routers: bool = False,
+) -> "FastAPI":
+    """Build the API.
+
+    routers limits the app to some of ROUTER_MODULES (POST /batch can only
+    reach the groups included). With lazy_routers their modules are only
+    imported on the first request, or at startup when the app is served,
+    which keeps tests and tools that never call them fast.
+
+    app_settings configures the engine (when the app starts), the
+    middleware (POST /batch's included, through app.state.settings) and the
+    scheduled tasks; routes read the global settings."""
+    from fastapi import FastAPI, Request, status
+    from fastapi.responses import JSONResponse
+    from fastapi.middleware.cors import CORSMiddleware
+    from app.exceptions import VersionConflictError
+
+    app_settings = app_settings or settings
+    loader: Optional[_RouterLoader] = None
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        from app.database import get_engine
+        from app.pubsub import listener
+
+        get_engine(app_settings)
+        if loader is not None:
+            # A served app needs every group, and their pubsub subscriptions before the listener starts
+            loader.load()
+        app.state.scheduler = _scheduler(app_settings)
+        app.state.scheduler.start()
+        await _warm_asset_indexes()
+        listener.start()
+        try:
+            yield
+        finally:
+            await app.state.scheduler.stop()
+            listener.stop()
+
+    app = FastAPI(title="IT Management System API", debug=app_settings.DEBUG, lifespan=lifespan)
+    app.state.settings = app_settings
+
+    # Replays retried POSTs that carry an Idempotency-Key (added first so CORS wraps it)
+    def idempotency(inner):
+        from app.middleware.idempotency import IdempotencyMiddleware
+        return IdempotencyMiddleware(inner, app_settings=app_settings)
+
+    app.add_middleware(_BuildOnFirstCall, build=idempotency)
+
+    # Throttles clients before they reach the database; inside CORS so browsers can read the 429.
+    # The buckets, like the admission controller, are kept on app.state for POST /batch to charge each operation to
+    if app_settings.RATE_LIMIT_ENABLED:
+        def rate_limiter(inner):
+            from app.middleware.rate_limit import RateLimitMiddleware, default_store
+            app.state.rate_limit_store = default_store(app_settings)
+            return RateLimitMiddleware(inner, store=app.state.rate_limit_store, app_settings=app_settings)
+
+        app.add_middleware(_BuildOnFirstCall, build=rate_limiter)
+
+    # Sheds low-priority traffic with 503 when the server falls behind, before it queues on the database
+    if app_settings.ADMISSION_ENABLED:
+        def admission(inner):
+            from app.middleware.admission import AdmissionMiddleware, default_controller
+            app.state.admission_controller = default_controller(app_settings)
+            return AdmissionMiddleware(inner, controller=app.state.admission_controller)
+
+        app.add_middleware(_BuildOnFirstCall, build=admission)
+
+    # Samples the worker while serving an admin's request sent with X-Profile; outside the limits so they are profiled too
+    if app_settings.PROFILING_ENABLED:
+        def profiling(inner):
+            from app.middleware.profiling import RequestProfilingMiddleware
+            return RequestProfilingMiddleware(inner, app_settings=app_settings)
+
+        app.add_middleware(_BuildOnFirstCall, build=profiling)
+
+    # CORS
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=app_settings.BACKEND_CORS_ORIGINS,
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+    @app.exception_handler(VersionConflictError)
+    async def version_conflict_handler(request: Request, exc: VersionConflictError):
+        from app.dependencies import etag
+
+        # The ETag lets the client re-read, merge and retry against the current version
+        return JSONResponse(
+            status_code=status.HTTP_409_CONFLICT,
+            content={"detail": str(exc), "current_version": exc.current_version},
+            headers={"ETag": etag(exc.current_version)},
+        )
+
+    # Routers
+    modules = ROUTER_MODULES if routers is None else tuple(routers)
+    if lazy_routers:
+        loader = _RouterLoader(app, modules)
+        app.add_middleware(_LoadRoutersOnFirstRequest, loader=loader)
+    else:
+        _RouterLoader(app, modules).load()
+
+    @app.get("/")
+    def root():
+        return {"message": "IT Management System API is running"}
+
+    return app
+
+def __getattr__(name: str):
+    if name == "app":
+        globals()["app"] = create_app()
+        return globals()["app"]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
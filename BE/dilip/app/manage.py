@@ -0,0 +1,54 @@
+"""Maintenance commands.
+
+Usage: python -m app.manage <command> [options]
+"""
+import argparse
+import asyncio
+import json
+from app.database import SessionLocal
+
+async def rebuild_client_summaries(args):
+    from app.services.client_summary_service import ClientSummaryService
+    db = SessionLocal()
+    try:
+        written = await ClientSummaryService.rebuild(db, args.client_id)
+    finally:
+        db.close()
+    print(f"Rebuilt client summaries: {written} counter rows written")
+
+async def enqueue(args):
+    from app.services.job_service import JobService
+    from app.worker import HANDLERS
+    if args.name not in HANDLERS:
+        raise SystemExit(f"Unknown job {args.name!r}; known jobs: {', '.join(sorted(HANDLERS))}")
+    db = SessionLocal()
+    try:
+        job = await JobService.enqueue(
+            db, args.name, json.loads(args.payload), queue=args.queue, priority=args.priority, delay_seconds=args.delay
+        )
+        db.commit()
+    finally:
+        db.close()
+    print(f"Enqueued job {job.id} ({job.name}) on queue {job.queue}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.manage")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    rebuild = commands.add_parser("rebuild-client-summaries", help="Recompute the per-client device and ticket counters")
+    rebuild.add_argument("--client-id", type=int, help="Only rebuild this client")
+    rebuild.set_defaults(handler=rebuild_client_summaries)
+
+    queue_job = commands.add_parser("enqueue", help="Queue a background job for the workers (app/worker.py)")
+    queue_job.add_argument("name", help="Job name, e.g. warranty.expiry_sweep")
+    queue_job.add_argument("--payload", default="{}", help="JSON keyword arguments for the job's handler")
+    queue_job.add_argument("--queue", default="default")
+    queue_job.add_argument("--priority", type=int, default=0, help="Higher runs first")
+    queue_job.add_argument("--delay", type=float, default=0, help="Seconds before the job may run")
+    queue_job.set_defaults(handler=enqueue)
+
+    args = parser.parse_args(argv)
+    asyncio.run(args.handler(args))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+# ASGI middleware
\ No newline at end of file
@@ -0,0 +1,140 @@
+import json
+import time
+from typing import Dict, Optional, Tuple
+from starlette.routing import Match
+from app.config import Settings, settings
+from app.database import pool_wait
+
+LOW, NORMAL, HIGH = 0, 1, 2
+
+# Share of the concurrency limit each priority may fill: low-priority work
+# is shed first, leaving room for the rest
+_SHARE = {LOW: 0.5, NORMAL: 0.9, HIGH: 1.0}
+
+_WRITE_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+
+# Distinct (method, path) pairs whose priority is remembered before the memo is cleared
+_MAX_MEMO = 10000
+
+def admission_priority(level: int):
+    """Set the priority a route is admitted with; put it right under the route decorator.
+
+        @router.get("/", response_model=List[Device])
+        @admission_priority(LOW)
+        async def get_devices(...):
+
+    Untagged routes are HIGH for writes and NORMAL for reads."""
+    def tag(endpoint):
+        endpoint.admission_priority = level
+        return endpoint
+    return tag
+
+def priority(scope) -> int:
+    """The priority of the route the app would send scope to"""
+    default = HIGH if scope["method"] in _WRITE_METHODS else NORMAL
+    app = scope.get("app")
+    if app is None:
+        return default
+    for route in app.router.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return getattr(getattr(route, "endpoint", None), "admission_priority", default)
+    return default
+
+class AdmissionController:
+    """Adaptive cap on requests in flight (AIMD).
+
+    The limit grows by about one per round of requests while the server is
+    busy and healthy, and is cut by a fixed factor, at most once per latency
+    target, when a request is slow or connection checkouts are waiting on
+    the pool."""
+
+    def __init__(
+        self,
+        initial_limit: int,
+        min_limit: int,
+        max_limit: int,
+        latency_target: float,
+        pool_wait_target: float,
+        backoff: float = 0.9,
+    ):
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_target = latency_target
+        self.pool_wait_target = pool_wait_target
+        self.backoff = backoff
+        self.in_flight = 0
+        self._last_decrease = 0.0
+
+    def try_acquire(self, request_priority: int) -> bool:
+        if self.in_flight >= self.limit * _SHARE[request_priority]:
+            return False
+        self.in_flight += 1
+        return True
+
+    def release(self, latency: float):
+        self.in_flight -= 1
+        now = time.monotonic()
+        if latency > self.latency_target or pool_wait.waiting or pool_wait.average > self.pool_wait_target:
+            if now - self._last_decrease >= self.latency_target:
+                self.limit = max(self.min_limit, self.limit * self.backoff)
+                self._last_decrease = now
+        elif self.in_flight >= self.limit / 2:
+            # Only grow while the limit is actually being used, so it stays meaningful after a quiet spell
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+
+def default_controller(app_settings: Optional[Settings] = None) -> AdmissionController:
+    """A controller with the ADMISSION_* settings"""
+    app_settings = app_settings or settings
+    return AdmissionController(
+        app_settings.ADMISSION_INITIAL_LIMIT,
+        app_settings.ADMISSION_MIN_LIMIT,
+        app_settings.ADMISSION_MAX_LIMIT,
+        app_settings.ADMISSION_LATENCY_TARGET_MS / 1000,
+        app_settings.ADMISSION_POOL_WAIT_TARGET_MS / 1000,
+    )
+
+class AdmissionMiddleware:
+    """Sheds requests with 503 once the adaptive concurrency limit is reached.
+
+    Runs on the event loop only, so the in-flight count needs no lock."""
+
+    def __init__(self, app, controller: Optional[AdmissionController] = None):
+        self.app = app
+        self.controller = controller or default_controller()
+        self._priorities: Dict[Tuple[str, str], int] = {}
+
+    def _priority(self, scope) -> int:
+        key = (scope["method"], scope["path"])
+        level = self._priorities.get(key)
+        if level is None:
+            if len(self._priorities) >= _MAX_MEMO:
+                self._priorities.clear()
+            level = self._priorities[key] = priority(scope)
+        return level
+
+    async def __call__(self, scope, receive, send):
+        # Diagnostics are needed most when overloaded, and a long profile must not read as a slow server.
+        # POST /batch is let in as is: each of its operations is admitted on its own (see routers/batch.py)
+        if scope["type"] != "http" or scope["path"].startswith("/debug/") or scope["path"] == "/batch":
+            await self.app(scope, receive, send)
+            return
+        if not self.controller.try_acquire(self._priority(scope)):
+            body = json.dumps({"detail": "Server is overloaded, please retry shortly"}).encode()
+            await send({
+                "type": "http.response.start",
+                "status": 503,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"retry-after", b"1"),
+                    (b"content-length", str(len(body)).encode()),
+                ],
+            })
+            await send({"type": "http.response.body", "body": body})
+            return
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release(time.perf_counter() - started)
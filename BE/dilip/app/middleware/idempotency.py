@@ -0,0 +1,243 @@
+import asyncio
+import hashlib
+import json
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import delete, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from app.config import Settings, settings
+from app.database import SessionLocal
+from app.models import IdempotencyKey
+
+MAX_KEY_LENGTH = 255
+# Response headers that describe the original transfer rather than the resource
+_UNSTORED_HEADERS = {b"content-length", b"transfer-encoding", b"connection", b"date", b"server"}
+
+@dataclass
+class StoredResponse:
+    fingerprint: str
+    status_code: Optional[int]  # None while the original request is still running
+    headers: List[Tuple[bytes, bytes]]
+    body: bytes
+
+class _LRUCache:
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, Tuple[float, StoredResponse]]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[StoredResponse]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, response = entry
+        if expires_at <= asyncio.get_running_loop().time():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return response
+
+    def put(self, key: str, response: StoredResponse, ttl_seconds: float):
+        self._entries[key] = (asyncio.get_running_loop().time() + ttl_seconds, response)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+class IdempotencyStore:
+    """Durable idempotency records shared by all workers (blocking; call from a thread)"""
+
+    def __init__(self, lease_seconds: Optional[float] = None):
+        self.lease_seconds = lease_seconds if lease_seconds is not None else settings.IDEMPOTENCY_LEASE_SECONDS
+
+    @staticmethod
+    def _to_response(row: IdempotencyKey) -> StoredResponse:
+        headers = [(name.encode("latin-1"), value.encode("latin-1")) for name, value in json.loads(row.headers or "[]")]
+        return StoredResponse(row.fingerprint, row.status_code, headers, row.body or b"")
+
+    def claim(self, key: str, fingerprint: str, ttl_seconds: float) -> Optional[StoredResponse]:
+        """Reserve key for a new request. Returns None if reserved, else the existing record.
+
+        A reservation still without a response after lease_seconds
+        (IDEMPOTENCY_LEASE_SECONDS) was left by a worker that died mid-request, and is taken over."""
+        now = datetime.now(timezone.utc)
+        expires_at = now + timedelta(seconds=ttl_seconds)
+        db = SessionLocal()
+        try:
+            db.execute(delete(IdempotencyKey).where(IdempotencyKey.key == key, IdempotencyKey.expires_at <= now))
+            db.add(IdempotencyKey(key=key, fingerprint=fingerprint, created_at=now, expires_at=expires_at))
+            db.commit()
+            return None
+        except IntegrityError:
+            db.rollback()
+            orphaned = db.execute(
+                update(IdempotencyKey)
+                .where(
+                    IdempotencyKey.key == key,
+                    IdempotencyKey.status_code.is_(None),
+                    IdempotencyKey.created_at <= now - timedelta(seconds=self.lease_seconds),
+                )
+                .values(fingerprint=fingerprint, created_at=now, expires_at=expires_at)
+            )
+            if orphaned.rowcount:
+                db.commit()
+                return None
+            db.rollback()
+            row = db.get(IdempotencyKey, key)
+            # The row can vanish between the failed insert and this read; report it as in progress
+            return self._to_response(row) if row else StoredResponse(fingerprint, None, [], b"")
+        finally:
+            db.close()
+
+    def complete(self, key: str, response: StoredResponse):
+        db = SessionLocal()
+        try:
+            row = db.get(IdempotencyKey, key)
+            if row is not None:
+                row.status_code = response.status_code
+                row.headers = json.dumps([[name.decode("latin-1"), value.decode("latin-1")] for name, value in response.headers])
+                row.body = response.body
+                db.commit()
+        finally:
+            db.close()
+
+    def release(self, key: str):
+        """Forget a reservation whose request failed, so that a retry runs again"""
+        db = SessionLocal()
+        try:
+            db.execute(delete(IdempotencyKey).where(IdempotencyKey.key == key, IdempotencyKey.status_code.is_(None)))
+            db.commit()
+        finally:
+            db.close()
+
+async def purge_expired_idempotency_keys(db: Session):
+    db.execute(delete(IdempotencyKey).where(IdempotencyKey.expires_at <= datetime.now(timezone.utc)))
+    db.commit()
+
+def _header(scope, name: bytes) -> Optional[bytes]:
+    for key, value in scope["headers"]:
+        if key == name:
+            return value
+    return None
+
+async def _send_response(send, status_code: int, headers: List[Tuple[bytes, bytes]], body: bytes):
+    await send({
+        "type": "http.response.start",
+        "status": status_code,
+        "headers": headers + [(b"content-length", str(len(body)).encode())],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+async def _send_error(send, status_code: int, detail: str, headers: List[Tuple[bytes, bytes]] = ()):
+    body = json.dumps({"detail": detail}).encode()
+    await _send_response(send, status_code, [(b"content-type", b"application/json"), *headers], body)
+
+class IdempotencyMiddleware:
+    """Replays the stored response when a POST is retried with the same Idempotency-Key.
+
+    Records live in an in-process LRU and in the idempotency_keys table. A
+    concurrent duplicate in the same worker waits for the first request and
+    shares its response; one in another worker gets 409 until it completes
+    (or, if that worker died, until the reservation's lease runs out).
+    Keys are scoped by the Authorization header, and reusing a key for a
+    different request is rejected with 422."""
+
+    def __init__(self, app, store: Optional[IdempotencyStore] = None, app_settings: Optional[Settings] = None):
+        app_settings = app_settings or settings
+        self.app = app
+        self.store = store or IdempotencyStore(app_settings.IDEMPOTENCY_LEASE_SECONDS)
+        self.ttl_seconds = app_settings.IDEMPOTENCY_TTL_HOURS * 3600
+        self.cache = _LRUCache(app_settings.IDEMPOTENCY_CACHE_SIZE)
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST":
+            await self.app(scope, receive, send)
+            return
+        raw_key = _header(scope, b"idempotency-key")
+        if raw_key is None:
+            await self.app(scope, receive, send)
+            return
+        if not raw_key or len(raw_key) > MAX_KEY_LENGTH:
+            await _send_error(send, 400, f"Idempotency-Key must be 1 to {MAX_KEY_LENGTH} characters")
+            return
+
+        body = b""
+        while True:
+            message = await receive()
+            body += message.get("body", b"")
+            if not message.get("more_body"):
+                break
+        fingerprint = hashlib.sha256(b"\0".join([scope["method"].encode(), scope["path"].encode(), scope["query_string"], body])).hexdigest()
+        scope_hash = hashlib.sha256(_header(scope, b"authorization") or b"").hexdigest()[:16]
+        key = f"{scope_hash}:{raw_key.decode('latin-1')}"
+
+        cached = self.cache.get(key)
+        if cached is not None:
+            await self._replay(send, cached, fingerprint)
+            return
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            await self._replay(send, await asyncio.shield(inflight), fingerprint)
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        result: Optional[StoredResponse] = None
+        try:
+            existing = await run_in_threadpool(self.store.claim, key, fingerprint, self.ttl_seconds)
+            if existing is not None:
+                if existing.status_code is not None:
+                    result = existing
+                    self.cache.put(key, existing, self.ttl_seconds)
+                await self._replay(send, existing, fingerprint)
+                return
+
+            result = await self._execute(scope, body, send, fingerprint)
+            if result.status_code < 500:
+                await run_in_threadpool(self.store.complete, key, result)
+                self.cache.put(key, result, self.ttl_seconds)
+            else:
+                result = None
+                await run_in_threadpool(self.store.release, key)
+        except BaseException:
+            result = None
+            await run_in_threadpool(self.store.release, key)
+            raise
+        finally:
+            del self._inflight[key]
+            future.set_result(result)
+
+    async def _execute(self, scope, body: bytes, send, fingerprint: str) -> StoredResponse:
+        """Run the request, streaming the response to the client while recording it"""
+        response = StoredResponse(fingerprint, 500, [], b"")
+        body_sent = False
+
+        async def replay_receive():
+            nonlocal body_sent
+            if body_sent:
+                return {"type": "http.disconnect"}
+            body_sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        async def recording_send(message):
+            if message["type"] == "http.response.start":
+                response.status_code = message["status"]
+                response.headers = [(name, value) for name, value in message.get("headers", []) if name.lower() not in _UNSTORED_HEADERS]
+            elif message["type"] == "http.response.body":
+                response.body += message.get("body", b"")
+            await send(message)
+
+        await self.app(scope, replay_receive, recording_send)
+        return response
+
+    @staticmethod
+    async def _replay(send, stored: Optional[StoredResponse], fingerprint: str):
+        if stored is None or stored.status_code is None:
+            await _send_error(send, 409, "A request with this Idempotency-Key is still in progress", [(b"retry-after", b"1")])
+        elif stored.fingerprint != fingerprint:
+            await _send_error(send, 422, "Idempotency-Key was already used for a different request")
+        else:
+            await _send_response(send, stored.status_code, stored.headers + [(b"idempotent-replayed", b"true")], stored.body)
@@ -0,0 +1,92 @@
+import time
+from typing import Optional
+from app import profiler
+from app.config import Settings, settings
+
+def _header(scope, name: bytes) -> Optional[bytes]:
+    for key, value in scope["headers"]:
+        if key == name:
+            return value
+    return None
+
+async def _is_admin(scope) -> bool:
+    # Imported here so that building an app does not load the models and auth stack
+    from app.database import SessionLocal
+    from app.dependencies import principal
+
+    scheme, _, token = (_header(scope, b"authorization") or b"").partition(b" ")
+    if scheme.lower() != b"bearer":
+        return False
+    # The user's current role, as routes check it: a token's role claim outlives a demotion
+    db = SessionLocal()
+    try:
+        user = await principal(db, token.decode("latin-1"))
+    finally:
+        db.close()
+    return user is not None and user.role == "admin"
+
+class RequestProfilingMiddleware:
+    """Profiles single requests that an admin sends with an X-Profile header.
+
+    The response carries `X-Profile: <name>`, and the collapsed stacks can be
+    fetched from GET /debug/profiles/<name>. At most one request per
+    PROFILE_REQUEST_MIN_INTERVAL_SECONDS is profiled on each worker, and none
+    while another profile runs; the others get `X-Profile: skipped`. The
+    sampler sees the whole worker, so requests running at the same time show
+    up as well."""
+
+    def __init__(self, app, app_settings: Optional[Settings] = None):
+        self.app = app
+        self.settings = app_settings or settings
+        self._last_started = float("-inf")
+
+    def _try_start(self) -> bool:
+        if time.monotonic() - self._last_started < self.settings.PROFILE_REQUEST_MIN_INTERVAL_SECONDS:
+            return False
+        if not profiler.active.acquire(blocking=False):
+            return False
+        self._last_started = time.monotonic()
+        return True
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or _header(scope, b"x-profile") is None:
+            await self.app(scope, receive, send)
+            return
+
+        if not (await _is_admin(scope) and self._try_start()):
+            async def send_skipped(message):
+                if message["type"] == "http.response.start":
+                    message = {**message, "headers": [*message.get("headers", []), (b"x-profile", b"skipped")]}
+                await send(message)
+
+            await self.app(scope, receive, send_skipped)
+            return
+
+        name = profiler.profile_name("request")
+        sampler = profiler.SamplingProfiler(self.settings.PROFILE_INTERVAL_MS / 1000)
+        finished = False
+
+        def finish():
+            nonlocal finished
+            if finished:
+                return
+            finished = True
+            sampler.stop()
+            try:
+                profiler.save(self.settings.PROFILE_DIR, name, sampler.collapsed(), self.settings.PROFILE_KEEP)
+            finally:
+                profiler.active.release()
+
+        async def send_profiled(message):
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": [*message.get("headers", []), (b"x-profile", name.encode())]}
+            elif message["type"] == "http.response.body" and not message.get("more_body", False):
+                # Saved before the last byte goes out, so the profile can be fetched as soon as the response is in
+                finish()
+            await send(message)
+
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_profiled)
+        finally:
+            finish()
@@ -0,0 +1,170 @@
+import json
+import logging
+import math
+import time
+from typing import Dict, List, Optional, Tuple
+import jwt
+from app.config import Settings, settings
+
+logger = logging.getLogger(__name__)
+
+_WRITE_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+# Buckets untouched this long have refilled (for any sensible rate) and can be dropped
+_IDLE_SECONDS = 300
+
+class LocalBucketStore:
+    """Token buckets in this process's memory.
+
+    Needs no lock: take() never awaits between reading and writing a bucket,
+    so on the event loop each call runs to completion on its own. Used alone
+    for a single worker and in tests, in place of a shared store."""
+
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        self._buckets: Dict[Tuple[str, str], List[float]] = {}
+
+    def _prune(self, now: float):
+        self._buckets = {key: bucket for key, bucket in self._buckets.items() if now - bucket[1] < _IDLE_SECONDS}
+        if len(self._buckets) >= self.max_keys:
+            # Still full of live clients: keep the most recently active half
+            recent = sorted(self._buckets.items(), key=lambda item: item[1][1])[len(self._buckets) // 2:]
+            self._buckets = dict(recent)
+
+    async def take(self, key: Tuple[str, str], rate: float, burst: int) -> float:
+        """Take a token. Returns 0 if allowed, else seconds until a token is available."""
+        now = time.monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if len(self._buckets) >= self.max_keys:
+                self._prune(now)
+            self._buckets[key] = [burst - 1.0, now]
+            return 0.0
+        tokens = min(burst, bucket[0] + (now - bucket[1]) * rate)
+        bucket[1] = now
+        if tokens >= 1:
+            bucket[0] = tokens - 1
+            return 0.0
+        bucket[0] = tokens
+        return (1 - tokens) / rate
+
+# Refill and take in one atomic step on the server, timed by the server's clock
+# so workers on different hosts agree. Lua numbers become integers on the way
+# out, hence the tostring.
+_REDIS_TAKE = """
+local rate, burst = tonumber(ARGV[1]), tonumber(ARGV[2])
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(bucket[1]) or burst
+local updated = tonumber(bucket[2]) or now
+tokens = math.min(burst, tokens + (now - updated) * rate)
+local wait = 0
+if tokens >= 1 then tokens = tokens - 1 else wait = (1 - tokens) / rate end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+return tostring(wait)
+"""
+
+class RedisBucketStore:
+    """Token buckets in Redis, shared by every worker (needs the redis package).
+
+    If Redis is unreachable requests are let through rather than refused."""
+
+    def __init__(self, url: str):
+        import redis.asyncio as redis
+        self._redis = redis.from_url(url)
+        self._take = self._redis.register_script(_REDIS_TAKE)
+
+    async def take(self, key: Tuple[str, str], rate: float, burst: int) -> float:
+        try:
+            return float(await self._take(keys=[f"ratelimit:{key[0]}:{key[1]}"], args=[rate, burst]))
+        except Exception:
+            logger.warning("Rate limit store unavailable; allowing request", exc_info=True)
+            return 0.0
+
+def default_store(app_settings: Optional[Settings] = None):
+    """The store set up by RATE_LIMIT_REDIS_URL"""
+    app_settings = app_settings or settings
+    if app_settings.RATE_LIMIT_REDIS_URL:
+        return RedisBucketStore(app_settings.RATE_LIMIT_REDIS_URL)
+    return LocalBucketStore(app_settings.RATE_LIMIT_MAX_KEYS)
+
+def _header(scope, name: bytes) -> Optional[bytes]:
+    for key, value in scope["headers"]:
+        if key == name:
+            return value
+    return None
+
+class RateLimitMiddleware:
+    """Token-bucket limits per client IP, per user and per route.
+
+    Every request spends a token from its IP's bucket and, with a valid
+    bearer token, from its user's. Writes and the routes listed in
+    RATE_LIMIT_ROUTES also spend from a bucket of their own per client
+    (the user if known, else the IP). An empty bucket gets 429 with
+    Retry-After."""
+
+    def __init__(self, app, store=None, app_settings: Optional[Settings] = None):
+        self.app = app
+        self.settings = app_settings or settings
+        self.store = store or default_store(self.settings)
+        self.ip_limit = (self.settings.RATE_LIMIT_IP_RATE, self.settings.RATE_LIMIT_IP_BURST)
+        self.user_limit = (self.settings.RATE_LIMIT_USER_RATE, self.settings.RATE_LIMIT_USER_BURST)
+        self.write_limit = (self.settings.RATE_LIMIT_WRITE_RATE, self.settings.RATE_LIMIT_WRITE_BURST)
+        self.route_limits = {route: (rate, int(burst)) for route, (rate, burst) in self.settings.RATE_LIMIT_ROUTES.items()}
+        # Bearer token -> user id (None if invalid), so each token is verified once
+        self._token_users: Dict[bytes, Optional[str]] = {}
+
+    def _user(self, authorization: bytes) -> Optional[str]:
+        try:
+            return self._token_users[authorization]
+        except KeyError:
+            pass
+        user_id = None
+        scheme, _, token = authorization.partition(b" ")
+        if scheme.lower() == b"bearer":
+            try:
+                user_id = str(jwt.decode(token, self.settings.SECRET_KEY, algorithms=[self.settings.ALGORITHM])["sub"])
+            except Exception:
+                pass
+        if len(self._token_users) >= self.settings.RATE_LIMIT_MAX_KEYS:
+            self._token_users.clear()
+        self._token_users[authorization] = user_id
+        return user_id
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        client = scope.get("client")
+        ip = client[0] if client else "unknown"
+        wait = await self.store.take(("ip", ip), *self.ip_limit)
+
+        authorization = _header(scope, b"authorization")
+        user_id = self._user(authorization) if authorization else None
+        if user_id is not None and not wait:
+            wait = await self.store.take(("user", user_id), *self.user_limit)
+
+        method = scope["method"]
+        route = f"{method} {scope['path']}"
+        who = f"u{user_id}" if user_id is not None else ip
+        route_limit = self.route_limits.get(route)
+        if route_limit is not None and not wait:
+            wait = await self.store.take((route, who), *route_limit)
+        elif method in _WRITE_METHODS and not wait:
+            wait = await self.store.take(("write", who), *self.write_limit)
+
+        if wait:
+            body = json.dumps({"detail": "Too many requests"}).encode()
+            await send({
+                "type": "http.response.start",
+                "status": 429,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"retry-after", str(math.ceil(wait)).encode()),
+                    (b"content-length", str(len(body)).encode()),
+                ],
+            })
+            await send({"type": "http.response.body", "body": body})
+            return
+        await self.app(scope, receive, send)
@@ -1,8 +1,11 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, Date, BigInteger, ForeignKey, CheckConstraint
+from sqlalchemy import Column, Integer, String, Text, DateTime, Date, BigInteger, LargeBinary, ForeignKey, CheckConstraint, Index, DDL, and_, event
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database import Base
 
+# Trigram indexes below need pg_trgm; other dialects build them as plain indexes
+event.listen(Base.metadata, "before_create", DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"))
+
 class User(Base):
     __tablename__ = "users"
     
@@ -14,9 +17,9 @@ class User(Base):
     password = Column(Text)
     
     # Relationships
-    service_requests_assigned = relationship("ServiceRequest", foreign_keys="ServiceRequest.assigned_to", back_populates="assigned_technician")
+    service_requests_assigned = relationship("ServiceRequest", foreign_keys="ServiceRequest.assigned_to", back_populates="assigned_technician", passive_deletes=True)
     service_requests_submitted = relationship("ServiceRequest", foreign_keys="ServiceRequest.submitted_by", back_populates="submitted_user")
-    company_assets = relationship("CompanyAsset", back_populates="assigned_user")
+    company_assets = relationship("CompanyAsset", back_populates="assigned_user", passive_deletes=True)
     asset_requests = relationship("AssetRequest", back_populates="requested_user")
     
     __table_args__ = (
@@ -58,14 +61,32 @@ class Device(Base):
     status = Column(Text, nullable=False)
     location = Column(Text, nullable=False)
     notes = Column(Text)
+    version = Column(Integer, nullable=False, server_default='1')  # optimistic concurrency counter
     
     # Relationships
     client = relationship("Client", back_populates="devices")
-    service_requests = relationship("ServiceRequest", back_populates="device")
+    service_requests = relationship("ServiceRequest", back_populates="device", passive_deletes=True)
     
     __table_args__ = (
         CheckConstraint(device_type.in_(['PC', 'Server', 'Network', 'CCTV', 'Printer', 'Other']), name='valid_device_type'),
         CheckConstraint(status.in_(['active', 'in_repair', 'retired', 'maintenance']), name='valid_device_status'),
+        Index('ix_devices_serial_number_trgm', 'serial_number', postgresql_using='gin', postgresql_ops={'serial_number': 'gin_trgm_ops'}),
+        Index('ix_devices_device_code_trgm', 'device_code', postgresql_using='gin', postgresql_ops={'device_code': 'gin_trgm_ops'}),
+        Index('ix_devices_warranty_expiry_client_id', 'warranty_expiry', 'client_id'),
+    )
+    __mapper_args__ = {"version_id_col": version}
+
+class ClientSummaryCount(Base):
+    """Materialized per-client counters, kept up to date by DeviceService and ServiceRequestService"""
+    __tablename__ = "client_summary_counts"
+
+    client_id = Column(BigInteger, ForeignKey("clients.id", ondelete="CASCADE"), primary_key=True)
+    metric = Column(Text, primary_key=True)
+    key = Column(Text, primary_key=True)
+    count = Column(BigInteger, nullable=False, default=0)
+
+    __table_args__ = (
+        CheckConstraint(metric.in_(['device_type', 'device_status', 'open_ticket_priority']), name='valid_summary_metric'),
     )
 
 class ServiceRequest(Base):
@@ -74,17 +95,18 @@ class ServiceRequest(Base):
     id = Column(BigInteger, primary_key=True, index=True)
     ticket_id = Column(Text, unique=True, nullable=False, index=True)
     client_id = Column(BigInteger, ForeignKey("clients.id", ondelete="CASCADE"), nullable=False)
-    device_id = Column(BigInteger, ForeignKey("devices.id"))
+    device_id = Column(BigInteger, ForeignKey("devices.id", ondelete="SET NULL"))
     title = Column(Text, nullable=False)
     description = Column(Text, nullable=False)
     status = Column(Text, nullable=False)
     priority = Column(Text, nullable=False)
-    assigned_to = Column(BigInteger, ForeignKey("users.id"))
+    assigned_to = Column(BigInteger, ForeignKey("users.id", ondelete="SET NULL"))
     submitted_by = Column(BigInteger, ForeignKey("users.id"), nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
     assigned_at = Column(DateTime(timezone=True))
     resolution_notes = Column(Text)
+    version = Column(Integer, nullable=False, server_default='1')  # optimistic concurrency counter
     
     # Relationships
     client = relationship("Client", back_populates="service_requests")
@@ -96,6 +118,7 @@ class ServiceRequest(Base):
         CheckConstraint(status.in_(['open', 'assigned', 'in_progress', 'resolved', 'closed']), name='valid_request_status'),
         CheckConstraint(priority.in_(['low', 'medium', 'high', 'urgent']), name='valid_priority'),
     )
+    __mapper_args__ = {"version_id_col": version}
 
 class CompanyAsset(Base):
     __tablename__ = "company_assets"
@@ -106,28 +129,35 @@ class CompanyAsset(Base):
     description = Column(Text, nullable=False)
     location = Column(Text, nullable=False)
     status = Column(Text, nullable=False)
-    assigned_to = Column(BigInteger, ForeignKey("users.id"))
+    assigned_to = Column(BigInteger, ForeignKey("users.id", ondelete="SET NULL"))
     last_maintenance = Column(Date)
+    version = Column(Integer, nullable=False, server_default='1')  # optimistic concurrency counter
     
     # Relationships
     assigned_user = relationship("User", back_populates="company_assets")
-    asset_requests = relationship("AssetRequest", back_populates="asset")
+    asset_requests = relationship("AssetRequest", back_populates="asset", passive_deletes=True)
     
     __table_args__ = (
         CheckConstraint(asset_type.in_(['Laptop', 'Desktop', 'Monitor', 'Network_Equipment', 'Tool', 'Other']), name='valid_asset_type'),
         CheckConstraint(status.in_(['available', 'assigned_to_tech', 'on_loan_to_client', 'maintenance']), name='valid_asset_status'),
+        Index('ix_company_assets_asset_tag_trgm', 'asset_tag', postgresql_using='gin', postgresql_ops={'asset_tag': 'gin_trgm_ops'}),
+        # Allocation looks for an available asset of a type
+        Index('ix_company_assets_available_type', 'asset_type', postgresql_where=(status == 'available')),
     )
+    __mapper_args__ = {"version_id_col": version}
 
 class AssetRequest(Base):
     __tablename__ = "asset_requests"
     
     id = Column(BigInteger, primary_key=True, index=True)
-    asset_id = Column(BigInteger, ForeignKey("company_assets.id"))
+    asset_id = Column(BigInteger, ForeignKey("company_assets.id", ondelete="SET NULL"))
     requested_by = Column(BigInteger, ForeignKey("users.id"), nullable=False)
     request_type = Column(Text, nullable=False)
+    asset_type = Column(Text)  # for assignment requests not tied to a specific asset
     reason = Column(Text, nullable=False)
     status = Column(Text, nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    version = Column(Integer, nullable=False, server_default='1')  # optimistic concurrency counter
     
     # Relationships
     asset = relationship("CompanyAsset", back_populates="asset_requests")
@@ -136,7 +166,11 @@ class AssetRequest(Base):
     __table_args__ = (
         CheckConstraint(request_type.in_(['assignment', 'modification', 'maintenance']), name='valid_request_type'),
         CheckConstraint(status.in_(['pending', 'approved', 'rejected']), name='valid_asset_request_status'),
+        CheckConstraint(asset_type.in_(['Laptop', 'Desktop', 'Monitor', 'Network_Equipment', 'Tool', 'Other']), name='valid_asset_request_asset_type'),
+        Index('ix_asset_requests_pending', 'created_at', postgresql_where=(status == 'pending')),
+        Index('ix_asset_requests_pending_maintenance', 'asset_id', postgresql_where=and_(request_type == 'maintenance', status == 'pending')),
     )
+    __mapper_args__ = {"version_id_col": version}
 
 class Notification(Base):
     __tablename__ = "notifications"
@@ -154,4 +188,49 @@ class Notification(Base):
 
     __table_args__ = (
         CheckConstraint(type.in_(['user', 'admin']), name='valid_notification_type'),
-    ) 
\ No newline at end of file
+    )
+
+class IdempotencyKey(Base):
+    """Stored responses for POST requests sent with an Idempotency-Key header"""
+    __tablename__ = "idempotency_keys"
+
+    key = Column(Text, primary_key=True)
+    fingerprint = Column(Text, nullable=False)
+    status_code = Column(Integer)  # NULL while the first request is still running
+    headers = Column(Text)  # JSON list of [name, value] pairs
+    body = Column(LargeBinary)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+
+class TaskRun(Base):
+    """When a periodic task last ran, shared by every process that schedules it"""
+    __tablename__ = "task_runs"
+
+    name = Column(Text, primary_key=True)
+    last_run_at = Column(DateTime(timezone=True), nullable=False)
+
+class Job(Base):
+    """Background work, claimed by the workers in app/worker.py"""
+    __tablename__ = "jobs"
+
+    id = Column(BigInteger, primary_key=True, index=True)
+    queue = Column(Text, nullable=False, server_default='default')
+    name = Column(Text, nullable=False)  # handler name, see app.worker.HANDLERS
+    payload = Column(Text, nullable=False, server_default='{}')  # JSON keyword arguments for the handler
+    priority = Column(Integer, nullable=False, server_default='0')  # higher runs first
+    status = Column(Text, nullable=False, server_default='queued')
+    attempts = Column(Integer, nullable=False, server_default='0')
+    max_attempts = Column(Integer, nullable=False)
+    run_at = Column(DateTime(timezone=True), nullable=False)
+    locked_by = Column(Text)
+    locked_at = Column(DateTime(timezone=True))
+    last_error = Column(Text)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    finished_at = Column(DateTime(timezone=True))
+
+    __table_args__ = (
+        CheckConstraint(status.in_(['queued', 'running', 'succeeded', 'failed']), name='valid_job_status'),
+        # Only queued rows are ever scanned for work
+        Index('ix_jobs_claimable', 'queue', 'priority', 'run_at', postgresql_where=(status == 'queued'), sqlite_where=(status == 'queued')),
+        Index('ix_jobs_queue_status', 'queue', 'status'),
+    )
@@ -0,0 +1,119 @@
+"""Sampling profiler for live workers.
+
+A background thread snapshots the stack of every other thread in the
+process at a fixed interval and counts identical stacks. Nothing is
+instrumented, so the code being profiled runs at full speed; the cost is
+one stack walk per thread per sample. Output is in the collapsed-stack
+format read by flamegraph.pl, speedscope and similar tools: one line per
+distinct stack, root first, frames separated by ";", then the sample
+count.
+
+Only one profile runs at a time per process (see `active`), whether for
+GET /debug/profile or a single request profiled via the X-Profile header.
+"""
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, Optional
+
+# Held while a profile runs; a second one is refused rather than queued
+active = threading.Lock()
+
+_code_labels: Dict[object, str] = {}
+
+def _label(code) -> str:
+    label = _code_labels.get(code)
+    if label is None:
+        filename = code.co_filename
+        marker = filename.rfind("site-packages" + os.sep)
+        if marker >= 0:
+            filename = filename[marker + len("site-packages") + 1:]
+        elif (marker := filename.rfind(os.sep + "app" + os.sep)) >= 0:
+            filename = filename[marker + 1:]
+        else:
+            filename = os.path.basename(filename)
+        # By function, not line, so samples anywhere in a function add up
+        label = _code_labels[code] = f"{code.co_name} ({filename}:{code.co_firstlineno})"
+    return label
+
+class SamplingProfiler:
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self.sample_count = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _sample(self):
+        own = threading.get_ident()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == own:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(_label(frame.f_code))
+                frame = frame.f_back
+            stack.append(names.get(ident, f"thread-{ident}"))
+            self.samples[";".join(reversed(stack))] += 1
+        self.sample_count += 1
+
+    def _run(self):
+        next_at = time.perf_counter()
+        while not self._stop.is_set():
+            self._sample()
+            next_at += self.interval
+            delay = next_at - time.perf_counter()
+            if delay < 0:
+                # Fell behind (a long GIL hold); skip the missed samples rather than bursting
+                next_at = time.perf_counter()
+                delay = 0
+            self._stop.wait(delay)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+def profile_name(kind: str) -> str:
+    """Unique file name for a profile of this worker"""
+    return f"{kind}-{os.getpid()}-{time.strftime('%Y%m%dT%H%M%S')}-{time.perf_counter_ns() % 1_000_000:06d}.collapsed"
+
+def save(directory: str, name: str, collapsed: str, keep: int) -> str:
+    """Write a profile and remove the oldest beyond the `keep` most recent"""
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, name)
+    with open(path, "w") as f:
+        f.write(collapsed)
+    profiles = []
+    for entry in os.scandir(directory):
+        if entry.name.endswith(".collapsed"):
+            try:
+                profiles.append((entry.stat().st_mtime, entry.path))
+            except FileNotFoundError:
+                pass  # pruned by another worker meanwhile
+    profiles.sort()
+    for _, old in profiles[:-keep] if keep > 0 else []:
+        try:
+            os.remove(old)
+        except FileNotFoundError:
+            pass
+    return path
+
+def load(directory: str, name: str) -> Optional[str]:
+    # Only bare file names written by save(), never a path
+    if os.path.basename(name) != name or not name.endswith(".collapsed"):
+        return None
+    try:
+        with open(os.path.join(directory, name)) as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
@@ -0,0 +1,102 @@
+"""Cross-process notifications over PostgreSQL LISTEN/NOTIFY.
+
+publish() queues a message in the caller's transaction, so other processes
+only hear about a change once it has committed. The listener thread holds
+one dedicated connection, LISTENs on every subscribed channel and calls the
+handlers with the decoded message. Other databases have no cross-process
+channel; publishing there is a no-op and callers keep their own process
+up to date directly.
+"""
+import json
+import logging
+import os
+import select
+import threading
+from typing import Callable, Dict, List, Optional
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from app.database import get_engine
+
+logger = logging.getLogger(__name__)
+
+Handler = Callable[[dict], None]
+
+_handlers: Dict[str, List[Handler]] = {}
+_resync: List[Callable[[], None]] = []
+
+def subscribe(channel: str, handler: Handler, resync: Optional[Callable[[], None]] = None):
+    """Call handler(message) for every message published on channel by another process.
+
+    resync is called whenever the listener (re)connects, since messages sent
+    while it was disconnected are lost."""
+    _handlers.setdefault(channel, []).append(handler)
+    if resync is not None:
+        _resync.append(resync)
+
+def publish(db: Session, channel: str, message: dict):
+    if db.get_bind().dialect.name != "postgresql":
+        return
+    payload = json.dumps(dict(message, origin=os.getpid()), default=str)
+    db.execute(text("SELECT pg_notify(:channel, :payload)"), {"channel": channel, "payload": payload})
+
+def _dispatch(channel: str, payload: str):
+    message = json.loads(payload)
+    if message.pop("origin", None) == os.getpid():
+        return  # the publishing process has already applied its own change
+    for handler in _handlers.get(channel, []):
+        try:
+            handler(message)
+        except Exception:
+            logger.exception("Handler for %s notification failed", channel)
+
+class Listener:
+    def __init__(self, poll_seconds: float = 5.0, retry_seconds: float = 5.0):
+        self.poll_seconds = poll_seconds
+        self.retry_seconds = retry_seconds
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if get_engine().dialect.name != "postgresql" or not _handlers or self._thread is not None:
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="pubsub-listener", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(self.poll_seconds + 1)
+            self._thread = None
+
+    def _run(self):
+        while not self._stopping.is_set():
+            try:
+                self._listen()
+            except Exception:
+                logger.exception("Notification listener lost its connection; reconnecting")
+                self._stopping.wait(self.retry_seconds)
+
+    def _listen(self):
+        # A connection of its own, outside the pool, since it is held for good
+        raw = get_engine().raw_connection()
+        raw.detach()
+        connection = raw.dbapi_connection
+        try:
+            connection.autocommit = True
+            with connection.cursor() as cursor:
+                for channel in _handlers:
+                    cursor.execute(f'LISTEN "{channel}"')
+            for resync in _resync:
+                resync()
+            while not self._stopping.is_set():
+                if select.select([connection], [], [], self.poll_seconds) == ([], [], []):
+                    continue
+                connection.poll()
+                while connection.notifies:
+                    notify = connection.notifies.pop(0)
+                    _dispatch(notify.channel, notify.payload)
+        finally:
+            connection.close()
+
+listener = Listener()
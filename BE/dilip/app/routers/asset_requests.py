@@ -1,44 +1,77 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from app.database import get_db
 from app.services.asset_service import AssetService
-from app.schemas import AssetRequest, AssetRequestCreate, AssetRequestUpdate, AssetRequestList
+from app.dependencies import batch_ids, check_batch_size, etag, if_match_version
+from app.middleware.admission import LOW, NORMAL, admission_priority
+from app.exceptions import AssetAllocationError
+from app.schemas import AssetRequest, AssetRequestCreate, AssetRequestUpdate, AssetRequestList, AssetRequestBatch, AssetRequestApproval, BatchGetRequest
 
 router = APIRouter(prefix="/asset-requests", tags=["asset-requests"])
 
 @router.get("/status/{status}", response_model=List[AssetRequest])
+@admission_priority(LOW)
 async def get_requests_by_status(status: str, db: Session = Depends(get_db)):
     """Get asset requests by status"""
     requests = await AssetService.get_requests_by_status(db, status)
     return requests
 
 @router.get("/user/{user_id}", response_model=List[AssetRequest])
+@admission_priority(LOW)
 async def get_requests_by_user(user_id: int, db: Session = Depends(get_db)):
     """Get asset requests by user ID"""
     requests = await AssetService.get_requests_by_user(db, user_id)
     return requests
 
 @router.get("/asset/{asset_id}", response_model=List[AssetRequest])
+@admission_priority(LOW)
 async def get_requests_by_asset(asset_id: int, db: Session = Depends(get_db)):
     """Get asset requests by asset ID"""
     requests = await AssetService.get_requests_by_asset(db, asset_id)
     return requests
 
 @router.get("/pending", response_model=List[AssetRequest])
+@admission_priority(LOW)
 async def get_pending_requests(db: Session = Depends(get_db)):
     """Get all pending asset requests"""
     requests = await AssetService.get_pending_requests(db)
     return requests
 
 @router.get("/", response_model=List[AssetRequest])
+@admission_priority(LOW)
 async def get_all_requests(db: Session = Depends(get_db)):
     """Get all asset requests"""
     requests = await AssetService.get_all_requests(db)
     return requests
 
+@router.get("/batch", response_model=AssetRequestBatch)
+async def get_requests_batch(ids: List[int] = Depends(batch_ids), db: Session = Depends(get_db)):
+    """Get several asset requests by ID in one call"""
+    items, missing = await AssetService.get_requests_by_ids(db, ids)
+    return {"items": items, "missing": missing}
+
+@router.post("/batch", response_model=AssetRequestBatch)
+@admission_priority(NORMAL)
+async def post_requests_batch(batch: BatchGetRequest, db: Session = Depends(get_db)):
+    """Get several asset requests by ID, for ID lists too long for a query string"""
+    items, missing = await AssetService.get_requests_by_ids(db, check_batch_size(batch.ids))
+    return {"items": items, "missing": missing}
+
+@router.post("/claim-next", response_model=AssetRequestApproval)
+async def claim_next_request(request_type: Optional[str] = Query(None), db: Session = Depends(get_db)):
+    """Approve the oldest pending asset request that can be fulfilled, skipping ones other approvers hold"""
+    approval = await AssetService.claim_next_request(db, request_type)
+    if not approval:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No pending asset request can be approved"
+        )
+    request, asset = approval
+    return {"request": request, "asset": asset}
+
 @router.get("/{request_id}", response_model=AssetRequest)
-async def get_request(request_id: int, db: Session = Depends(get_db)):
+async def get_request(request_id: int, response: Response, db: Session = Depends(get_db)):
     """Get a specific asset request by ID"""
     request = await AssetService.get_request_by_id(db, request_id)
     if not request:
@@ -46,6 +79,7 @@ async def get_request(request_id: int, db: Session = Depends(get_db)):
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Asset request not found"
         )
+    response.headers["ETag"] = etag(request.version)
     return request
 
 @router.post("/", response_model=AssetRequest, status_code=status.HTTP_201_CREATED)
@@ -55,16 +89,35 @@ async def create_request(request_data: AssetRequestCreate, db: Session = Depends
     return request
 
 @router.put("/{request_id}", response_model=AssetRequest)
-async def update_request(request_id: int, request_data: AssetRequestUpdate, db: Session = Depends(get_db)):
+async def update_request(request_id: int, request_data: AssetRequestUpdate, response: Response, expected_version: Optional[int] = Depends(if_match_version), db: Session = Depends(get_db)):
     """Update an asset request"""
-    request = await AssetService.update_request(db, request_id, request_data)
+    request = await AssetService.update_request(db, request_id, request_data, expected_version)
     if not request:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Asset request not found"
         )
+    response.headers["ETag"] = etag(request.version)
     return request
 
+@router.post("/{request_id}/approve", response_model=AssetRequestApproval)
+async def approve_request(request_id: int, db: Session = Depends(get_db)):
+    """Approve an asset request, allocating an available asset to assignment requests"""
+    try:
+        approval = await AssetService.approve_request(db, request_id)
+    except AssetAllocationError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(exc)
+        )
+    if not approval:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Asset request not found"
+        )
+    request, asset = approval
+    return {"request": request, "asset": asset}
+
 @router.delete("/{request_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_request(request_id: int, db: Session = Depends(get_db)):
     """Delete an asset request"""
@@ -0,0 +1,179 @@
+import json
+import re
+from fastapi import APIRouter, HTTPException, Request, Response, status
+from fastapi.middleware.asyncexitstack import AsyncExitStackMiddleware
+from starlette.middleware.exceptions import ExceptionMiddleware
+from starlette.routing import Match
+from typing import Any, List, Optional, Tuple
+from app.config import settings
+from app.database import SessionLocal, batch_session, get_engine, run_after_commit
+from app.middleware.admission import AdmissionMiddleware
+from app.middleware.rate_limit import RateLimitMiddleware
+from app.schemas import BatchOperation, BatchOperationResult, BatchRequest, BatchResponse
+
+router = APIRouter(tags=["batch"])
+
+_ALLOWED_METHODS = {"GET", "POST", "PUT", "PATCH", "DELETE"}
+_FULL_REFERENCE = re.compile(r"^\$(\d+)\.([\w.]+)$")
+_PATH_REFERENCE = re.compile(r"\$(\d+)\.([\w.]+)")
+# Request headers passed through to every sub-request
+_FORWARDED_HEADERS = {b"authorization", b"accept", b"accept-language", b"user-agent"}
+
+def _lookup(results: List[BatchOperationResult], index: int, field_path: str) -> Any:
+    if index >= len(results):
+        raise ValueError(f"${index} refers to an operation that has not run yet")
+    value = results[index].body
+    for part in field_path.split("."):
+        if isinstance(value, dict) and part in value:
+            value = value[part]
+        elif isinstance(value, list) and part.isdigit() and int(part) < len(value):
+            value = value[int(part)]
+        else:
+            raise ValueError(f"${index}.{field_path} does not exist in the result of operation {index}")
+    return value
+
+def _resolve(value: Any, results: List[BatchOperationResult]) -> Any:
+    """Replace "$N.field" strings in a request body with values from earlier results"""
+    if isinstance(value, str):
+        match = _FULL_REFERENCE.match(value)
+        return _lookup(results, int(match.group(1)), match.group(2)) if match else value
+    if isinstance(value, list):
+        return [_resolve(item, results) for item in value]
+    if isinstance(value, dict):
+        return {key: _resolve(item, results) for key, item in value.items()}
+    return value
+
+def _endpoint(app, scope) -> Any:
+    """The endpoint the router would send scope to"""
+    for route in app.router.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return getattr(route, "endpoint", None)
+    return None
+
+def _operation_app(app):
+    """What each operation is run through: the app's routes, behind the same
+    rate limits and admission control as a request of its own would be"""
+    operation_app = getattr(app.state, "batch_operation_app", None)
+    if operation_app is None:
+        # Same inner stack FastAPI builds around its router
+        operation_app = ExceptionMiddleware(
+            AsyncExitStackMiddleware(app.router),
+            handlers={key: handler for key, handler in app.exception_handlers.items() if key not in (500, Exception)},
+        )
+        store = getattr(app.state, "rate_limit_store", None)
+        if store is not None:
+            operation_app = RateLimitMiddleware(operation_app, store=store, app_settings=getattr(app.state, "settings", None))
+        controller = getattr(app.state, "admission_controller", None)
+        if controller is not None:
+            operation_app = AdmissionMiddleware(operation_app, controller=controller)
+        app.state.batch_operation_app = operation_app
+    return operation_app
+
+async def _dispatch(request: Request, method: str, path: str, body: Any) -> Tuple[int, Any, Optional[str]]:
+    """Run one sub-request and return (status, decoded body, Retry-After)"""
+    path, _, query = path.partition("?")
+    payload = b"" if body is None else json.dumps(body).encode()
+    headers = [(name, value) for name, value in request.scope["headers"] if name in _FORWARDED_HEADERS]
+    headers += [(b"content-type", b"application/json"), (b"content-length", str(len(payload)).encode())]
+    scope = {
+        "type": "http",
+        "asgi": request.scope.get("asgi", {"version": "3.0"}),
+        "http_version": request.scope.get("http_version", "1.1"),
+        "method": method,
+        "scheme": request.scope.get("scheme", "http"),
+        "server": request.scope.get("server"),
+        "client": request.scope.get("client"),
+        "root_path": request.scope.get("root_path", ""),
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": query.encode(),
+        "headers": headers,
+        "app": request.app,
+    }
+    # Checked on the resolved path: a "$N.field" reference can spell out /batch too
+    if _endpoint(request.app, scope) is run_batch:
+        return status.HTTP_400_BAD_REQUEST, {"detail": "A batch cannot contain POST /batch"}, None
+
+    async def receive():
+        return {"type": "http.request", "body": payload, "more_body": False}
+
+    response = {"status": 500, "body": b"", "retry_after": None}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            response["status"] = message["status"]
+            for name, value in message.get("headers", []):
+                if name == b"retry-after":
+                    response["retry_after"] = value.decode("latin-1")
+        elif message["type"] == "http.response.body":
+            response["body"] += message.get("body", b"")
+
+    await _operation_app(request.app)(scope, receive, send)
+    return response["status"], json.loads(response["body"]) if response["body"] else None, response["retry_after"]
+
+@router.post("/batch", response_model=BatchResponse)
+async def run_batch(batch: BatchRequest, request: Request, response: Response):
+    """Run several API calls in order, in one database transaction.
+
+    Paths and body values can reference earlier results as "$<index>.<field>".
+    If any operation fails, everything is rolled back and the response
+    carries that operation's status code. Each operation counts against the
+    rate limits and admission control as a request of its own; the batch as
+    a whole is made idempotent by an Idempotency-Key on POST /batch."""
+    if len(batch.operations) > settings.BATCH_MAX_OPERATIONS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {settings.BATCH_MAX_OPERATIONS} operations per batch"
+        )
+    for operation in batch.operations:
+        if operation.method.upper() not in _ALLOWED_METHODS or not operation.path.startswith("/") or operation.path.partition("?")[0].rstrip("/") == "/batch":
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Unsupported batch operation: {operation.method} {operation.path}"
+            )
+
+    # The services commit after each write; in a savepoint-joined session those
+    # commits only release savepoints, and the outer transaction commits once below.
+    connection = get_engine().connect()
+    transaction = connection.begin()
+    db = SessionLocal(bind=connection, join_transaction_mode="create_savepoint")
+    token = batch_session.set(db)
+    results: List[BatchOperationResult] = []
+    failed_status: Optional[int] = None
+    retry_after: Optional[str] = None
+    try:
+        for operation in batch.operations:
+            try:
+                path = _PATH_REFERENCE.sub(lambda m: str(_lookup(results, int(m.group(1)), m.group(2))), operation.path)
+                body = _resolve(operation.body, results)
+            except ValueError as exc:
+                results.append(BatchOperationResult(status=status.HTTP_400_BAD_REQUEST, body={"detail": str(exc)}))
+                failed_status = status.HTTP_400_BAD_REQUEST
+                break
+            try:
+                op_status, op_body, retry_after = await _dispatch(request, operation.method.upper(), path, body)
+            except Exception:
+                op_status, op_body, retry_after = status.HTTP_500_INTERNAL_SERVER_ERROR, {"detail": "Internal Server Error"}, None
+            results.append(BatchOperationResult(status=op_status, body=op_body))
+            if op_status >= 400:
+                failed_status = op_status
+                break
+
+        if failed_status is None:
+            transaction.commit()
+            run_after_commit(db)
+        else:
+            transaction.rollback()
+            response.status_code = failed_status
+            if retry_after is not None:
+                # Throttled or shed: tell the client when to retry the batch
+                response.headers["Retry-After"] = retry_after
+    finally:
+        batch_session.reset(token)
+        db.close()
+        if transaction.is_active:
+            transaction.rollback()
+        connection.close()
+
+    return BatchResponse(committed=failed_status is None, results=results)
@@ -0,0 +1,19 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.orm import Session
+from app.database import get_db
+from app.services.client_summary_service import ClientSummaryService
+from app.schemas import ClientSummary
+
+# Keyed by clients.id, the organisations devices and tickets belong to; /clients/{id} is a client user's users.id
+router = APIRouter(prefix="/client-records", tags=["clients"])
+
+@router.get("/{client_id}/summary", response_model=ClientSummary)
+async def get_client_summary(client_id: int, db: Session = Depends(get_db)):
+    """Get device counts and open ticket counts for a client"""
+    summary = await ClientSummaryService.get_summary(db, client_id)
+    if not summary:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Client not found"
+        )
+    return summary
@@ -3,12 +3,14 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from typing import List
 from app.database import get_db
+from app.middleware.admission import LOW, admission_priority
 from app.services.client_service import ClientService
 from app.schemas import User, UserCreate, UserUpdate
 
 router = APIRouter(prefix="/clients", tags=["clients"])
 
 @router.get("/", response_model=List[User])
+@admission_priority(LOW)
 async def get_clients(db: Session = Depends(get_db)):
     """Get all clients"""
     clients = await ClientService.get_all(db)
@@ -1,44 +1,78 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, Query, status
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
+from datetime import date
 from app.database import get_db
 from app.services.asset_service import AssetService
-from app.schemas import CompanyAsset, CompanyAssetCreate, CompanyAssetUpdate, CompanyAssetList
+from app.services.maintenance_service import MaintenanceService
+from app.dependencies import batch_ids, check_batch_size, etag, if_match_version
+from app.middleware.admission import LOW, NORMAL, admission_priority
+from app.schemas import CompanyAsset, CompanyAssetCreate, CompanyAssetUpdate, CompanyAssetList, CompanyAssetBatch, BatchGetRequest, MaintenanceDue
 
 router = APIRouter(prefix="/company-assets", tags=["company-assets"])
 
 @router.get("/status/{status}", response_model=List[CompanyAsset])
+@admission_priority(LOW)
 async def get_assets_by_status(status: str, db: Session = Depends(get_db)):
     """Get company assets by status"""
     assets = await AssetService.get_assets_by_status(db, status)
     return assets
 
 @router.get("/type/{asset_type}", response_model=List[CompanyAsset])
+@admission_priority(LOW)
 async def get_assets_by_type(asset_type: str, db: Session = Depends(get_db)):
     """Get company assets by type"""
     assets = await AssetService.get_assets_by_type(db, asset_type)
     return assets
 
 @router.get("/assigned/{user_id}", response_model=List[CompanyAsset])
+@admission_priority(LOW)
 async def get_assets_by_assigned_user(user_id: int, db: Session = Depends(get_db)):
     """Get company assets assigned to a user"""
     assets = await AssetService.get_assets_by_assigned_user(db, user_id)
     return assets
 
 @router.get("/available", response_model=List[CompanyAsset])
-async def get_available_assets(db: Session = Depends(get_db)):
-    """Get all available company assets"""
-    assets = await AssetService.get_available_assets(db)
+@admission_priority(LOW)
+async def get_available_assets(asset_type: Optional[str] = Query(None, alias="type"), location: Optional[str] = None, db: Session = Depends(get_db)):
+    """Get available company assets, optionally of one type and/or at one location"""
+    assets = await AssetService.get_available_assets(db, asset_type, location)
+    return assets
+
+@router.get("/maintenance-due", response_model=List[MaintenanceDue])
+@admission_priority(LOW)
+async def get_maintenance_due(on: Optional[date] = None, db: Session = Depends(get_db)):
+    """Get company assets due for preventive maintenance by a date (default today), soonest first"""
+    return await MaintenanceService.get_due(db, on or date.today())
+
+@router.get("/lookup", response_model=List[CompanyAsset])
+async def lookup_assets(q: str = Query(..., min_length=1), limit: int = Query(20, ge=1, le=100), db: Session = Depends(get_db)):
+    """Fuzzy lookup of company assets by asset tag"""
+    assets = await AssetService.lookup_assets(db, q, limit)
     return assets
 
 @router.get("/", response_model=List[CompanyAsset])
+@admission_priority(LOW)
 async def get_all_assets(db: Session = Depends(get_db)):
     """Get all company assets"""
     assets = await AssetService.get_all_assets(db)
     return assets
 
+@router.get("/batch", response_model=CompanyAssetBatch)
+async def get_assets_batch(ids: List[int] = Depends(batch_ids), db: Session = Depends(get_db)):
+    """Get several company assets by ID in one call"""
+    items, missing = await AssetService.get_assets_by_ids(db, ids)
+    return {"items": items, "missing": missing}
+
+@router.post("/batch", response_model=CompanyAssetBatch)
+@admission_priority(NORMAL)
+async def post_assets_batch(batch: BatchGetRequest, db: Session = Depends(get_db)):
+    """Get several company assets by ID, for ID lists too long for a query string"""
+    items, missing = await AssetService.get_assets_by_ids(db, check_batch_size(batch.ids))
+    return {"items": items, "missing": missing}
+
 @router.get("/{asset_id}", response_model=CompanyAsset)
-async def get_asset(asset_id: int, db: Session = Depends(get_db)):
+async def get_asset(asset_id: int, response: Response, db: Session = Depends(get_db)):
     """Get a specific company asset by ID"""
     asset = await AssetService.get_asset_by_id(db, asset_id)
     if not asset:
@@ -46,6 +80,7 @@ async def get_asset(asset_id: int, db: Session = Depends(get_db)):
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Company asset not found"
         )
+    response.headers["ETag"] = etag(asset.version)
     return asset
 
 @router.post("/", response_model=CompanyAsset, status_code=status.HTTP_201_CREATED)
@@ -55,14 +90,15 @@ async def create_asset(asset_data: CompanyAssetCreate, db: Session = Depends(get
     return asset
 
 @router.put("/{asset_id}", response_model=CompanyAsset)
-async def update_asset(asset_id: int, asset_data: CompanyAssetUpdate, db: Session = Depends(get_db)):
+async def update_asset(asset_id: int, asset_data: CompanyAssetUpdate, response: Response, expected_version: Optional[int] = Depends(if_match_version), db: Session = Depends(get_db)):
     """Update a company asset"""
-    asset = await AssetService.update_asset(db, asset_id, asset_data)
+    asset = await AssetService.update_asset(db, asset_id, asset_data, expected_version)
     if not asset:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Company asset not found"
         )
+    response.headers["ETag"] = etag(asset.version)
     return asset
 
 @router.delete("/{asset_id}", status_code=status.HTTP_204_NO_CONTENT)
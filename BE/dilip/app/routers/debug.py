@@ -0,0 +1,55 @@
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import PlainTextResponse
+from sqlalchemy.orm import Session
+from app import profiler
+from app.config import settings
+from app.database import get_db
+from app.dependencies import require_admin
+from app.schemas import User
+
+router = APIRouter(prefix="/debug", tags=["debug"])
+
+def _profiling_enabled():
+    if not settings.PROFILING_ENABLED:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+
+@router.get("/profile", response_class=PlainTextResponse, dependencies=[Depends(_profiling_enabled)])
+async def profile(
+    seconds: float = Query(10, gt=0, le=settings.PROFILE_MAX_SECONDS),
+    user: User = Depends(require_admin),
+    db: Session = Depends(get_db),
+):
+    """Sample every thread of the worker serving this request for `seconds`.
+
+    Returns collapsed stacks (flamegraph.pl, speedscope). Other requests keep
+    being served meanwhile; they are what gets profiled."""
+    if not profiler.active.acquire(blocking=False):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="A profile is already running on this worker"
+        )
+    # Give the connection used to check the user back to the pool while sampling
+    db.close()
+    sampler = profiler.SamplingProfiler(settings.PROFILE_INTERVAL_MS / 1000)
+    try:
+        sampler.start()
+        await asyncio.sleep(seconds)
+    finally:
+        sampler.stop()
+        profiler.active.release()
+    return PlainTextResponse(sampler.collapsed(), headers={
+        "Content-Disposition": f'attachment; filename="{profiler.profile_name("profile")}"',
+        "X-Profile-Samples": str(sampler.sample_count),
+    })
+
+@router.get("/profiles/{name}", response_class=PlainTextResponse, dependencies=[Depends(_profiling_enabled)])
+async def get_request_profile(name: str, user: User = Depends(require_admin)):
+    """A profile recorded for a request sent with X-Profile, by the name in its X-Profile response header"""
+    collapsed = profiler.load(settings.PROFILE_DIR, name)
+    if collapsed is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Profile not found"
+        )
+    return PlainTextResponse(collapsed)
@@ -1,38 +1,70 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, Query, status
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from app.database import get_db
 from app.services.device_service import DeviceService
-from app.schemas import Device, DeviceCreate, DeviceUpdate, DeviceList
+from app.dependencies import batch_ids, check_batch_size, etag, if_match_version
+from app.middleware.admission import LOW, NORMAL, admission_priority
+from app.schemas import Device, DeviceCreate, DeviceUpdate, DeviceList, DeviceBatch, BatchGetRequest
 
 router = APIRouter(prefix="/devices", tags=["devices"])
 
 @router.get("/status/{status}", response_model=List[Device])
+@admission_priority(LOW)
 async def get_devices_by_status(status: str, db: Session = Depends(get_db)):
     """Get devices by status"""
     devices = await DeviceService.get_by_status(db, status)
     return devices
 
 @router.get("/type/{device_type}", response_model=List[Device])
+@admission_priority(LOW)
 async def get_devices_by_type(device_type: str, db: Session = Depends(get_db)):
     """Get devices by type"""
     devices = await DeviceService.get_by_device_type(db, device_type)
     return devices
 
 @router.get("/client/{client_id}", response_model=List[Device])
+@admission_priority(LOW)
 async def get_devices_by_client(client_id: int, db: Session = Depends(get_db)):
     """Get devices by client ID"""
     devices = await DeviceService.get_by_client_id(db, client_id)
     return devices
 
+@router.get("/warranty-expiring", response_model=List[Device])
+@admission_priority(LOW)
+async def get_devices_warranty_expiring(within_days: int = Query(30, ge=0, le=3650), client_id: Optional[int] = None, db: Session = Depends(get_db)):
+    """Get devices whose warranty expires within the given number of days"""
+    devices = await DeviceService.get_warranty_expiring(db, within_days, client_id)
+    return devices
+
+@router.get("/lookup", response_model=List[Device])
+async def lookup_devices(q: str = Query(..., min_length=1), limit: int = Query(20, ge=1, le=100), db: Session = Depends(get_db)):
+    """Fuzzy lookup of devices by serial number or device code"""
+    devices = await DeviceService.lookup(db, q, limit)
+    return devices
+
 @router.get("/", response_model=List[Device])
+@admission_priority(LOW)
 async def get_devices(db: Session = Depends(get_db)):
     """Get all devices"""
     devices = await DeviceService.get_all(db)
     return devices
 
+@router.get("/batch", response_model=DeviceBatch)
+async def get_devices_batch(ids: List[int] = Depends(batch_ids), db: Session = Depends(get_db)):
+    """Get several devices by ID in one call"""
+    items, missing = await DeviceService.get_many(db, ids)
+    return {"items": items, "missing": missing}
+
+@router.post("/batch", response_model=DeviceBatch)
+@admission_priority(NORMAL)
+async def post_devices_batch(batch: BatchGetRequest, db: Session = Depends(get_db)):
+    """Get several devices by ID, for ID lists too long for a query string"""
+    items, missing = await DeviceService.get_many(db, check_batch_size(batch.ids))
+    return {"items": items, "missing": missing}
+
 @router.get("/{device_id}", response_model=Device)
-async def get_device(device_id: int, db: Session = Depends(get_db)):
+async def get_device(device_id: int, response: Response, db: Session = Depends(get_db)):
     """Get a specific device by ID"""
     device = await DeviceService.get_by_id(db, device_id)
     if not device:
@@ -40,6 +72,7 @@ async def get_device(device_id: int, db: Session = Depends(get_db)):
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Device not found"
         )
+    response.headers["ETag"] = etag(device.version)
     return device
 
 @router.post("/", response_model=Device, status_code=status.HTTP_201_CREATED)
@@ -49,14 +82,15 @@ async def create_device(device_data: DeviceCreate, db: Session = Depends(get_db)
     return device
 
 @router.put("/{device_id}", response_model=Device)
-async def update_device(device_id: int, device_data: DeviceUpdate, db: Session = Depends(get_db)):
+async def update_device(device_id: int, device_data: DeviceUpdate, response: Response, expected_version: Optional[int] = Depends(if_match_version), db: Session = Depends(get_db)):
     """Update a device"""
-    device = await DeviceService.update(db, device_id, device_data)
+    device = await DeviceService.update(db, device_id, device_data, expected_version)
     if not device:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Device not found"
         )
+    response.headers["ETag"] = etag(device.version)
     return device
 
 @router.delete("/{device_id}", status_code=status.HTTP_204_NO_CONTENT)
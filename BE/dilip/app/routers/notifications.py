@@ -2,12 +2,14 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from typing import List
 from app.database import get_db
+from app.middleware.admission import LOW, admission_priority
 from app.services.notification_service import NotificationService
 from app.schemas import Notification, NotificationCreate, NotificationUpdate
 
 router = APIRouter(prefix="/notifications", tags=["notifications"])
 
 @router.get("/", response_model=List[Notification])
+@admission_priority(LOW)
 async def get_notifications(user_id: int = None, type: str = None, db: Session = Depends(get_db)):
     """Get notifications (optionally filter by user_id and type)"""
     return await NotificationService.get_all(db, user_id=user_id, type=type)
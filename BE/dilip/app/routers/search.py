@@ -0,0 +1,22 @@
+from fastapi import APIRouter, Query
+from typing import Optional
+from app.config import settings
+from app.services.search_service import SearchService
+from app.schemas import SearchResults
+from app.middleware.admission import LOW, admission_priority
+
+router = APIRouter(tags=["search"])
+
+@router.get("/search", response_model=SearchResults)
+@admission_priority(LOW)
+async def search(
+    q: str = Query(..., min_length=1),
+    limit: Optional[int] = Query(None, ge=1, le=50),
+    timeout_ms: Optional[int] = Query(None, ge=10, le=5000),
+):
+    """Search users, clients, devices, service requests and company assets at once"""
+    return await SearchService.search(
+        q,
+        per_entity_limit=limit or settings.SEARCH_PER_ENTITY_LIMIT,
+        timeout_ms=timeout_ms or settings.SEARCH_TIMEOUT_MS,
+    )
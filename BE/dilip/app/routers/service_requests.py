@@ -1,75 +1,110 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, Query, status
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from app.database import get_db
-from app.services.service_request_service import ServiceRequestService
-from app.schemas import ServiceRequest, ServiceRequestCreate, ServiceRequestUpdate, ServiceRequestList
+from app.services.service_request_service import ServiceRequestService, INCLUDABLE
+from app.single_flight import single_flight
+from app.dependencies import batch_ids, check_batch_size, etag, if_match_version
+from app.middleware.admission import LOW, NORMAL, admission_priority
+from app.schemas import ServiceRequest, ServiceRequestExpanded, ServiceRequestCreate, ServiceRequestUpdate, ServiceRequestList, ServiceRequestBatch, BatchGetRequest
 
 router = APIRouter(prefix="/service-requests", tags=["service-requests"])
 
-@router.get("/", response_model=List[ServiceRequest])
-async def get_service_requests(db: Session = Depends(get_db)):
+def parse_include(include: Optional[str] = Query(None, description="Comma-separated relationships to embed: " + ", ".join(INCLUDABLE))) -> List[str]:
+    names = list(dict.fromkeys(name.strip() for name in (include or "").split(",") if name.strip()))
+    unknown = [name for name in names if name not in INCLUDABLE]
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown include: {', '.join(unknown)}"
+        )
+    return names
+
+@router.get("/", response_model=List[ServiceRequestExpanded], response_model_exclude_unset=True)
+@admission_priority(LOW)
+async def get_service_requests(include: List[str] = Depends(parse_include), db: Session = Depends(get_db)):
     """Get all service requests"""
-    requests = await ServiceRequestService.get_all(db)
-    return requests
+    requests = await ServiceRequestService.get_all(db, include)
+    return [ServiceRequestService.expand(request, include) for request in requests]
 
-@router.get("/{request_id}", response_model=ServiceRequest)
-async def get_service_request(request_id: int, db: Session = Depends(get_db)):
+@router.get("/batch", response_model=ServiceRequestBatch, response_model_exclude_unset=True)
+async def get_service_requests_batch(ids: List[int] = Depends(batch_ids), include: List[str] = Depends(parse_include), db: Session = Depends(get_db)):
+    """Get several service requests by ID in one call"""
+    items, missing = await ServiceRequestService.get_many(db, ids, include)
+    return {"items": [ServiceRequestService.expand(request, include) for request in items], "missing": missing}
+
+@router.post("/batch", response_model=ServiceRequestBatch, response_model_exclude_unset=True)
+@admission_priority(NORMAL)
+async def post_service_requests_batch(batch: BatchGetRequest, include: List[str] = Depends(parse_include), db: Session = Depends(get_db)):
+    """Get several service requests by ID, for ID lists too long for a query string"""
+    items, missing = await ServiceRequestService.get_many(db, check_batch_size(batch.ids), include)
+    return {"items": [ServiceRequestService.expand(request, include) for request in items], "missing": missing}
+
+@router.get("/{request_id}", response_model=ServiceRequestExpanded, response_model_exclude_unset=True)
+async def get_service_request(request_id: int, response: Response, include: List[str] = Depends(parse_include), db: Session = Depends(get_db)):
     """Get a specific service request by ID"""
-    request = await ServiceRequestService.get_by_id(db, request_id)
+    request = await ServiceRequestService.get_by_id(db, request_id, include)
     if not request:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Service request not found"
         )
-    return request
+    response.headers["ETag"] = etag(request.version)
+    return ServiceRequestService.expand(request, include)
 
-@router.get("/ticket/{ticket_id}", response_model=ServiceRequest)
-async def get_service_request_by_ticket(ticket_id: str, db: Session = Depends(get_db)):
+@router.get("/ticket/{ticket_id}", response_model=ServiceRequestExpanded, response_model_exclude_unset=True)
+async def get_service_request_by_ticket(ticket_id: str, include: List[str] = Depends(parse_include), db: Session = Depends(get_db)):
     """Get a service request by ticket ID"""
-    request = await ServiceRequestService.get_by_ticket_id(db, ticket_id)
+    request = await ServiceRequestService.get_by_ticket_id(db, ticket_id, include)
     if not request:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Service request not found"
         )
-    return request
+    return ServiceRequestService.expand(request, include)
 
-@router.get("/client/{client_id}", response_model=List[ServiceRequest])
-async def get_service_requests_by_client(client_id: int, db: Session = Depends(get_db)):
+@router.get("/client/{client_id}", response_model=List[ServiceRequestExpanded], response_model_exclude_unset=True)
+@admission_priority(LOW)
+async def get_service_requests_by_client(client_id: int, include: List[str] = Depends(parse_include), db: Session = Depends(get_db)):
     """Get service requests by client ID"""
-    requests = await ServiceRequestService.get_by_client_id(db, client_id)
-    return requests
+    requests = await ServiceRequestService.get_by_client_id(db, client_id, include)
+    return [ServiceRequestService.expand(request, include) for request in requests]
 
-@router.get("/technician/{technician_id}", response_model=List[ServiceRequest])
-async def get_service_requests_by_technician(technician_id: int, db: Session = Depends(get_db)):
+@router.get("/technician/{technician_id}", response_model=List[ServiceRequestExpanded], response_model_exclude_unset=True)
+@admission_priority(LOW)
+async def get_service_requests_by_technician(technician_id: int, include: List[str] = Depends(parse_include), db: Session = Depends(get_db)):
     """Get service requests by technician ID"""
-    requests = await ServiceRequestService.get_by_technician_id(db, technician_id)
-    return requests
+    requests = await ServiceRequestService.get_by_technician_id(db, technician_id, include)
+    return [ServiceRequestService.expand(request, include) for request in requests]
 
-@router.get("/status/{status}", response_model=List[ServiceRequest])
-async def get_service_requests_by_status(status: str, db: Session = Depends(get_db)):
+@router.get("/status/{status}", response_model=List[ServiceRequestExpanded], response_model_exclude_unset=True)
+@admission_priority(LOW)
+async def get_service_requests_by_status(status: str, include: List[str] = Depends(parse_include), db: Session = Depends(get_db)):
     """Get service requests by status"""
-    requests = await ServiceRequestService.get_by_status(db, status)
-    return requests
+    requests = await ServiceRequestService.get_by_status(db, status, include)
+    return [ServiceRequestService.expand(request, include) for request in requests]
 
-@router.get("/priority/{priority}", response_model=List[ServiceRequest])
-async def get_service_requests_by_priority(priority: str, db: Session = Depends(get_db)):
+@router.get("/priority/{priority}", response_model=List[ServiceRequestExpanded], response_model_exclude_unset=True)
+@admission_priority(LOW)
+async def get_service_requests_by_priority(priority: str, include: List[str] = Depends(parse_include), db: Session = Depends(get_db)):
     """Get service requests by priority"""
-    requests = await ServiceRequestService.get_by_priority(db, priority)
-    return requests
+    requests = await ServiceRequestService.get_by_priority(db, priority, include)
+    return [ServiceRequestService.expand(request, include) for request in requests]
 
-@router.get("/open/tickets", response_model=List[ServiceRequest])
-async def get_open_tickets(db: Session = Depends(get_db)):
+@router.get("/open/tickets", response_model=List[ServiceRequestExpanded], response_model_exclude_unset=True)
+@admission_priority(LOW)
+@single_flight(List[ServiceRequestExpanded], exclude_unset=True)
+async def get_open_tickets(include: List[str] = Depends(parse_include), db: Session = Depends(get_db)):
     """Get all open tickets (open, assigned, in_progress)"""
-    requests = await ServiceRequestService.get_open_tickets(db)
-    return requests
+    requests = await ServiceRequestService.get_open_tickets(db, include)
+    return [ServiceRequestService.expand(request, include) for request in requests]
 
-@router.get("/resolved/today", response_model=List[ServiceRequest])
-async def get_resolved_today(db: Session = Depends(get_db)):
+@router.get("/resolved/today", response_model=List[ServiceRequestExpanded], response_model_exclude_unset=True)
+@admission_priority(LOW)
+async def get_resolved_today(include: List[str] = Depends(parse_include), db: Session = Depends(get_db)):
     """Get tickets resolved today"""
-    requests = await ServiceRequestService.get_resolved_today(db)
-    return requests
+    requests = await ServiceRequestService.get_resolved_today(db, include)
+    return [ServiceRequestService.expand(request, include) for request in requests]
 
 @router.post("/", response_model=ServiceRequest, status_code=status.HTTP_201_CREATED)
 async def create_service_request(request_data: ServiceRequestCreate, db: Session = Depends(get_db)):
@@ -86,14 +121,15 @@ async def create_service_request(request_data: ServiceRequestCreate, db: Session
     return request
 
 @router.put("/{request_id}", response_model=ServiceRequest)
-async def update_service_request(request_id: int, request_data: ServiceRequestUpdate, db: Session = Depends(get_db)):
+async def update_service_request(request_id: int, request_data: ServiceRequestUpdate, response: Response, expected_version: Optional[int] = Depends(if_match_version), db: Session = Depends(get_db)):
     """Update a service request"""
-    request = await ServiceRequestService.update(db, request_id, request_data)
+    request = await ServiceRequestService.update(db, request_id, request_data, expected_version)
     if not request:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Service request not found"
         )
+    response.headers["ETag"] = etag(request.version)
     return request
 
 @router.delete("/{request_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -3,16 +3,32 @@ from sqlalchemy.orm import Session
 from typing import List
 from app.database import get_db
 from app.services.user_service import UserService
-from app.schemas import User, UserCreate, UserUpdate, UserList
+from app.dependencies import batch_ids, check_batch_size
+from app.middleware.admission import LOW, NORMAL, admission_priority
+from app.schemas import User, UserCreate, UserUpdate, UserList, UserBatch, BatchGetRequest
 
 router = APIRouter(prefix="/users", tags=["users"])
 
 @router.get("/", response_model=List[User])
+@admission_priority(LOW)
 async def get_users(db: Session = Depends(get_db)):
     """Get all users"""
     users = await UserService.get_all(db)
     return users
 
+@router.get("/batch", response_model=UserBatch)
+async def get_users_batch(ids: List[int] = Depends(batch_ids), db: Session = Depends(get_db)):
+    """Get several users by ID in one call"""
+    items, missing = await UserService.get_many(db, ids)
+    return {"items": items, "missing": missing}
+
+@router.post("/batch", response_model=UserBatch)
+@admission_priority(NORMAL)
+async def post_users_batch(batch: BatchGetRequest, db: Session = Depends(get_db)):
+    """Get several users by ID, for ID lists too long for a query string"""
+    items, missing = await UserService.get_many(db, check_batch_size(batch.ids))
+    return {"items": items, "missing": missing}
+
 @router.get("/{user_id}", response_model=User)
 async def get_user(user_id: int, db: Session = Depends(get_db)):
     """Get a specific user by ID"""
@@ -25,6 +41,7 @@ async def get_user(user_id: int, db: Session = Depends(get_db)):
     return user
 
 @router.get("/role/{role}", response_model=List[User])
+@admission_priority(LOW)
 async def get_users_by_role(role: str, db: Session = Depends(get_db)):
     """Get users by role"""
     users = await UserService.get_by_role(db, role)
@@ -67,6 +84,7 @@ async def delete_user(user_id: int, db: Session = Depends(get_db)):
     return None
 
 @router.get("/technicians", response_model=List[User])
+@admission_priority(LOW)
 async def get_technicians(db: Session = Depends(get_db)):
     """Get all technicians"""
     return await UserService.get_all_technicians(db)
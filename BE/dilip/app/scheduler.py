@@ -0,0 +1,71 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from app.config import settings
+from app.database import SessionLocal
+from app.services.job_service import JobService
+
+logger = logging.getLogger(__name__)
+
+class PeriodicTask:
+    """Runs an async service call with its own session every `interval_seconds`"""
+
+    def __init__(self, name: str, interval_seconds: float, func: Callable[..., Awaitable], *args):
+        self.name = name
+        self.interval_seconds = interval_seconds
+        self.func = func
+        self.args = args
+
+    async def _call(self):
+        db = SessionLocal()
+        try:
+            await self.func(db, *self.args)
+        finally:
+            db.close()
+
+    async def run_once(self):
+        # Services issue blocking queries, so keep them off the serving event loop
+        await asyncio.to_thread(asyncio.run, self._call())
+
+    async def run_forever(self):
+        while True:
+            try:
+                await self.run_once()
+            except Exception:
+                logger.exception("Periodic task %s failed", self.name)
+            await asyncio.sleep(self.interval_seconds)
+
+class PeriodicJob(PeriodicTask):
+    """Enqueues a job for app/worker.py every `interval_seconds`, once across all processes.
+
+    Each process checks whether the job is due every
+    JOB_SCHEDULE_CHECK_SECONDS (or interval, if shorter); task_runs decides
+    which one enqueues it, so restarts and extra workers add no runs."""
+
+    def __init__(self, job_name: str, interval_seconds: float, payload: Optional[Dict[str, Any]] = None, queue: str = "default"):
+        super().__init__(
+            job_name,
+            min(interval_seconds, settings.JOB_SCHEDULE_CHECK_SECONDS),
+            JobService.enqueue_periodic,
+            job_name,
+            interval_seconds,
+            payload,
+            queue,
+        )
+
+class Scheduler:
+    def __init__(self):
+        self.tasks: List[PeriodicTask] = []
+        self._running: List[asyncio.Task] = []
+
+    def add(self, task: PeriodicTask):
+        self.tasks.append(task)
+
+    def start(self):
+        self._running = [asyncio.create_task(task.run_forever(), name=task.name) for task in self.tasks]
+
+    async def stop(self):
+        for running in self._running:
+            running.cancel()
+        await asyncio.gather(*self._running, return_exceptions=True)
+        self._running = []
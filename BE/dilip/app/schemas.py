@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr
-from typing import Optional, List
+from typing import Any, Optional, List, Dict
 from datetime import datetime, date
 
 # Base schemas
@@ -56,6 +56,7 @@ class AssetRequestBase(BaseModel):
     asset_id: Optional[int] = None
     requested_by: int
     request_type: str
+    asset_type: Optional[str] = None
     reason: str
     status: str
 
@@ -142,6 +143,7 @@ class AssetRequestUpdate(BaseModel):
     asset_id: Optional[int] = None
     requested_by: Optional[int] = None
     request_type: Optional[str] = None
+    asset_type: Optional[str] = None
     reason: Optional[str] = None
     status: Optional[str] = None
 
@@ -167,6 +169,7 @@ class Client(ClientBase):
 
 class Device(DeviceBase):
     id: int
+    version: int
     
     class Config:
         from_attributes = True
@@ -175,12 +178,21 @@ class ServiceRequest(ServiceRequestBase):
     id: int
     created_at: datetime
     updated_at: datetime
+    version: int
     
     class Config:
         from_attributes = True
 
+class ServiceRequestExpanded(ServiceRequest):
+    # Only present when requested with ?include=
+    client: Optional[Client] = None
+    device: Optional[Device] = None
+    assigned_technician: Optional[User] = None
+    submitted_user: Optional[User] = None
+
 class CompanyAsset(CompanyAssetBase):
     id: int
+    version: int
     
     class Config:
         from_attributes = True
@@ -188,6 +200,7 @@ class CompanyAsset(CompanyAssetBase):
 class AssetRequest(AssetRequestBase):
     id: int
     created_at: datetime
+    version: int
     
     class Config:
         from_attributes = True
@@ -200,6 +213,56 @@ class Notification(NotificationBase):
     class Config:
         from_attributes = True
 
+# Batch-get schemas
+class BatchGetRequest(BaseModel):
+    ids: List[int]
+
+class UserBatch(BaseModel):
+    items: List[User]
+    missing: List[int]
+
+class DeviceBatch(BaseModel):
+    items: List[Device]
+    missing: List[int]
+
+class ServiceRequestBatch(BaseModel):
+    items: List[ServiceRequestExpanded]
+    missing: List[int]
+
+class CompanyAssetBatch(BaseModel):
+    items: List[CompanyAsset]
+    missing: List[int]
+
+class AssetRequestBatch(BaseModel):
+    items: List[AssetRequest]
+    missing: List[int]
+
+# Asset request approval
+class AssetRequestApproval(BaseModel):
+    request: AssetRequest
+    asset: Optional[CompanyAsset] = None  # the asset allocated to an assignment request
+
+class MaintenanceDue(BaseModel):
+    asset: CompanyAsset
+    due_date: Optional[date] = None  # None if the asset has never been maintained
+
+# Multi-operation batch schemas
+class BatchOperation(BaseModel):
+    method: str
+    path: str  # may reference earlier results, e.g. "/devices/$0.id"
+    body: Optional[Any] = None  # string values like "$0.id" are replaced by earlier results
+
+class BatchRequest(BaseModel):
+    operations: List[BatchOperation]
+
+class BatchOperationResult(BaseModel):
+    status: int
+    body: Optional[Any] = None
+
+class BatchResponse(BaseModel):
+    committed: bool
+    results: List[BatchOperationResult]
+
 # Dashboard Stats schema
 class DashboardStats(BaseModel):
     total_clients: int
@@ -209,6 +272,29 @@ class DashboardStats(BaseModel):
     pending_requests: int
     resolved_today: int
 
+# Client summary schema
+class ClientSummary(BaseModel):
+    client_id: int
+    total_devices: int
+    devices_by_type: Dict[str, int]
+    devices_by_status: Dict[str, int]
+    open_tickets: int
+    open_tickets_by_priority: Dict[str, int]
+
+# Global search schemas
+class SearchHit(BaseModel):
+    type: str  # 'user', 'client', 'device', 'service_request' or 'company_asset'
+    id: int
+    title: str
+    subtitle: Optional[str] = None
+    score: float
+
+class SearchResults(BaseModel):
+    query: str
+    hits: List[SearchHit]
+    partial: bool
+    degraded: List[str]  # entity types that timed out or failed
+
 # List response schemas
 class UserList(BaseModel):
     users: List[User]
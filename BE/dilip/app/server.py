@@ -0,0 +1,138 @@
+"""Pre-forking launcher for the API.
+
+The parent imports the application once, binds the listening socket and
+forks WEB_WORKERS children that serve it with uvicorn. Nothing opens a
+database connection at import (see database.get_engine), so each child
+starts its own pool, warms it, and only then begins accepting connections.
+
+Workers that exit, e.g. after WEB_MAX_REQUESTS requests, are replaced. On
+SIGTERM or SIGINT the parent asks every worker to stop; uvicorn stops
+accepting, lets in-flight requests finish for up to
+WEB_GRACEFUL_TIMEOUT_SECONDS, and workers still running after that are
+killed.
+"""
+import logging
+import os
+import random
+import signal
+import socket
+import time
+from typing import Set
+import uvicorn
+from app.config import settings
+from app.database import warm_pool
+
+logger = logging.getLogger(__name__)
+
+_POLL_SECONDS = 0.2
+# A worker dying sooner than this after starting is crashing, not being recycled
+_CRASH_BACKOFF_SECONDS = 1.0
+
+def _bind(host: str, port: int) -> socket.socket:
+    # An explicit IPPROTO_TCP, or asyncio does not set TCP_NODELAY on the accepted connections
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM, socket.IPPROTO_TCP)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+def _server(app) -> uvicorn.Server:
+    max_requests = None
+    if settings.WEB_MAX_REQUESTS:
+        max_requests = settings.WEB_MAX_REQUESTS + random.randint(0, settings.WEB_MAX_REQUESTS_JITTER)
+    return uvicorn.Server(uvicorn.Config(
+        app,
+        host=settings.WEB_HOST,
+        port=settings.WEB_PORT,
+        limit_max_requests=max_requests,
+        timeout_graceful_shutdown=settings.WEB_GRACEFUL_TIMEOUT_SECONDS,
+    ))
+
+def _warm_up():
+    try:
+        warm_pool(settings.WEB_POOL_WARMUP_CONNECTIONS)
+    except Exception:
+        # Not fatal: connections are then opened by the first requests instead
+        logger.exception("Could not warm up the database pool")
+
+def _run_worker(app, sock: socket.socket):
+    # uvicorn installs its own handlers once serving; until then take the defaults, not the parent's
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    _warm_up()
+    _server(app).run(sockets=[sock])
+
+def serve(app):
+    """Serve app on WEB_HOST:WEB_PORT until SIGTERM/SIGINT"""
+    if settings.WEB_WORKERS <= 1 or not hasattr(os, "fork"):
+        _warm_up()
+        _server(app).run()
+        return
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(process)d %(levelname)s %(name)s: %(message)s")
+    sock = _bind(settings.WEB_HOST, settings.WEB_PORT)
+    workers: Set[int] = set()
+    started_at = {}
+    stopping = False
+
+    def spawn():
+        pid = os.fork()
+        if pid == 0:
+            status = 0
+            try:
+                _run_worker(app, sock)
+            except BaseException:
+                logger.exception("API worker %s failed", os.getpid())
+                status = 1
+            finally:
+                os._exit(status)
+        workers.add(pid)
+        started_at[pid] = time.monotonic()
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    logger.info("Starting %s API workers on %s:%s", settings.WEB_WORKERS, settings.WEB_HOST, settings.WEB_PORT)
+    for _ in range(settings.WEB_WORKERS):
+        spawn()
+
+    try:
+        while not stopping:
+            # Only our own children: the job workers run.py starts belong to multiprocessing
+            exited = [(pid, status) for pid, status in (os.waitpid(pid, os.WNOHANG) for pid in list(workers)) if pid]
+            if not exited:
+                time.sleep(_POLL_SECONDS)
+                continue
+            for pid, status in exited:
+                workers.discard(pid)
+                lifetime = time.monotonic() - started_at.pop(pid)
+                code = os.waitstatus_to_exitcode(status)
+                if code == 0:
+                    logger.info("API worker %s exited (recycled); starting a replacement", pid)
+                else:
+                    logger.warning("API worker %s exited with %s; starting a replacement", pid, code)
+                    if lifetime < _CRASH_BACKOFF_SECONDS:
+                        time.sleep(_CRASH_BACKOFF_SECONDS)
+                if not stopping:
+                    spawn()
+    finally:
+        _stop_workers(workers)
+        sock.close()
+
+def _stop_workers(workers: Set[int]):
+    for pid in workers:
+        os.kill(pid, signal.SIGTERM)
+    deadline = time.monotonic() + settings.WEB_GRACEFUL_TIMEOUT_SECONDS + 5
+    while workers and time.monotonic() < deadline:
+        for pid in list(workers):
+            if os.waitpid(pid, os.WNOHANG)[0] == pid:
+                workers.discard(pid)
+        time.sleep(_POLL_SECONDS)
+    for pid in workers:
+        logger.warning("API worker %s did not stop in time; killing it", pid)
+        os.kill(pid, signal.SIGKILL)
+        os.waitpid(pid, 0)
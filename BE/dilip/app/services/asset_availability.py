@@ -0,0 +1,94 @@
+import threading
+from app import schemas
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+# pubsub channel announcing company asset changes
+CHANNEL = "company_assets"
+
+def change_message(asset_id: int, asset=None, version: Optional[int] = None) -> dict:
+    """Describe a company asset's new state (asset=None when it was deleted).
+
+    Messages from different processes can arrive out of order, so each
+    carries the asset's version; a deletion passes one past the deleted
+    row's."""
+    return {
+        "id": asset_id,
+        "version": asset.version if asset is not None else version,
+        "asset": schemas.CompanyAsset.model_validate(asset).model_dump(mode="json") if asset is not None else None,
+    }
+
+def is_current(versions: Dict[int, int], message: dict) -> bool:
+    """Whether message is newer than anything seen for its asset, recording its version if so"""
+    version = message.get("version")
+    if version is None:
+        return True
+    if versions.get(message["id"], 0) >= version:
+        return False
+    versions[message["id"]] = version
+    return True
+
+class AvailabilityIndex:
+    """Available company assets in memory, keyed by (asset_type, location).
+
+    Filled lazily from the database and then kept current from change
+    messages, both local ones and those other processes publish. The last
+    version seen of every asset, available or not, is kept so that a
+    message arriving after a newer one is ignored."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._assets: Dict[int, schemas.CompanyAsset] = {}
+        self._by_key: Dict[Tuple[str, str], Set[int]] = {}
+        self._versions: Dict[int, int] = {}
+        self.loaded = False
+
+    def _add(self, asset: schemas.CompanyAsset):
+        self._assets[asset.id] = asset
+        self._by_key.setdefault((asset.asset_type, asset.location), set()).add(asset.id)
+
+    def _discard(self, asset_id: int):
+        asset = self._assets.pop(asset_id, None)
+        if asset is None:
+            return
+        key = (asset.asset_type, asset.location)
+        self._by_key[key].discard(asset_id)
+        if not self._by_key[key]:
+            del self._by_key[key]
+
+    def load(self, rows_factory):
+        """Rebuild from rows_factory(), which returns every company asset.
+
+        Changes arriving while the rows are read wait and are applied on top."""
+        with self._lock:
+            self._assets.clear()
+            self._by_key.clear()
+            self._versions.clear()
+            for row in rows_factory():
+                self._versions[row.id] = row.version
+                if row.status == "available":
+                    self._add(schemas.CompanyAsset.model_validate(row))
+            self.loaded = True
+
+    def invalidate(self):
+        with self._lock:
+            self.loaded = False
+
+    def apply(self, message: dict):
+        """Apply a change_message()"""
+        with self._lock:
+            if not self.loaded or not is_current(self._versions, message):
+                return
+            self._discard(message["id"])
+            data = message.get("asset")
+            if data is not None and data["status"] == "available":
+                self._add(schemas.CompanyAsset.model_validate(data))
+
+    def query(self, asset_type: Optional[str] = None, location: Optional[str] = None) -> List[schemas.CompanyAsset]:
+        with self._lock:
+            ids: Iterable[int] = (
+                asset_id
+                for (key_type, key_location), asset_ids in self._by_key.items()
+                if (asset_type is None or key_type == asset_type) and (location is None or key_location == location)
+                for asset_id in asset_ids
+            )
+            return sorted((self._assets[asset_id] for asset_id in ids), key=lambda asset: asset.id)
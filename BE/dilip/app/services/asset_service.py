@@ -1,10 +1,85 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, func
+from sqlalchemy import and_, or_, func, select
 from app.models import CompanyAsset, AssetRequest
+from app import pubsub, schemas
+from app.database import after_commit
 from app.schemas import CompanyAssetCreate, CompanyAssetUpdate, AssetRequestCreate, AssetRequestUpdate
-from typing import List, Optional
+from app.services.batch_service import BatchService
+from app.services.asset_availability import AvailabilityIndex, CHANNEL as ASSET_CHANNEL, change_message
+from app.services.maintenance_service import maintenance_schedule
+from app.services.text_search import PrefixTrie, contains_pattern, supports_trigram
+from app.services.writes import delete_returning, update_returning
+from app.exceptions import AssetAllocationError
+from typing import List, Optional, Tuple
 from datetime import date
 
+# Fallback lookup index for databases without pg_trgm (SQLite test mode)
+_tag_trie = PrefixTrie()
+
+# Available assets by type and location; other processes' changes arrive over pubsub
+_availability = AvailabilityIndex()
+
+def _asset_changed(message: dict):
+    _availability.apply(message)
+    maintenance_schedule.apply(message)
+
+def _resync_assets():
+    _availability.invalidate()
+    maintenance_schedule.invalidate()
+
+pubsub.subscribe(ASSET_CHANNEL, _asset_changed, resync=_resync_assets)
+
+# claim-next gives up after losing this many races for the last matching asset
+_CLAIM_NEXT_ATTEMPTS = 5
+
+async def _allocate_asset(db: Session, db_request: AssetRequest) -> Optional[CompanyAsset]:
+    """Lock an available asset for an assignment request and assign it to the requester.
+
+    SKIP LOCKED lets concurrent approvals of the same asset type each take a
+    different row instead of queueing behind one another."""
+    if db_request.asset_id is not None:
+        candidates = select(CompanyAsset.id).where(CompanyAsset.id == db_request.asset_id)
+    else:
+        candidates = select(CompanyAsset.id).where(CompanyAsset.asset_type == db_request.asset_type).order_by(CompanyAsset.id)
+    asset_id = db.scalar(candidates.where(CompanyAsset.status == 'available').limit(1).with_for_update(skip_locked=True))
+    if asset_id is None:
+        return None
+    # The status guard also covers databases without row locks (SQLite)
+    db_asset, _ = await update_returning(
+        db, CompanyAsset, asset_id,
+        {"status": "assigned_to_tech", "assigned_to": db_request.requested_by},
+        CompanyAsset.status == 'available',
+    )
+    return db_asset
+
+async def _approve(db: Session, db_request: AssetRequest) -> Tuple[AssetRequest, Optional[CompanyAsset]]:
+    if db_request.status != 'pending':
+        raise AssetAllocationError(f"Asset request {db_request.id} is already {db_request.status}")
+    db_asset = None
+    if db_request.request_type == 'assignment':
+        if db_request.asset_id is None and db_request.asset_type is None:
+            raise AssetAllocationError(f"Asset request {db_request.id} names neither an asset nor an asset type")
+        db_asset = await _allocate_asset(db, db_request)
+        if db_asset is None:
+            db.rollback()
+            wanted = f"asset {db_request.asset_id}" if db_request.asset_id is not None else f"{db_request.asset_type} asset"
+            raise AssetAllocationError(f"No available {wanted} for asset request {db_request.id}")
+
+    values = {"status": "approved"}
+    if db_asset is not None:
+        values["asset_id"] = db_asset.id
+    db_request, _ = await update_returning(db, AssetRequest, db_request.id, values, AssetRequest.status == 'pending')
+    if db_request is None:
+        db.rollback()
+        raise AssetAllocationError("Asset request was decided by someone else")
+    message = change_message(db_asset.id, db_asset) if db_asset is not None else None
+    if message:
+        pubsub.publish(db, ASSET_CHANNEL, message)
+    db.commit()
+    if message:
+        after_commit(db, _asset_changed, message)
+    return db_request, db_asset
+
 class AssetService:
     # Company Assets methods
     @staticmethod
@@ -15,6 +90,10 @@ class AssetService:
     async def get_asset_by_id(db: Session, asset_id: int) -> Optional[CompanyAsset]:
         return db.query(CompanyAsset).filter(CompanyAsset.id == asset_id).first()
     
+    @staticmethod
+    async def get_assets_by_ids(db: Session, asset_ids: List[int]) -> Tuple[List[CompanyAsset], List[int]]:
+        return await BatchService.get_many(db, CompanyAsset, asset_ids)
+    
     @staticmethod
     async def get_asset_by_tag(db: Session, asset_tag: str) -> Optional[CompanyAsset]:
         return db.query(CompanyAsset).filter(CompanyAsset.asset_tag == asset_tag).first()
@@ -32,39 +111,73 @@ class AssetService:
         return db.query(CompanyAsset).filter(CompanyAsset.assigned_to == user_id).all()
     
     @staticmethod
-    async def get_available_assets(db: Session) -> List[CompanyAsset]:
-        return db.query(CompanyAsset).filter(CompanyAsset.status == 'available').all()
+    async def load_availability(db: Session):
+        _availability.load(lambda: db.query(CompanyAsset).all())
+    
+    @staticmethod
+    async def get_available_assets(db: Session, asset_type: Optional[str] = None, location: Optional[str] = None) -> List[schemas.CompanyAsset]:
+        """Available assets from the in-memory index; only the first call after startup or a resync reads the table"""
+        if not _availability.loaded:
+            await AssetService.load_availability(db)
+        return _availability.query(asset_type, location)
+    
+    @staticmethod
+    async def lookup_assets(db: Session, q: str, limit: int = 20) -> List[CompanyAsset]:
+        """Fuzzy match company assets on asset tag, best match first"""
+        if supports_trigram(db):
+            return db.query(CompanyAsset).filter(
+                CompanyAsset.asset_tag.op("%")(q) | CompanyAsset.asset_tag.ilike(contains_pattern(q))
+            ).order_by(func.similarity(CompanyAsset.asset_tag, q).desc(), CompanyAsset.id).limit(limit).all()
+
+        if not _tag_trie.loaded:
+            _tag_trie.load(db.query(CompanyAsset.id, CompanyAsset.asset_tag))
+        ranked = _tag_trie.search(q, limit)
+        if not ranked:
+            return []
+        assets = {asset.id: asset for asset in db.query(CompanyAsset).filter(CompanyAsset.id.in_([asset_id for asset_id, _ in ranked]))}
+        return [assets[asset_id] for asset_id, _ in ranked if asset_id in assets]
     
     @staticmethod
     async def create_asset(db: Session, asset_data: CompanyAssetCreate) -> CompanyAsset:
         db_asset = CompanyAsset(**asset_data.dict())
         db.add(db_asset)
+        db.flush()
+        message = change_message(db_asset.id, db_asset)
+        pubsub.publish(db, ASSET_CHANNEL, message)
         db.commit()
         db.refresh(db_asset)
+        after_commit(db, _asset_changed, message)
+        if _tag_trie.loaded:
+            after_commit(db, _tag_trie.insert, db_asset.id, db_asset.asset_tag)
         return db_asset
     
     @staticmethod
-    async def update_asset(db: Session, asset_id: int, asset_data: CompanyAssetUpdate) -> Optional[CompanyAsset]:
-        db_asset = db.query(CompanyAsset).filter(CompanyAsset.id == asset_id).first()
+    async def update_asset(db: Session, asset_id: int, asset_data: CompanyAssetUpdate, expected_version: Optional[int] = None) -> Optional[CompanyAsset]:
+        update_data = asset_data.dict(exclude_unset=True)
+        db_asset, _ = await update_returning(db, CompanyAsset, asset_id, update_data, expected_version=expected_version)
         if not db_asset:
             return None
         
-        update_data = asset_data.dict(exclude_unset=True)
-        for field, value in update_data.items():
-            setattr(db_asset, field, value)
-        
+        message = change_message(db_asset.id, db_asset)
+        pubsub.publish(db, ASSET_CHANNEL, message)
         db.commit()
-        db.refresh(db_asset)
+        after_commit(db, _asset_changed, message)
+        if _tag_trie.loaded and "asset_tag" in update_data:
+            after_commit(db, _tag_trie.remove, db_asset.id)
+            after_commit(db, _tag_trie.insert, db_asset.id, db_asset.asset_tag)
         return db_asset
     
     @staticmethod
     async def delete_asset(db: Session, asset_id: int) -> bool:
-        db_asset = db.query(CompanyAsset).filter(CompanyAsset.id == asset_id).first()
-        if not db_asset:
+        deleted = await delete_returning(db, CompanyAsset, asset_id, returning=("version",))
+        if not deleted:
             return False
         
-        db.delete(db_asset)
+        message = change_message(asset_id, version=deleted.version + 1)
+        pubsub.publish(db, ASSET_CHANNEL, message)
         db.commit()
+        after_commit(db, _asset_changed, message)
+        after_commit(db, _tag_trie.remove, asset_id)
         return True
     
     # Asset Requests methods
@@ -76,6 +189,10 @@ class AssetService:
     async def get_request_by_id(db: Session, request_id: int) -> Optional[AssetRequest]:
         return db.query(AssetRequest).filter(AssetRequest.id == request_id).first()
     
+    @staticmethod
+    async def get_requests_by_ids(db: Session, request_ids: List[int]) -> Tuple[List[AssetRequest], List[int]]:
+        return await BatchService.get_many(db, AssetRequest, request_ids)
+    
     @staticmethod
     async def get_requests_by_status(db: Session, status: str) -> List[AssetRequest]:
         return db.query(AssetRequest).filter(AssetRequest.status == status).all()
@@ -101,25 +218,65 @@ class AssetService:
         return db_request
     
     @staticmethod
-    async def update_request(db: Session, request_id: int, request_data: AssetRequestUpdate) -> Optional[AssetRequest]:
-        db_request = db.query(AssetRequest).filter(AssetRequest.id == request_id).first()
+    async def update_request(db: Session, request_id: int, request_data: AssetRequestUpdate, expected_version: Optional[int] = None) -> Optional[AssetRequest]:
+        db_request, _ = await update_returning(db, AssetRequest, request_id, request_data.dict(exclude_unset=True), expected_version=expected_version)
         if not db_request:
             return None
         
-        update_data = request_data.dict(exclude_unset=True)
-        for field, value in update_data.items():
-            setattr(db_request, field, value)
-        
         db.commit()
-        db.refresh(db_request)
         return db_request
     
     @staticmethod
     async def delete_request(db: Session, request_id: int) -> bool:
-        db_request = db.query(AssetRequest).filter(AssetRequest.id == request_id).first()
-        if not db_request:
+        if not await delete_returning(db, AssetRequest, request_id):
             return False
         
-        db.delete(db_request)
         db.commit()
-        return True 
\ No newline at end of file
+        return True
+    
+    @staticmethod
+    async def approve_request(db: Session, request_id: int) -> Optional[Tuple[AssetRequest, Optional[CompanyAsset]]]:
+        """Approve a pending request, allocating an asset to assignment requests, in one transaction.
+
+        Returns None if the request does not exist; raises AssetAllocationError
+        if it is not pending or no suitable asset is available."""
+        db_request = db.scalar(select(AssetRequest).where(AssetRequest.id == request_id).with_for_update())
+        if not db_request:
+            return None
+        return await _approve(db, db_request)
+    
+    @staticmethod
+    async def claim_next_request(db: Session, request_type: Optional[str] = None) -> Optional[Tuple[AssetRequest, Optional[CompanyAsset]]]:
+        """Approve the oldest pending request that can be fulfilled now.
+
+        Requests being approved by someone else are skipped rather than waited
+        for, so parallel approvers each get a different one. Returns None when
+        nothing is left to approve."""
+        fulfillable = or_(
+            AssetRequest.request_type != 'assignment',
+            select(CompanyAsset.id).where(
+                CompanyAsset.status == 'available',
+                or_(
+                    CompanyAsset.id == AssetRequest.asset_id,
+                    and_(AssetRequest.asset_id.is_(None), CompanyAsset.asset_type == AssetRequest.asset_type),
+                ),
+            ).exists(),
+        )
+        skipped: List[int] = []
+        for _ in range(_CLAIM_NEXT_ATTEMPTS):
+            query = select(AssetRequest).where(AssetRequest.status == 'pending', fulfillable)
+            if request_type is not None:
+                query = query.where(AssetRequest.request_type == request_type)
+            if skipped:
+                query = query.where(AssetRequest.id.not_in(skipped))
+            db_request = db.scalar(
+                query.order_by(AssetRequest.created_at, AssetRequest.id).limit(1).with_for_update(skip_locked=True, of=AssetRequest)
+            )
+            if db_request is None:
+                return None
+            try:
+                return await _approve(db, db_request)
+            except AssetAllocationError:
+                # Another approver took the last matching asset after our check
+                skipped.append(db_request.id)
+        return None
@@ -0,0 +1,22 @@
+from sqlalchemy.orm import Session, Query
+from sqlalchemy import BigInteger, any_, bindparam
+from sqlalchemy.dialects import postgresql
+from typing import List, Optional, Tuple
+
+class BatchService:
+    @staticmethod
+    async def get_many(db: Session, model, ids: List[int], query: Optional[Query] = None) -> Tuple[List, List[int]]:
+        """Fetch rows by ID in one query.
+
+        Returns (rows in the order of ids with duplicates dropped, ids that were not found)."""
+        ids = list(dict.fromkeys(ids))
+        if not ids:
+            return [], []
+        query = query if query is not None else db.query(model)
+        if db.get_bind().dialect.name == "postgresql":
+            # A single array parameter keeps the statement text (and plan) the same for any number of ids
+            query = query.filter(model.id == any_(bindparam("ids", value=ids, type_=postgresql.ARRAY(BigInteger))))
+        else:
+            query = query.filter(model.id.in_(ids))
+        found = {row.id: row for row in query}
+        return [found[i] for i in ids if i in found], [i for i in ids if i not in found]
@@ -3,6 +3,8 @@ from sqlalchemy.orm import Session
 from sqlalchemy import and_
 from app.models import User
 from app.schemas import UserCreate, UserUpdate
+from app.services.user_service import _commit_user_change, _user_values
+from app.services.writes import delete_returning, update_returning
 from typing import List, Optional
 
 class ClientService:
@@ -22,7 +24,7 @@ class ClientService:
     async def create(db: Session, client_data: UserCreate) -> User:
         # Ensure role is set to client
         client_data.role = 'client'
-        db_client = User(**client_data.dict())
+        db_client = User(**await _user_values(client_data))
         db.add(db_client)
         db.commit()
         db.refresh(db_client)
@@ -30,24 +32,17 @@ class ClientService:
     
     @staticmethod
     async def update(db: Session, client_id: int, client_data: UserUpdate) -> Optional[User]:
-        db_client = db.query(User).filter(User.id == client_id, User.role == 'client').first()
+        db_client, _ = await update_returning(db, User, client_id, await _user_values(client_data, exclude_unset=True), User.role == 'client')
         if not db_client:
             return None
         
-        update_data = client_data.dict(exclude_unset=True)
-        for field, value in update_data.items():
-            setattr(db_client, field, value)
-        
-        db.commit()
-        db.refresh(db_client)
+        _commit_user_change(db, client_id)
         return db_client
     
     @staticmethod
     async def delete(db: Session, client_id: int) -> bool:
-        db_client = db.query(User).filter(User.id == client_id, User.role == 'client').first()
-        if not db_client:
+        if not await delete_returning(db, User, client_id, User.role == 'client'):
             return False
         
-        db.delete(db_client)
-        db.commit()
+        _commit_user_change(db, client_id)
         return True
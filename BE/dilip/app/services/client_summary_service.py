@@ -0,0 +1,104 @@
+from collections import Counter
+from sqlalchemy.orm import Session
+from sqlalchemy import func, literal, delete, insert, select
+from sqlalchemy.dialects import postgresql, sqlite
+from app.models import Client, Device, ServiceRequest, ClientSummaryCount
+from app.schemas import ClientSummary
+from typing import Dict, Iterable, Optional, Tuple
+
+OPEN_TICKET_STATUSES = ('open', 'assigned', 'in_progress')
+
+# (client_id, metric, key) -> change in count
+Deltas = Dict[Tuple[int, str, str], int]
+
+def _device_keys(device) -> Iterable[Tuple[int, str, str]]:
+    yield device.client_id, 'device_type', device.device_type
+    yield device.client_id, 'device_status', device.status
+
+def _ticket_keys(request) -> Iterable[Tuple[int, str, str]]:
+    if request.status in OPEN_TICKET_STATUSES:
+        yield request.client_id, 'open_ticket_priority', request.priority
+
+def _diff(keys_for, old, new) -> Deltas:
+    deltas = Counter()
+    if old is not None:
+        deltas.subtract(keys_for(old))
+    if new is not None:
+        deltas.update(keys_for(new))
+    return {key: delta for key, delta in deltas.items() if delta}
+
+class ClientSummaryService:
+    @staticmethod
+    def device_deltas(old=None, new=None) -> Deltas:
+        """Counter changes for a device going from `old` to `new` (either may be None).
+
+        Both only need client_id, device_type and status attributes."""
+        return _diff(_device_keys, old, new)
+
+    @staticmethod
+    def ticket_deltas(old=None, new=None) -> Deltas:
+        """Counter changes for a service request going from `old` to `new` (either may be None)"""
+        return _diff(_ticket_keys, old, new)
+
+    @staticmethod
+    async def apply_deltas(db: Session, deltas: Deltas):
+        """Add deltas to the counters in the caller's transaction; the caller commits"""
+        if not deltas:
+            return
+        rows = [
+            {"client_id": client_id, "metric": metric, "key": key, "count": delta}
+            for (client_id, metric, key), delta in deltas.items()
+        ]
+        dialect = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+        stmt = dialect.insert(ClientSummaryCount)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[ClientSummaryCount.client_id, ClientSummaryCount.metric, ClientSummaryCount.key],
+            set_={"count": ClientSummaryCount.count + stmt.excluded.count},
+        )
+        db.execute(stmt, rows)
+
+    @staticmethod
+    async def get_summary(db: Session, client_id: int) -> Optional[ClientSummary]:
+        if db.query(Client.id).filter(Client.id == client_id).first() is None:
+            return None
+        counts = {'device_type': {}, 'device_status': {}, 'open_ticket_priority': {}}
+        rows = db.query(ClientSummaryCount).filter(
+            ClientSummaryCount.client_id == client_id,
+            ClientSummaryCount.count > 0
+        ).all()
+        for row in rows:
+            counts[row.metric][row.key] = row.count
+        return ClientSummary(
+            client_id=client_id,
+            total_devices=sum(counts['device_type'].values()),
+            devices_by_type=counts['device_type'],
+            devices_by_status=counts['device_status'],
+            open_tickets=sum(counts['open_ticket_priority'].values()),
+            open_tickets_by_priority=counts['open_ticket_priority'],
+        )
+
+    @staticmethod
+    async def rebuild(db: Session, client_id: Optional[int] = None) -> int:
+        """Recompute counters from devices and service requests, for one client or all.
+
+        Returns the number of counter rows written."""
+        clear = delete(ClientSummaryCount)
+        if client_id is not None:
+            clear = clear.where(ClientSummaryCount.client_id == client_id)
+        db.execute(clear)
+
+        sources = [
+            select(Device.client_id, literal('device_type'), Device.device_type, func.count()).group_by(Device.client_id, Device.device_type),
+            select(Device.client_id, literal('device_status'), Device.status, func.count()).group_by(Device.client_id, Device.status),
+            select(ServiceRequest.client_id, literal('open_ticket_priority'), ServiceRequest.priority, func.count())
+                .where(ServiceRequest.status.in_(OPEN_TICKET_STATUSES))
+                .group_by(ServiceRequest.client_id, ServiceRequest.priority),
+        ]
+        written = 0
+        columns = [ClientSummaryCount.client_id, ClientSummaryCount.metric, ClientSummaryCount.key, ClientSummaryCount.count]
+        for source in sources:
+            if client_id is not None:
+                source = source.where(source.selected_columns[0] == client_id)
+            written += db.execute(insert(ClientSummaryCount).from_select(columns, source)).rowcount
+        db.commit()
+        return written
@@ -1,8 +1,17 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from sqlalchemy import and_, or_, func
+from app.database import after_commit
 from app.models import Device
 from app.schemas import DeviceCreate, DeviceUpdate
-from typing import List, Optional
+from app.services.batch_service import BatchService
+from app.services.client_summary_service import ClientSummaryService
+from app.services.text_search import PrefixTrie, contains_pattern, supports_trigram
+from app.services.writes import delete_returning, update_returning
+from typing import List, Optional, Tuple
+from datetime import date, timedelta
+
+# Fallback lookup index for databases without pg_trgm (SQLite test mode)
+_lookup_trie = PrefixTrie()
 
 class DeviceService:
     @staticmethod
@@ -13,6 +22,10 @@ class DeviceService:
     async def get_by_id(db: Session, device_id: int) -> Optional[Device]:
         return db.query(Device).filter(Device.id == device_id).first()
     
+    @staticmethod
+    async def get_many(db: Session, device_ids: List[int]) -> Tuple[List[Device], List[int]]:
+        return await BatchService.get_many(db, Device, device_ids)
+    
     @staticmethod
     async def get_by_client_id(db: Session, client_id: int) -> List[Device]:
         return db.query(Device).filter(Device.client_id == client_id).all()
@@ -25,34 +38,75 @@ class DeviceService:
     async def get_by_device_type(db: Session, device_type: str) -> List[Device]:
         return db.query(Device).filter(Device.device_type == device_type).all()
     
+    @staticmethod
+    async def get_warranty_expiring(db: Session, within_days: int, client_id: Optional[int] = None) -> List[Device]:
+        today = date.today()
+        query = db.query(Device).filter(
+            Device.warranty_expiry >= today,
+            Device.warranty_expiry <= today + timedelta(days=within_days)
+        )
+        if client_id is not None:
+            query = query.filter(Device.client_id == client_id)
+        return query.order_by(Device.warranty_expiry, Device.client_id).all()
+    
+    @staticmethod
+    async def lookup(db: Session, q: str, limit: int = 20) -> List[Device]:
+        """Fuzzy match devices on serial number or device code, best match first"""
+        if supports_trigram(db):
+            pattern = contains_pattern(q)
+            score = func.greatest(func.similarity(Device.serial_number, q), func.similarity(Device.device_code, q))
+            return db.query(Device).filter(
+                or_(
+                    Device.serial_number.op("%")(q),
+                    Device.device_code.op("%")(q),
+                    Device.serial_number.ilike(pattern),
+                    Device.device_code.ilike(pattern),
+                )
+            ).order_by(score.desc(), Device.id).limit(limit).all()
+
+        if not _lookup_trie.loaded:
+            _lookup_trie.load(db.query(Device.id, Device.serial_number, Device.device_code))
+        ranked = _lookup_trie.search(q, limit)
+        if not ranked:
+            return []
+        devices = {device.id: device for device in db.query(Device).filter(Device.id.in_([device_id for device_id, _ in ranked]))}
+        return [devices[device_id] for device_id, _ in ranked if device_id in devices]
+
     @staticmethod
     async def create(db: Session, device_data: DeviceCreate) -> Device:
         db_device = Device(**device_data.dict())
         db.add(db_device)
+        await ClientSummaryService.apply_deltas(db, ClientSummaryService.device_deltas(new=db_device))
         db.commit()
         db.refresh(db_device)
+        if _lookup_trie.loaded:
+            after_commit(db, _lookup_trie.insert, db_device.id, db_device.serial_number, db_device.device_code)
         return db_device
     
     @staticmethod
-    async def update(db: Session, device_id: int, device_data: DeviceUpdate) -> Optional[Device]:
-        db_device = db.query(Device).filter(Device.id == device_id).first()
+    async def update(db: Session, device_id: int, device_data: DeviceUpdate, expected_version: Optional[int] = None) -> Optional[Device]:
+        update_data = device_data.dict(exclude_unset=True)
+        db_device, before = await update_returning(
+            db, Device, device_id, update_data, expected_version=expected_version,
+            previous=("client_id", "device_type", "status"),
+        )
         if not db_device:
             return None
         
-        update_data = device_data.dict(exclude_unset=True)
-        for field, value in update_data.items():
-            setattr(db_device, field, value)
-        
+        await ClientSummaryService.apply_deltas(db, ClientSummaryService.device_deltas(before, db_device))
         db.commit()
-        db.refresh(db_device)
+        if _lookup_trie.loaded and ("serial_number" in update_data or "device_code" in update_data):
+            after_commit(db, _lookup_trie.remove, db_device.id)
+            after_commit(db, _lookup_trie.insert, db_device.id, db_device.serial_number, db_device.device_code)
         return db_device
     
     @staticmethod
     async def delete(db: Session, device_id: int) -> bool:
-        db_device = db.query(Device).filter(Device.id == device_id).first()
-        if not db_device:
+        deleted = await delete_returning(db, Device, device_id, returning=("client_id", "device_type", "status"))
+        if not deleted:
             return False
         
-        db.delete(db_device)
+        await ClientSummaryService.apply_deltas(db, ClientSummaryService.device_deltas(old=deleted))
         db.commit()
-        return True 
\ No newline at end of file
+        after_commit(db, _lookup_trie.remove, device_id)
+        return True
\ No newline at end of file
@@ -0,0 +1,156 @@
+import json
+import random
+from sqlalchemy.orm import Session
+from sqlalchemy import case, func, select, text, update
+from sqlalchemy.exc import IntegrityError
+from app.config import settings
+from app.models import Job, TaskRun
+from typing import Any, Dict, List, Optional
+from datetime import datetime, timedelta, timezone
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+def retry_delay(attempts: int) -> float:
+    """Seconds to wait before retrying a job that has failed `attempts` times (exponential, with jitter)"""
+    delay = min(settings.JOB_RETRY_BASE_SECONDS * 2 ** (attempts - 1), settings.JOB_RETRY_MAX_SECONDS)
+    return delay * random.uniform(0.5, 1.0)
+
+class JobService:
+    @staticmethod
+    async def enqueue(
+        db: Session,
+        name: str,
+        payload: Optional[Dict[str, Any]] = None,
+        queue: str = "default",
+        priority: int = 0,
+        delay_seconds: float = 0,
+        max_attempts: Optional[int] = None,
+    ) -> Job:
+        """Add a job in the caller's transaction; the caller commits.
+
+        Enqueueing alongside a write means the job only becomes visible to
+        workers if that write commits."""
+        db_job = Job(
+            queue=queue,
+            name=name,
+            payload=json.dumps(payload or {}),
+            priority=priority,
+            max_attempts=max_attempts or settings.JOB_MAX_ATTEMPTS,
+            run_at=_now() + timedelta(seconds=delay_seconds),
+        )
+        db.add(db_job)
+        db.flush()
+        return db_job
+
+    @staticmethod
+    async def enqueue_periodic(
+        db: Session,
+        name: str,
+        interval_seconds: float,
+        payload: Optional[Dict[str, Any]] = None,
+        queue: str = "default",
+    ) -> Optional[Job]:
+        """Enqueue a job unless one of that name was enqueued within the last `interval_seconds`.
+
+        Every API process schedules periodic jobs, so the run is claimed in
+        task_runs first: a conditional UPDATE (or the first INSERT) that only
+        one process can win per interval. Commits; returns None if another
+        process has the interval."""
+        now = _now()
+        claimed = db.execute(
+            update(TaskRun).where(
+                TaskRun.name == name,
+                TaskRun.last_run_at <= now - timedelta(seconds=interval_seconds),
+            ).values(last_run_at=now)
+        ).rowcount
+        if not claimed:
+            if db.get(TaskRun, name) is not None:
+                db.rollback()
+                return None
+            db.add(TaskRun(name=name, last_run_at=now))
+            try:
+                db.flush()
+            except IntegrityError:
+                # Another process recorded the first run meanwhile
+                db.rollback()
+                return None
+        db_job = await JobService.enqueue(db, name, payload, queue=queue)
+        db.commit()
+        return db_job
+
+    @staticmethod
+    async def get_by_id(db: Session, job_id: int) -> Optional[Job]:
+        return db.query(Job).filter(Job.id == job_id).first()
+
+    @staticmethod
+    async def claim(db: Session, queue: str, queue_limit: int, wanted: int, worker_id: str) -> List[Job]:
+        """Mark up to `wanted` due jobs of a queue as running by this worker and return them.
+
+        Never lets more than queue_limit jobs of the queue run at once across
+        all workers. On PostgreSQL, competing workers skip rows another
+        worker has locked rather than waiting for them."""
+        postgres = db.get_bind().dialect.name == "postgresql"
+        if postgres:
+            # Serialize claimers of this queue so the running count below stays true until commit
+            db.execute(text("SELECT pg_advisory_xact_lock(hashtext(:key))"), {"key": f"jobs:{queue}"})
+        greatest, least = (func.greatest, func.least) if postgres else (func.max, func.min)
+
+        now = _now()
+        running = select(func.count()).where(Job.queue == queue, Job.status == 'running').scalar_subquery()
+        due = select(Job.id).where(
+            Job.queue == queue,
+            Job.status == 'queued',
+            Job.run_at <= now,
+        ).order_by(Job.priority.desc(), Job.run_at, Job.id).limit(
+            greatest(0, least(wanted, queue_limit - running))
+        ).with_for_update(skip_locked=True)
+
+        jobs = db.execute(
+            update(Job).where(Job.id.in_(due.scalar_subquery())).values(
+                status='running',
+                attempts=Job.attempts + 1,
+                locked_by=worker_id,
+                locked_at=now,
+            ).returning(Job)
+        ).scalars().all()
+        db.commit()
+        return sorted(jobs, key=lambda job: (-job.priority, job.run_at, job.id))
+
+    @staticmethod
+    async def complete(db: Session, job: Job):
+        db.execute(
+            update(Job).where(Job.id == job.id, Job.status == 'running', Job.locked_by == job.locked_by)
+            .values(status='succeeded', locked_by=None, locked_at=None, finished_at=_now(), last_error=None)
+        )
+        db.commit()
+
+    @staticmethod
+    async def fail(db: Session, job: Job, error: str, retry: bool = True):
+        """Schedule the job's next attempt with backoff, or mark it failed once its attempts are used up"""
+        if retry and job.attempts < job.max_attempts:
+            values = dict(status='queued', run_at=_now() + timedelta(seconds=retry_delay(job.attempts)))
+        else:
+            values = dict(status='failed', finished_at=_now())
+        # Matching on locked_by leaves the job alone if it was requeued and claimed elsewhere meanwhile
+        db.execute(
+            update(Job).where(Job.id == job.id, Job.status == 'running', Job.locked_by == job.locked_by)
+            .values(locked_by=None, locked_at=None, last_error=error, **values)
+        )
+        db.commit()
+
+    @staticmethod
+    async def requeue_stale(db: Session) -> int:
+        """Put back jobs left running by a worker that died (or fail them if out of attempts)"""
+        cutoff = _now() - timedelta(seconds=settings.JOB_LOCK_TIMEOUT_SECONDS)
+        result = db.execute(
+            update(Job).where(Job.status == 'running', Job.locked_at < cutoff).values(
+                status=case((Job.attempts < Job.max_attempts, 'queued'), else_='failed'),
+                locked_by=None,
+                locked_at=None,
+                run_at=_now(),
+                last_error='Worker lock expired',
+            )
+        )
+        db.commit()
+        return result.rowcount
@@ -0,0 +1,174 @@
+import heapq
+import logging
+import threading
+from sqlalchemy.orm import Session
+from sqlalchemy import case, exists, func, insert, literal, or_, select, text
+from app.config import settings
+from app.models import AssetRequest, CompanyAsset, User
+from app import schemas
+from app.services.asset_availability import is_current
+from app.services.batch_service import BatchService
+from typing import Dict, List, Optional, Tuple
+from datetime import date, timedelta
+
+logger = logging.getLogger(__name__)
+
+# Heap key for assets that have never been maintained: due before anything else
+_NEVER = date.min
+
+class MaintenanceSchedule:
+    """Min-heap of each company asset's next maintenance due date.
+
+    Superseded heap entries are skipped lazily rather than removed, and the
+    heap is rebuilt once they outnumber the live ones."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._heap: List[Tuple[date, int]] = []
+        self._due: Dict[int, date] = {}
+        self._versions: Dict[int, int] = {}  # to ignore change messages older than what is held
+        self.loaded = False
+
+    @staticmethod
+    def due_date(asset_type: str, status: str, last_maintenance: Optional[date]) -> Optional[date]:
+        """_NEVER if never maintained, None if not scheduled (no interval for the type, or in maintenance now)"""
+        interval = settings.MAINTENANCE_INTERVAL_DAYS.get(asset_type)
+        if interval is None or status == 'maintenance':
+            return None
+        return _NEVER if last_maintenance is None else last_maintenance + timedelta(days=interval)
+
+    def _set(self, asset_id: int, due: Optional[date]):
+        if due is None:
+            self._due.pop(asset_id, None)
+        else:
+            self._due[asset_id] = due
+            heapq.heappush(self._heap, (due, asset_id))
+        if len(self._heap) > 2 * len(self._due) + 64:
+            self._heap = [(due, asset_id) for asset_id, due in self._due.items()]
+            heapq.heapify(self._heap)
+
+    def load(self, rows):
+        """Rebuild from (id, asset_type, status, last_maintenance, version) rows"""
+        with self._lock:
+            self._due = {}
+            self._versions = {}
+            for asset_id, asset_type, status, last_maintenance, version in rows:
+                self._versions[asset_id] = version
+                due = self.due_date(asset_type, status, last_maintenance)
+                if due is not None:
+                    self._due[asset_id] = due
+            self._heap = [(due, asset_id) for asset_id, due in self._due.items()]
+            heapq.heapify(self._heap)
+            self.loaded = True
+
+    def invalidate(self):
+        with self._lock:
+            self.loaded = False
+
+    def apply(self, message: dict):
+        """Apply an asset change message (see asset_availability.change_message)"""
+        with self._lock:
+            if not self.loaded or not is_current(self._versions, message):
+                return
+            data = message.get("asset")
+            if data is None:
+                self._set(message["id"], None)
+            else:
+                last_maintenance = date.fromisoformat(data["last_maintenance"]) if data["last_maintenance"] else None
+                self._set(message["id"], self.due_date(data["asset_type"], data["status"], last_maintenance))
+
+    def next_due(self) -> Optional[date]:
+        with self._lock:
+            while self._heap and self._due.get(self._heap[0][1]) != self._heap[0][0]:
+                heapq.heappop(self._heap)
+            return self._heap[0][0] if self._heap else None
+
+    def due_by(self, day: date) -> List[Tuple[int, date]]:
+        """(asset_id, due date) of every asset due on or before day, soonest first"""
+        with self._lock:
+            found, seen = [], set()
+            # Walk the heap from the root, never descending past a node later than day
+            frontier = [(self._heap[0], 0)] if self._heap and self._heap[0][0] <= day else []
+            while frontier:
+                (due, asset_id), index = heapq.heappop(frontier)
+                # Skip superseded entries, and repeats left by a date that changed and changed back
+                if self._due.get(asset_id) == due and asset_id not in seen:
+                    seen.add(asset_id)
+                    found.append((asset_id, due))
+                for child in (2 * index + 1, 2 * index + 2):
+                    if child < len(self._heap) and self._heap[child][0] <= day:
+                        heapq.heappush(frontier, (self._heap[child], child))
+            return found
+
+maintenance_schedule = MaintenanceSchedule()
+
+class MaintenanceService:
+    @staticmethod
+    async def load_schedule(db: Session):
+        maintenance_schedule.load(db.execute(select(CompanyAsset.id, CompanyAsset.asset_type, CompanyAsset.status, CompanyAsset.last_maintenance, CompanyAsset.version)))
+
+    @staticmethod
+    async def get_due(db: Session, on: date) -> List[schemas.MaintenanceDue]:
+        if not maintenance_schedule.loaded:
+            await MaintenanceService.load_schedule(db)
+        due = maintenance_schedule.due_by(on)
+        assets, _ = await BatchService.get_many(db, CompanyAsset, [asset_id for asset_id, _ in due])
+        due_dates = dict(due)
+        return [
+            schemas.MaintenanceDue(asset=asset, due_date=None if due_dates[asset.id] == _NEVER else due_dates[asset.id])
+            for asset in assets
+        ]
+
+    @staticmethod
+    async def run_sweep(db: Session, today: Optional[date] = None) -> int:
+        """Open a pending maintenance request for every asset that has come due.
+
+        One INSERT ... SELECT covers all assets; assets already in maintenance
+        or with a pending maintenance request are left alone. Runs as the
+        "maintenance.sweep" job, enqueued once per
+        MAINTENANCE_SWEEP_INTERVAL_HOURS. Returns the number of requests
+        created."""
+        today = today or date.today()
+        if not maintenance_schedule.loaded:
+            await MaintenanceService.load_schedule(db)
+        next_due = maintenance_schedule.next_due()
+        if next_due is None or next_due > today:
+            return 0
+
+        if db.get_bind().dialect.name == "postgresql":
+            # Keep two workers' sweeps from both passing the NOT EXISTS check
+            db.execute(text("SELECT pg_advisory_xact_lock(hashtext('maintenance-sweep'))"))
+        requester = select(func.min(User.id)).where(User.role == 'admin').scalar_subquery()
+        if db.scalar(select(requester)) is None:
+            logger.warning("Maintenance sweep skipped: there is no admin user to file requests as")
+            return 0
+
+        intervals = settings.MAINTENANCE_INTERVAL_DAYS
+        cutoff = case({asset_type: today - timedelta(days=days) for asset_type, days in intervals.items()}, value=CompanyAsset.asset_type)
+        reason = case({asset_type: f"Preventive maintenance (due every {days} days)" for asset_type, days in intervals.items()}, value=CompanyAsset.asset_type)
+        pending = exists().where(
+            AssetRequest.asset_id == CompanyAsset.id,
+            AssetRequest.request_type == 'maintenance',
+            AssetRequest.status == 'pending',
+        )
+        due_assets = select(
+            CompanyAsset.id,
+            requester,
+            literal('maintenance'),
+            CompanyAsset.asset_type,
+            reason,
+            literal('pending'),
+        ).where(
+            CompanyAsset.asset_type.in_(list(intervals)),
+            CompanyAsset.status != 'maintenance',
+            or_(CompanyAsset.last_maintenance.is_(None), CompanyAsset.last_maintenance <= cutoff),
+            ~pending,
+        )
+        result = db.execute(
+            insert(AssetRequest).from_select(
+                ['asset_id', 'requested_by', 'request_type', 'asset_type', 'reason', 'status'], due_assets
+            )
+        )
+        db.commit()
+        logger.info("Maintenance sweep opened %s requests", result.rowcount)
+        return result.rowcount
@@ -1,6 +1,9 @@
 from sqlalchemy.orm import Session
+from sqlalchemy import insert
 from app.models import Notification
 from app.schemas import NotificationCreate, NotificationUpdate
+from app.config import settings
+from app.services.writes import delete_returning, update_returning
 from typing import List, Optional
 
 class NotificationService:
@@ -25,23 +28,34 @@ class NotificationService:
         db.refresh(db_notification)
         return db_notification
 
+    @staticmethod
+    async def create_many(db: Session, notifications: List[NotificationCreate], batch_size: Optional[int] = None) -> int:
+        """Insert notifications with one multi-row INSERT per batch and a single commit"""
+        batch_size = batch_size or settings.NOTIFICATION_BATCH_SIZE
+        rows = [notification.dict() for notification in notifications]
+        for start in range(0, len(rows), batch_size):
+            db.execute(insert(Notification), rows[start:start + batch_size])
+        db.commit()
+        return len(rows)
+
+    @staticmethod
+    async def send(db: Session, user_ids: List[int], title: str, message: str, type: str) -> int:
+        """Give each user the same notification; the "notifications.send" job's handler"""
+        return await NotificationService.create_many(
+            db, [NotificationCreate(user_id=user_id, title=title, message=message, type=type) for user_id in user_ids]
+        )
+
     @staticmethod
     async def update(db: Session, notification_id: int, notification_data: NotificationUpdate) -> Optional[Notification]:
-        db_notification = db.query(Notification).filter(Notification.id == notification_id).first()
+        db_notification, _ = await update_returning(db, Notification, notification_id, notification_data.dict(exclude_unset=True))
         if not db_notification:
             return None
-        update_data = notification_data.dict(exclude_unset=True)
-        for field, value in update_data.items():
-            setattr(db_notification, field, value)
         db.commit()
-        db.refresh(db_notification)
         return db_notification
 
     @staticmethod
     async def delete(db: Session, notification_id: int) -> bool:
-        db_notification = db.query(Notification).filter(Notification.id == notification_id).first()
-        if not db_notification:
+        if not await delete_returning(db, Notification, notification_id):
             return False
-        db.delete(db_notification)
         db.commit()
         return True 
\ No newline at end of file
@@ -0,0 +1,49 @@
+import asyncio
+import hmac
+from concurrent.futures import ThreadPoolExecutor
+from passlib.context import CryptContext
+from app.config import settings
+from typing import Optional, Tuple
+
+# Hashing takes a large fraction of a second by design, so it runs on its
+# own small pool: the event loop stays free, and a burst of logins queues
+# here instead of occupying every thread of the default executor.
+_executor = ThreadPoolExecutor(max_workers=settings.PASSWORD_HASH_THREADS, thread_name_prefix="password-hash")
+
+_context = CryptContext(
+    schemes=settings.PASSWORD_SCHEMES,
+    deprecated="auto",
+    # bcrypt hashes made with fewer rounds count as outdated and are rehashed
+    bcrypt__rounds=settings.PASSWORD_BCRYPT_ROUNDS,
+    bcrypt__min_rounds=settings.PASSWORD_BCRYPT_ROUNDS,
+)
+
+_dummy_hash: Optional[str] = None
+
+def _verify(password: str, stored: Optional[str]) -> Tuple[bool, Optional[str]]:
+    global _dummy_hash
+    if not stored:
+        # Spend as long as a real check, so a login cannot tell missing users from wrong passwords
+        _dummy_hash = _dummy_hash or _context.hash("")
+        _context.verify(password, _dummy_hash)
+        return False, None
+    if _context.identify(stored, required=False) is None:
+        # A plaintext password from before hashing; upgrade it on a successful login
+        if hmac.compare_digest(password.encode(), stored.encode()):
+            return True, _context.hash(password)
+        return False, None
+    return _context.verify_and_update(password, stored)
+
+async def _run(func, *args):
+    return await asyncio.get_running_loop().run_in_executor(_executor, func, *args)
+
+async def hash_password(password: str) -> str:
+    return await _run(_context.hash, password)
+
+async def verify_password(password: str, stored: Optional[str]) -> Tuple[bool, Optional[str]]:
+    """Check password against a stored hash (None for an unknown user).
+
+    Returns (matches, replacement hash). The replacement is set when the
+    password matched but is stored in plaintext, under an older scheme or
+    with a lower cost than currently configured."""
+    return await _run(_verify, password, stored)
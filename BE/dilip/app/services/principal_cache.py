@@ -0,0 +1,58 @@
+import threading
+import time
+from collections import OrderedDict
+from app import pubsub, schemas
+from app.config import settings
+from typing import Optional, Tuple
+
+# pubsub channel announcing that a user changed or was deleted
+CHANNEL = "users"
+
+class PrincipalCache:
+    """Authenticated users by id, bounded by size (LRU) and age (TTL).
+
+    Entries are dropped when the user changes, in this process directly and
+    in other processes via pubsub. A lookup that read the database before an
+    invalidation cannot put its stale row back afterwards: put() only takes
+    values read under the generation they were fetched at."""
+
+    def __init__(self, max_size: int, ttl_seconds: float):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[int, Tuple[float, schemas.User]]" = OrderedDict()
+        self.generation = 0
+
+    def get(self, user_id: int) -> Optional[schemas.User]:
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            expires_at, user = entry
+            if expires_at <= time.monotonic():
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            return user
+
+    def put(self, user: schemas.User, generation: int):
+        with self._lock:
+            if generation != self.generation:
+                return
+            self._entries[user.id] = (time.monotonic() + self.ttl_seconds, user)
+            self._entries.move_to_end(user.id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: int):
+        with self._lock:
+            self.generation += 1
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+
+principals = PrincipalCache(settings.PRINCIPAL_CACHE_SIZE, settings.PRINCIPAL_CACHE_TTL_SECONDS)
+pubsub.subscribe(CHANNEL, lambda message: principals.invalidate(message["id"]), resync=principals.clear)
@@ -0,0 +1,132 @@
+import asyncio
+import logging
+import threading
+import time
+from difflib import SequenceMatcher
+from sqlalchemy.orm import Session
+from sqlalchemy import or_, func, text
+from app.config import settings
+from app.database import SessionLocal
+from app.models import User, Client, Device, ServiceRequest, CompanyAsset
+from app.schemas import SearchHit, SearchResults
+from app.services.text_search import contains_pattern, supports_trigram
+from typing import Callable, Dict, List
+
+logger = logging.getLogger(__name__)
+
+def _relevance(q: str, *values: str) -> float:
+    """Score how well q matches the best of values, from 0 to 1"""
+    q = q.lower()
+    best = 0.0
+    for value in values:
+        if not value:
+            continue
+        value = value.lower()
+        if value == q:
+            return 1.0
+        if value.startswith(q):
+            score = 0.8 + 0.2 * len(q) / len(value)
+        elif q in value:
+            score = 0.5 + 0.2 * len(q) / len(value)
+        else:
+            score = 0.5 * SequenceMatcher(None, q, value).ratio()
+        best = max(best, score)
+    return round(best, 4)
+
+def _candidates(db: Session, model, columns: List, q: str, limit: int) -> List:
+    """Rows where any of columns fuzzy-matches q, best matches first where the DB can rank them"""
+    pattern = contains_pattern(q)
+    if supports_trigram(db):
+        conditions = [column.op("%")(q) for column in columns] + [column.ilike(pattern) for column in columns]
+        score = func.greatest(*[func.similarity(column, q) for column in columns])
+        return db.query(model).filter(or_(*conditions)).order_by(score.desc(), model.id).limit(limit).all()
+    return db.query(model).filter(or_(*[column.ilike(pattern) for column in columns])).order_by(model.id).limit(limit).all()
+
+def _search_users(db: Session, q: str, limit: int) -> List[SearchHit]:
+    return [
+        SearchHit(type="user", id=user.id, title=user.name, subtitle=f"{user.email} ({user.role})", score=_relevance(q, user.name, user.email))
+        for user in _candidates(db, User, [User.name, User.email], q, limit)
+    ]
+
+def _search_clients(db: Session, q: str, limit: int) -> List[SearchHit]:
+    return [
+        SearchHit(type="client", id=client.id, title=client.name, subtitle=client.contact_person, score=_relevance(q, client.name, client.email, client.contact_person))
+        for client in _candidates(db, Client, [Client.name, Client.email, Client.contact_person], q, limit)
+    ]
+
+def _search_devices(db: Session, q: str, limit: int) -> List[SearchHit]:
+    return [
+        SearchHit(type="device", id=device.id, title=device.device_code, subtitle=f"{device.manufacturer} {device.model} / {device.serial_number}", score=_relevance(q, device.device_code, device.serial_number))
+        for device in _candidates(db, Device, [Device.serial_number, Device.device_code], q, limit)
+    ]
+
+def _search_service_requests(db: Session, q: str, limit: int) -> List[SearchHit]:
+    return [
+        SearchHit(type="service_request", id=request.id, title=request.ticket_id, subtitle=request.title, score=_relevance(q, request.ticket_id, request.title))
+        for request in _candidates(db, ServiceRequest, [ServiceRequest.ticket_id, ServiceRequest.title], q, limit)
+    ]
+
+def _search_company_assets(db: Session, q: str, limit: int) -> List[SearchHit]:
+    return [
+        SearchHit(type="company_asset", id=asset.id, title=asset.asset_tag, subtitle=asset.description, score=_relevance(q, asset.asset_tag, asset.description))
+        for asset in _candidates(db, CompanyAsset, [CompanyAsset.asset_tag, CompanyAsset.description], q, limit)
+    ]
+
+# Connections all searches in this process may hold at once. A search's
+# threads keep running after it times out, so this, not the request count,
+# is what stops searches from draining the pool that other routes share.
+_connection_slots = threading.BoundedSemaphore(settings.SEARCH_MAX_CONNECTIONS)
+
+_SEARCHERS: Dict[str, Callable[[Session, str, int], List[SearchHit]]] = {
+    "user": _search_users,
+    "client": _search_clients,
+    "device": _search_devices,
+    "service_request": _search_service_requests,
+    "company_asset": _search_company_assets,
+}
+
+class SearchService:
+    @staticmethod
+    def _run_searcher(searcher: Callable, q: str, limit: int, deadline: float) -> List[SearchHit]:
+        # Each entity gets its own session so the searches can run concurrently, within the process-wide cap
+        remaining = deadline - time.monotonic()
+        if remaining <= 0 or not _connection_slots.acquire(timeout=remaining):
+            raise TimeoutError("no search connection free before the deadline")
+        try:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError("deadline passed while waiting for a connection")
+            db = SessionLocal()
+            try:
+                if supports_trigram(db):
+                    # Stop the query server-side once the caller has stopped waiting for it
+                    db.execute(text(f"SET LOCAL statement_timeout = {max(1, int(remaining * 1000))}"))
+                return searcher(db, q, limit)
+            finally:
+                db.close()
+        finally:
+            _connection_slots.release()
+
+    @staticmethod
+    async def search(q: str, per_entity_limit: int, timeout_ms: int) -> SearchResults:
+        deadline = time.monotonic() + timeout_ms / 1000
+        tasks = {
+            asyncio.create_task(asyncio.to_thread(SearchService._run_searcher, searcher, q, per_entity_limit, deadline)): entity
+            for entity, searcher in _SEARCHERS.items()
+        }
+        done, pending = await asyncio.wait(tasks, timeout=timeout_ms / 1000)
+
+        hits: List[SearchHit] = []
+        degraded: List[str] = []
+        for task in pending:
+            task.cancel()
+            degraded.append(tasks[task])
+        for task in done:
+            if task.exception() is not None:
+                logger.warning("Search of %s failed: %r", tasks[task], task.exception())
+                degraded.append(tasks[task])
+            else:
+                hits.extend(task.result())
+
+        hits.sort(key=lambda hit: hit.score, reverse=True)
+        return SearchResults(query=q, hits=hits, partial=bool(degraded), degraded=sorted(degraded))
@@ -1,49 +1,92 @@
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, joinedload, selectinload
 from sqlalchemy import and_, func
 from app.models import ServiceRequest
+from app import schemas
 from app.schemas import ServiceRequestCreate, ServiceRequestUpdate
-from typing import List, Optional
+from app.services.batch_service import BatchService
+from app.services.client_summary_service import ClientSummaryService
+from app.services.writes import delete_returning, update_returning
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 from datetime import datetime, date
 
+# Relationships that can be embedded with ?include=, and the schema each is rendered with
+INCLUDABLE = {
+    'client': schemas.Client,
+    'device': schemas.Device,
+    'assigned_technician': schemas.User,
+    'submitted_user': schemas.User,
+}
+
+def _query(db: Session, include: Sequence[str], single: bool = False):
+    # Single rows join their relationships in; lists use one extra IN query per relationship
+    loader = joinedload if single else selectinload
+    return db.query(ServiceRequest).options(*[loader(getattr(ServiceRequest, name)) for name in include])
+
+class _Expanded:
+    """A service request row with the relationships not asked for hidden.
+
+    Response models read it from attributes like the row itself, so nothing
+    is copied; hiding keeps them from lazy-loading relationships left out of
+    ?include=, which are then omitted (unset) rather than serialized."""
+    __slots__ = ("_request", "_include")
+
+    def __init__(self, request: ServiceRequest, include: Sequence[str]):
+        self._request = request
+        self._include = include
+
+    def __getattr__(self, name: str):
+        if name in INCLUDABLE and name not in self._include:
+            raise AttributeError(name)
+        return getattr(self._request, name)
+
 class ServiceRequestService:
     @staticmethod
-    async def get_all(db: Session) -> List[ServiceRequest]:
-        return db.query(ServiceRequest).all()
+    def expand(request: ServiceRequest, include: Sequence[str]) -> "_Expanded":
+        """The row as the response model should read it: columns plus the included relationships"""
+        return _Expanded(request, include)
+
+    @staticmethod
+    async def get_all(db: Session, include: Sequence[str] = ()) -> List[ServiceRequest]:
+        return _query(db, include).all()
+    
+    @staticmethod
+    async def get_by_id(db: Session, request_id: int, include: Sequence[str] = ()) -> Optional[ServiceRequest]:
+        return _query(db, include, single=True).filter(ServiceRequest.id == request_id).first()
     
     @staticmethod
-    async def get_by_id(db: Session, request_id: int) -> Optional[ServiceRequest]:
-        return db.query(ServiceRequest).filter(ServiceRequest.id == request_id).first()
+    async def get_many(db: Session, request_ids: List[int], include: Sequence[str] = ()) -> Tuple[List[ServiceRequest], List[int]]:
+        return await BatchService.get_many(db, ServiceRequest, request_ids, _query(db, include))
     
     @staticmethod
-    async def get_by_ticket_id(db: Session, ticket_id: str) -> Optional[ServiceRequest]:
-        return db.query(ServiceRequest).filter(ServiceRequest.ticket_id == ticket_id).first()
+    async def get_by_ticket_id(db: Session, ticket_id: str, include: Sequence[str] = ()) -> Optional[ServiceRequest]:
+        return _query(db, include, single=True).filter(ServiceRequest.ticket_id == ticket_id).first()
     
     @staticmethod
-    async def get_by_client_id(db: Session, client_id: int) -> List[ServiceRequest]:
-        return db.query(ServiceRequest).filter(ServiceRequest.client_id == client_id).all()
+    async def get_by_client_id(db: Session, client_id: int, include: Sequence[str] = ()) -> List[ServiceRequest]:
+        return _query(db, include).filter(ServiceRequest.client_id == client_id).all()
     
     @staticmethod
-    async def get_by_technician_id(db: Session, technician_id: int) -> List[ServiceRequest]:
-        return db.query(ServiceRequest).filter(ServiceRequest.assigned_to == technician_id).all()
+    async def get_by_technician_id(db: Session, technician_id: int, include: Sequence[str] = ()) -> List[ServiceRequest]:
+        return _query(db, include).filter(ServiceRequest.assigned_to == technician_id).all()
     
     @staticmethod
-    async def get_by_status(db: Session, status: str) -> List[ServiceRequest]:
-        return db.query(ServiceRequest).filter(ServiceRequest.status == status).all()
+    async def get_by_status(db: Session, status: str, include: Sequence[str] = ()) -> List[ServiceRequest]:
+        return _query(db, include).filter(ServiceRequest.status == status).all()
     
     @staticmethod
-    async def get_by_priority(db: Session, priority: str) -> List[ServiceRequest]:
-        return db.query(ServiceRequest).filter(ServiceRequest.priority == priority).all()
+    async def get_by_priority(db: Session, priority: str, include: Sequence[str] = ()) -> List[ServiceRequest]:
+        return _query(db, include).filter(ServiceRequest.priority == priority).all()
     
     @staticmethod
-    async def get_open_tickets(db: Session) -> List[ServiceRequest]:
-        return db.query(ServiceRequest).filter(
+    async def get_open_tickets(db: Session, include: Sequence[str] = ()) -> List[ServiceRequest]:
+        return _query(db, include).filter(
             ServiceRequest.status.in_(['open', 'assigned', 'in_progress'])
         ).all()
     
     @staticmethod
-    async def get_resolved_today(db: Session) -> List[ServiceRequest]:
+    async def get_resolved_today(db: Session, include: Sequence[str] = ()) -> List[ServiceRequest]:
         today = date.today()
-        return db.query(ServiceRequest).filter(
+        return _query(db, include).filter(
             and_(
                 ServiceRequest.status == 'resolved',
                 func.date(ServiceRequest.updated_at) == today
@@ -54,33 +97,34 @@ class ServiceRequestService:
     async def create(db: Session, request_data: ServiceRequestCreate) -> ServiceRequest:
         db_request = ServiceRequest(**request_data.dict())
         db.add(db_request)
+        await ClientSummaryService.apply_deltas(db, ClientSummaryService.ticket_deltas(new=db_request))
         db.commit()
         db.refresh(db_request)
         return db_request
     
     @staticmethod
-    async def update(db: Session, request_id: int, request_data: ServiceRequestUpdate) -> Optional[ServiceRequest]:
-        db_request = db.query(ServiceRequest).filter(ServiceRequest.id == request_id).first()
-        if not db_request:
-            return None
-        
+    async def update(db: Session, request_id: int, request_data: ServiceRequestUpdate, expected_version: Optional[int] = None) -> Optional[ServiceRequest]:
         update_data = request_data.dict(exclude_unset=True)
-        for field, value in update_data.items():
-            setattr(db_request, field, value)
-        
         # Update the updated_at timestamp
-        db_request.updated_at = datetime.utcnow()
+        update_data['updated_at'] = datetime.utcnow()
         
+        db_request, before = await update_returning(
+            db, ServiceRequest, request_id, update_data, expected_version=expected_version,
+            previous=("client_id", "status", "priority"),
+        )
+        if not db_request:
+            return None
+        
+        await ClientSummaryService.apply_deltas(db, ClientSummaryService.ticket_deltas(before, db_request))
         db.commit()
-        db.refresh(db_request)
         return db_request
     
     @staticmethod
     async def delete(db: Session, request_id: int) -> bool:
-        db_request = db.query(ServiceRequest).filter(ServiceRequest.id == request_id).first()
-        if not db_request:
+        deleted = await delete_returning(db, ServiceRequest, request_id, returning=("client_id", "status", "priority"))
+        if not deleted:
             return False
         
-        db.delete(db_request)
+        await ClientSummaryService.apply_deltas(db, ClientSummaryService.ticket_deltas(old=deleted))
         db.commit()
         return True 
\ No newline at end of file
@@ -0,0 +1,83 @@
+from collections import deque
+from sqlalchemy.orm import Session
+from typing import Dict, Iterable, List, Set, Tuple
+
+_TERMINAL = None  # key for the ID set stored at the end of a word
+
+def supports_trigram(db: Session) -> bool:
+    """pg_trgm operators are only available on PostgreSQL"""
+    return db.get_bind().dialect.name == "postgresql"
+
+def contains_pattern(q: str) -> str:
+    """Build an ILIKE '%q%' pattern with LIKE wildcards in q escaped"""
+    return "%" + q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+class PrefixTrie:
+    """Case-insensitive in-memory prefix index mapping string keys to entity IDs.
+
+    Used as the lookup fallback when the database has no pg_trgm support
+    (e.g. SQLite in tests)."""
+
+    def __init__(self):
+        self._root: Dict = {}
+        self._keys: Dict[int, Set[str]] = {}
+        self.loaded = False
+
+    def clear(self):
+        self._root = {}
+        self._keys = {}
+        self.loaded = False
+
+    def load(self, rows: Iterable[Tuple]):
+        """Rebuild the trie from (id, key, key, ...) rows"""
+        self.clear()
+        for entity_id, *keys in rows:
+            self.insert(entity_id, *keys)
+        self.loaded = True
+
+    def insert(self, entity_id: int, *keys: str):
+        for key in keys:
+            if not key:
+                continue
+            key = key.lower()
+            node = self._root
+            for char in key:
+                node = node.setdefault(char, {})
+            node.setdefault(_TERMINAL, set()).add(entity_id)
+            self._keys.setdefault(entity_id, set()).add(key)
+
+    def remove(self, entity_id: int):
+        for key in self._keys.pop(entity_id, ()):
+            node = self._root
+            for char in key:
+                node = node.get(char)
+                if node is None:
+                    break
+            else:
+                node.get(_TERMINAL, set()).discard(entity_id)
+
+    def search(self, prefix: str, limit: int) -> List[Tuple[int, float]]:
+        """Return up to `limit` (id, score) pairs for keys starting with prefix.
+
+        Keys are visited breadth-first, so shorter (closer) keys rank first;
+        the score is len(prefix) / len(key), 1.0 for an exact match."""
+        prefix = prefix.lower()
+        node = self._root
+        for char in prefix:
+            node = node.get(char)
+            if node is None:
+                return []
+
+        results: Dict[int, float] = {}
+        queue = deque([(node, len(prefix))])
+        while queue and len(results) < limit:
+            node, depth = queue.popleft()
+            for entity_id in node.get(_TERMINAL, ()):
+                if entity_id not in results:
+                    results[entity_id] = len(prefix) / depth if depth else 1.0
+                    if len(results) >= limit:
+                        break
+            for char, child in node.items():
+                if char != _TERMINAL:
+                    queue.append((child, depth + 1))
+        return sorted(results.items(), key=lambda item: item[1], reverse=True)
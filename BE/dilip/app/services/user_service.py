@@ -1,11 +1,29 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from sqlalchemy import and_, update
 from app.models import User
+from app import pubsub
+from app.database import after_commit
 from app.schemas import UserCreate, UserUpdate
-from typing import List, Optional
+from typing import List, Optional, Tuple
 import jwt
 from datetime import datetime, timedelta
 from app.config import settings
+from app.services.batch_service import BatchService
+from app.services.passwords import hash_password, verify_password
+from app.services.principal_cache import CHANNEL as PRINCIPAL_CHANNEL, principals
+from app.services.writes import delete_returning, update_returning
+
+def _commit_user_change(db: Session, user_id: int):
+    # Other workers drop their cached principal once this commits; this one drops it directly
+    pubsub.publish(db, PRINCIPAL_CHANNEL, {"id": user_id})
+    db.commit()
+    after_commit(db, principals.invalidate, user_id)
+
+async def _user_values(user_data, exclude_unset: bool = False) -> dict:
+    values = user_data.dict(exclude_unset=exclude_unset)
+    if values.get("password") is not None:
+        values["password"] = await hash_password(values["password"])
+    return values
 
 class UserService:
     @staticmethod
@@ -16,6 +34,10 @@ class UserService:
     async def get_by_id(db: Session, user_id: int) -> Optional[User]:
         return db.query(User).filter(User.id == user_id).first()
     
+    @staticmethod
+    async def get_many(db: Session, user_ids: List[int]) -> Tuple[List[User], List[int]]:
+        return await BatchService.get_many(db, User, user_ids)
+    
     @staticmethod
     async def get_by_role(db: Session, role: str) -> List[User]:
         return db.query(User).filter(User.role == role).all()
@@ -26,7 +48,7 @@ class UserService:
     
     @staticmethod
     async def create(db: Session, user_data: UserCreate) -> User:
-        db_user = User(**user_data.dict())
+        db_user = User(**await _user_values(user_data))
         db.add(db_user)
         db.commit()
         db.refresh(db_user)
@@ -34,26 +56,19 @@ class UserService:
     
     @staticmethod
     async def update(db: Session, user_id: int, user_data: UserUpdate) -> Optional[User]:
-        db_user = db.query(User).filter(User.id == user_id).first()
+        db_user, _ = await update_returning(db, User, user_id, await _user_values(user_data, exclude_unset=True))
         if not db_user:
             return None
         
-        update_data = user_data.dict(exclude_unset=True)
-        for field, value in update_data.items():
-            setattr(db_user, field, value)
-        
-        db.commit()
-        db.refresh(db_user)
+        _commit_user_change(db, user_id)
         return db_user
     
     @staticmethod
     async def delete(db: Session, user_id: int) -> bool:
-        db_user = db.query(User).filter(User.id == user_id).first()
-        if not db_user:
+        if not await delete_returning(db, User, user_id):
             return False
         
-        db.delete(db_user)
-        db.commit()
+        _commit_user_change(db, user_id)
         return True
 
     @staticmethod
@@ -63,7 +78,7 @@ class UserService:
     @staticmethod
     async def create_technician(db: Session, user_data: UserCreate) -> User:
         user_data.role = 'technician'
-        db_user = User(**user_data.dict())
+        db_user = User(**await _user_values(user_data))
         db.add(db_user)
         db.commit()
         db.refresh(db_user)
@@ -71,14 +86,10 @@ class UserService:
 
     @staticmethod
     async def update_technician(db: Session, user_id: int, user_data: UserUpdate) -> Optional[User]:
-        db_user = db.query(User).filter(User.id == user_id, User.role == 'technician').first()
+        db_user, _ = await update_returning(db, User, user_id, await _user_values(user_data, exclude_unset=True), User.role == 'technician')
         if not db_user:
             return None
-        update_data = user_data.dict(exclude_unset=True)
-        for field, value in update_data.items():
-            setattr(db_user, field, value)
-        db.commit()
-        db.refresh(db_user)
+        _commit_user_change(db, user_id)
         return db_user
 
     @staticmethod
@@ -92,6 +103,11 @@ class UserService:
     @staticmethod
     async def authenticate_user(db: Session, email: str, password: str):
         user = await UserService.get_by_email(db, email)
-        if not user or user.password != password:
+        matches, new_hash = await verify_password(password, user.password if user else None)
+        if not matches:
             return None
+        if new_hash:
+            # Only replace the hash that was checked, in case the password changed meanwhile
+            db.execute(update(User).where(User.id == user.id, User.password == user.password).values(password=new_hash))
+            db.commit()
         return user 
\ No newline at end of file
@@ -0,0 +1,54 @@
+from itertools import groupby
+from typing import Optional
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.models import Client, User
+from app.services.device_service import DeviceService
+from app.services.job_service import JobService
+
+# Device codes listed in a digest before it is cut short
+DIGEST_MAX_DEVICES = 10
+
+class WarrantyService:
+    @staticmethod
+    async def run_expiry_sweep(db: Session, within_days: Optional[int] = None) -> int:
+        """Send every admin one digest per client with devices whose warranty expires soon.
+
+        Runs as the "warranty.expiry_sweep" job, which the API enqueues once
+        per WARRANTY_SWEEP_INTERVAL_HOURS across all its processes. The
+        digests are queued as "notifications.send" jobs in one transaction.
+        Returns the number of notifications queued."""
+        within_days = within_days or settings.WARRANTY_SWEEP_WITHIN_DAYS
+        devices = await DeviceService.get_warranty_expiring(db, within_days)
+        if not devices:
+            return 0
+
+        admin_ids = [user_id for user_id, in db.query(User.id).filter(User.role == 'admin')]
+        if not admin_ids:
+            return 0
+        client_ids = {device.client_id for device in devices}
+        client_names = dict(db.query(Client.id, Client.name).filter(Client.id.in_(client_ids)))
+
+        queued = 0
+        by_client = sorted(devices, key=lambda device: (device.client_id, device.warranty_expiry))
+        for client_id, client_devices in groupby(by_client, key=lambda device: device.client_id):
+            client_devices = list(client_devices)
+            listed = ", ".join(
+                f"{device.device_code} ({device.warranty_expiry.isoformat()})"
+                for device in client_devices[:DIGEST_MAX_DEVICES]
+            )
+            if len(client_devices) > DIGEST_MAX_DEVICES:
+                listed += f" and {len(client_devices) - DIGEST_MAX_DEVICES} more"
+            client_name = client_names.get(client_id, f"client #{client_id}")
+            message = f"{len(client_devices)} device(s) for {client_name} go out of warranty within {within_days} days: {listed}"
+            # Each digest goes out as a job of its own, so a failed insert is retried without resending the rest
+            await JobService.enqueue(db, "notifications.send", {
+                "user_ids": admin_ids,
+                "title": f"Warranty expiry: {client_name}",
+                "message": message,
+                "type": 'admin',
+            }, queue="notifications")
+            queued += len(admin_ids)
+
+        db.commit()
+        return queued
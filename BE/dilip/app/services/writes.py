@@ -0,0 +1,75 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import delete, select, update
+from app.exceptions import VersionConflictError
+from types import SimpleNamespace
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+# Shared single-statement writes. None of these commit; the calling service does.
+
+def _is_versioned(model) -> bool:
+    return model.__mapper__.version_id_col is not None
+
+async def update_returning(
+    db: Session,
+    model,
+    row_id: int,
+    values: Dict[str, Any],
+    *where,
+    expected_version: Optional[int] = None,
+    previous: Sequence[str] = (),
+) -> Tuple[Optional[Any], Optional[SimpleNamespace]]:
+    """Apply values to one row in a single UPDATE ... RETURNING, with no prior SELECT.
+
+    Extra where clauses narrow the match (e.g. on role). Versioned models
+    get their version bumped, and when expected_version is given the row is
+    only changed if it is still at that version. Columns named in previous
+    are returned with their values from before the update (on PostgreSQL,
+    read under the same row lock).
+
+    Returns (updated row, previous values) or (None, None) if no row matches.
+    Raises VersionConflictError if a versioned row has moved on."""
+    criteria = [model.id == row_id, *where]
+    versioned = _is_versioned(model)
+    if versioned:
+        values = dict(values, version=model.version + 1)
+    elif not values:
+        # Nothing to SET; answer like an update that changed nothing
+        row = db.execute(select(model).where(*criteria)).scalar_one_or_none()
+        if row is None:
+            return None, None
+        return row, SimpleNamespace(**{name: getattr(row, name) for name in previous}) if previous else None
+
+    old_values: Sequence[Any] = ()
+    if previous and db.get_bind().dialect.name == "postgresql":
+        old = select(model.id, *[getattr(model, name) for name in previous]).where(*criteria).with_for_update().subquery("old")
+        stmt = update(model).where(model.id == old.c.id).returning(model, *[old.c[name] for name in previous])
+    else:
+        if previous:
+            # SQLite's RETURNING cannot see a joined FROM, so read the old values first
+            old_values = db.execute(select(*[getattr(model, name) for name in previous]).where(*criteria)).first() or ()
+        stmt = update(model).where(*criteria).returning(model)
+    if versioned and expected_version is not None:
+        stmt = stmt.where(model.version == expected_version)
+
+    result = db.execute(stmt.values(**values)).first()
+    if result is None:
+        if versioned and expected_version is not None:
+            current_version = db.scalar(select(model.version).where(*criteria))
+            if current_version is not None:
+                raise VersionConflictError(model.__name__, row_id, current_version)
+        return None, None
+
+    row, *returned = result
+    old_values = returned or old_values
+    return row, SimpleNamespace(**dict(zip(previous, old_values))) if previous else None
+
+async def delete_returning(db: Session, model, row_id: int, *where, returning: Sequence[str] = ()) -> Optional[SimpleNamespace]:
+    """Delete one row with a single DELETE ... RETURNING.
+
+    Returns the deleted row's id plus the columns named in returning, or
+    None if no row matched."""
+    stmt = delete(model).where(model.id == row_id, *where).returning(model.id, *[getattr(model, name) for name in returning])
+    result = db.execute(stmt).first()
+    if result is None:
+        return None
+    return SimpleNamespace(**dict(zip(("id", *returning), result)))
@@ -0,0 +1,67 @@
+"""Coalescing of concurrent identical GETs.
+
+A route wrapped with @single_flight runs at most once at a time per key
+(route, query parameters and Authorization header). Requests arriving
+while it runs wait for that execution and are sent the same serialized
+body instead of querying again. Nothing is cached: once the execution
+finishes, the next request runs afresh.
+
+    @router.get("/stats", response_model=DashboardStats)
+    @single_flight(DashboardStats)
+    async def get_dashboard_stats(db: Session = Depends(get_db)):
+        ...
+"""
+import asyncio
+import functools
+import hashlib
+import inspect
+from typing import Any, Dict, Tuple
+from fastapi import Request, Response
+from pydantic import TypeAdapter
+
+_REQUEST_PARAM = "single_flight_request"
+
+_inflight: Dict[Tuple, "asyncio.Task[bytes]"] = {}
+
+def single_flight(response_model: Any, exclude_unset: bool = False):
+    """Share one execution and one JSON body among concurrent identical requests.
+
+    response_model (and exclude_unset) should match the route's, since the
+    body is serialized here rather than by FastAPI."""
+    adapter = TypeAdapter(response_model)
+
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        async def execute(kwargs) -> bytes:
+            result = await func(**kwargs)
+            return adapter.dump_json(adapter.validate_python(result, from_attributes=True), exclude_unset=exclude_unset)
+
+        @functools.wraps(func)
+        async def wrapper(**kwargs):
+            request: Request = kwargs.pop(_REQUEST_PARAM)
+            authorization = request.headers.get("authorization", "")
+            key = (
+                func.__module__,
+                func.__qualname__,
+                request.url.path,
+                tuple(sorted(request.query_params.multi_items())),
+                hashlib.sha256(authorization.encode()).digest() if authorization else b"",
+            )
+            task = _inflight.get(key)
+            if task is None:
+                # A task of its own, so a leader whose client goes away does not take its followers down with it
+                task = asyncio.ensure_future(execute(kwargs))
+                _inflight[key] = task
+                task.add_done_callback(lambda done: _inflight.pop(key) if _inflight.get(key) is done else None)
+            body = await asyncio.shield(task)
+            return Response(content=body, media_type="application/json")
+
+        # FastAPI reads the signature for dependencies: add the Request the key is built from
+        wrapper.__signature__ = signature.replace(parameters=[
+            *signature.parameters.values(),
+            inspect.Parameter(_REQUEST_PARAM, inspect.Parameter.KEYWORD_ONLY, annotation=Request),
+        ])
+        return wrapper
+
+    return decorator
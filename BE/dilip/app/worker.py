@@ -0,0 +1,138 @@
+"""Background job worker.
+
+Usage: python -m app.worker
+run.py also starts settings.JOB_WORKER_PROCESSES of these next to the API.
+"""
+import asyncio
+import json
+import logging
+import os
+import signal
+import socket
+from typing import Awaitable, Callable, Dict, Optional, Set
+from app.config import settings
+from app.database import SessionLocal
+from app.exceptions import PermanentJobError
+from app.models import Job
+from app.services.client_summary_service import ClientSummaryService
+from app.services.maintenance_service import MaintenanceService
+from app.services.job_service import JobService
+from app.services.notification_service import NotificationService
+from app.services.warranty_service import WarrantyService
+
+logger = logging.getLogger(__name__)
+
+# Job name -> async handler called as handler(db, **payload)
+HANDLERS: Dict[str, Callable[..., Awaitable]] = {
+    "warranty.expiry_sweep": WarrantyService.run_expiry_sweep,
+    "client_summaries.rebuild": ClientSummaryService.rebuild,
+    "maintenance.sweep": MaintenanceService.run_sweep,
+    "notifications.send": NotificationService.send,
+}
+
+_REAP_INTERVAL_SECONDS = 60
+
+def _call_with_session(func: Callable[..., Awaitable], *args, **kwargs):
+    async def call():
+        db = SessionLocal()
+        try:
+            return await func(db, *args, **kwargs)
+        finally:
+            db.close()
+    return asyncio.run(call())
+
+class Worker:
+    """Claims due jobs from each queue and runs them, up to the queue's limit at a time"""
+
+    def __init__(self, queues: Optional[Dict[str, int]] = None, poll_interval: Optional[float] = None):
+        self.queues = queues or settings.JOB_QUEUES
+        self.poll_interval = poll_interval or settings.JOB_POLL_INTERVAL_SECONDS
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._running: Dict[str, Set[asyncio.Task]] = {queue: set() for queue in self.queues}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._stopping = False
+
+    async def _db(self, func: Callable[..., Awaitable], *args, **kwargs):
+        # Services issue blocking queries, so keep them off the worker's event loop
+        return await asyncio.to_thread(_call_with_session, func, *args, **kwargs)
+
+    async def _execute(self, job: Job):
+        try:
+            handler = HANDLERS.get(job.name)
+            if handler is None:
+                raise PermanentJobError(f"No handler registered for job {job.name!r}")
+            await self._db(handler, **json.loads(job.payload))
+        except PermanentJobError as exc:
+            logger.error("Job %s (%s) failed permanently: %s", job.id, job.name, exc)
+            await self._db(JobService.fail, job, str(exc), retry=False)
+        except Exception as exc:
+            logger.exception("Job %s (%s) failed on attempt %s", job.id, job.name, job.attempts)
+            await self._db(JobService.fail, job, repr(exc))
+        else:
+            await self._db(JobService.complete, job)
+
+    def _on_done(self, queue: str, task: asyncio.Task):
+        self._running[queue].discard(task)
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def run_once(self) -> int:
+        """Start due jobs on every queue with free slots; returns how many were started"""
+        started = 0
+        for queue, limit in self.queues.items():
+            free = limit - len(self._running[queue])
+            if free <= 0:
+                continue
+            for job in await self._db(JobService.claim, queue, limit, free, self.worker_id):
+                task = asyncio.create_task(self._execute(job), name=f"job-{job.id}")
+                self._running[queue].add(task)
+                task.add_done_callback(lambda task, queue=queue: self._on_done(queue, task))
+                started += 1
+        return started
+
+    async def run(self):
+        self._wakeup = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        last_reap = float("-inf")
+        while not self._stopping:
+            self._wakeup.clear()
+            try:
+                if loop.time() - last_reap >= _REAP_INTERVAL_SECONDS:
+                    last_reap = loop.time()
+                    requeued = await self._db(JobService.requeue_stale)
+                    if requeued:
+                        logger.warning("Requeued %s jobs from unresponsive workers", requeued)
+                started = await self.run_once()
+            except Exception:
+                logger.exception("Claiming jobs failed")
+                started = 0
+            if not started:
+                # Sleep until the next poll, or until a running job frees a slot
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+
+        # Let jobs in flight finish so they are not left marked as running
+        await asyncio.gather(*[task for tasks in self._running.values() for task in tasks], return_exceptions=True)
+
+    def stop(self):
+        self._stopping = True
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+def main():
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(processName)s %(levelname)s %(name)s: %(message)s")
+    worker = Worker()
+
+    async def serve():
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(sig, worker.stop)
+        logger.info("Job worker %s serving queues %s", worker.worker_id, ", ".join(worker.queues))
+        await worker.run()
+
+    asyncio.run(serve())
+
+if __name__ == "__main__":
+    main()
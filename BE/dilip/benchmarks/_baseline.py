@@ -0,0 +1,39 @@
+"""Stored benchmark baselines and regression checks shared by the benchmark scripts.
+
+Baselines are JSON objects of metric name -> value, where lower is better
+(milliseconds, microseconds, ...). A metric regresses when it exceeds its
+baseline by more than the relative threshold and by more than min_delta,
+so that tiny absolute values do not fail on noise.
+"""
+import json
+import os
+from typing import Dict, List
+
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines")
+
+def path(name: str) -> str:
+    return os.path.join(BASELINE_DIR, f"{name}.json")
+
+def load(name: str) -> Dict[str, float]:
+    try:
+        with open(path(name)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+def save(name: str, values: Dict[str, float]):
+    os.makedirs(BASELINE_DIR, exist_ok=True)
+    with open(path(name), "w") as f:
+        json.dump(values, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+def regressions(current: Dict[str, float], baseline: Dict[str, float], threshold: float, min_delta: float = 0.0) -> List[str]:
+    """Describe each metric that got worse than allowed; metrics missing from either side are skipped"""
+    found = []
+    for metric, value in sorted(current.items()):
+        before = baseline.get(metric)
+        if before is None:
+            continue
+        if value > before * (1 + threshold) and value - before > min_delta:
+            found.append(f"{metric}: {value:.2f} vs baseline {before:.2f} (+{(value / before - 1) if before else float('inf'):.0%})")
+    return found
@@ -0,0 +1,449 @@
+"""Synthetic dataset for benchmarks.
+
+Fills an empty, migrated database (alembic upgrade head) with users,
+clients, devices, service requests, company assets, asset requests and
+notifications. Rows reference each other consistently: a ticket's device
+belongs to its client, only technicians are assigned work, closed tickets
+carry resolution notes, and so on. Categorical columns take their values
+from the CheckConstraints in app/models.py, so the data stays valid as the
+allowed values change.
+
+Everything is derived from --tickets unless given explicitly, and the same
+--seed and --now always produce the same rows (password salts aside).
+PostgreSQL is loaded with COPY; other databases fall back to batched
+INSERTs, which is only practical for small datasets.
+
+    python benchmarks/generate_data.py --tickets 1000000 --seed 1 [--truncate]
+
+Every user's password is --password (default "benchmark").
+"""
+import argparse
+import asyncio
+import bisect
+import csv
+import io
+import os
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from sqlalchemy import CheckConstraint, Column, Table, delete, func, insert, select, text
+from sqlalchemy.sql import operators
+from sqlalchemy.sql.elements import BinaryExpression
+from app.database import Base, get_engine
+from app.models import AssetRequest, Client, CompanyAsset, Device, Notification, ServiceRequest, User
+
+CHUNK_ROWS = 50_000
+HISTORY_DAYS = 3 * 365
+
+# Tables in the order they are loaded (parents first)
+TABLES = [User, Client, Device, ServiceRequest, CompanyAsset, AssetRequest, Notification]
+
+# Relative frequencies for constrained columns; values allowed by a constraint but missing here get weight 1
+WEIGHTS = {
+    "clients.type": {"managed_site": 50, "individual": 35, "walk_in": 15},
+    "devices.device_type": {"PC": 55, "Server": 5, "Network": 10, "CCTV": 10, "Printer": 15, "Other": 5},
+    "devices.status": {"active": 80, "in_repair": 7, "retired": 8, "maintenance": 5},
+    "service_requests.priority": {"low": 30, "medium": 45, "high": 20, "urgent": 5},
+    "company_assets.asset_type": {"Laptop": 35, "Desktop": 15, "Monitor": 20, "Network_Equipment": 10, "Tool": 15, "Other": 5},
+    "company_assets.status": {"available": 40, "assigned_to_tech": 40, "on_loan_to_client": 12, "maintenance": 8},
+    "asset_requests.request_type": {"assignment": 60, "modification": 15, "maintenance": 25},
+}
+
+FIRST_NAMES = ["James", "Mary", "Priya", "Wei", "Ahmed", "Sofia", "Daniel", "Aisha", "Lucas", "Mei", "Omar", "Elena",
+               "Ravi", "Grace", "Kenji", "Fatima", "Noah", "Chloe", "Arjun", "Lena", "Samuel", "Yuki", "Carlos", "Nadia"]
+LAST_NAMES = ["Smith", "Patel", "Chen", "Garcia", "Khan", "Müller", "Rossi", "Kim", "Nguyen", "Silva", "Okafor", "Cohen",
+              "Jayaraj", "Brown", "Ivanova", "Tanaka", "Lopez", "Haddad", "Novak", "Walsh", "Singh", "Moreau", "Berg", "Ali"]
+COMPANY_WORDS = ["Apex", "Harbor", "Summit", "Blue", "Cedar", "Northwind", "Orion", "Pioneer", "Sterling", "Vertex",
+                 "Lakeside", "Granite", "Crescent", "Evergreen", "Falcon", "Meridian", "Redwood", "Silverline"]
+COMPANY_KINDS = ["Logistics", "Dental", "Legal", "Foods", "Engineering", "Clinic", "Motors", "Retail", "Studios", "Labs"]
+COMPANY_SUFFIXES = ["Ltd", "LLC", "Inc", "Group", "& Co"]
+STREETS = ["Main St", "Market St", "Station Rd", "Park Ave", "Church Ln", "Mill Rd", "High St", "Harbour Way", "Oak Dr"]
+CITIES = ["Springfield", "Riverton", "Lakewood", "Fairview", "Georgetown", "Ashford", "Kingsport", "Milton"]
+LOCATIONS = ["Reception", "Office A", "Office B", "Server Room", "Network Closet", "Warehouse", "Conference Room", "Lab", "Front Desk"]
+
+# device_type -> (device_code prefix, [(manufacturer, model), ...])
+DEVICE_MODELS = {
+    "PC": ("PC", [("Dell", "OptiPlex 7090"), ("HP", "EliteDesk 800 G6"), ("Lenovo", "ThinkCentre M70q"), ("Apple", "iMac 24")]),
+    "Server": ("SRV", [("HP", "ProLiant DL380"), ("Dell", "PowerEdge R740"), ("Lenovo", "ThinkSystem SR650")]),
+    "Network": ("NET", [("Cisco", "Catalyst 2960"), ("Ubiquiti", "UniFi Switch 24"), ("Netgear", "ProSafe GS724T"), ("MikroTik", "RB4011")]),
+    "CCTV": ("CAM", [("Hikvision", "DS-2CD2143G2"), ("Axis", "P3245-V"), ("Dahua", "IPC-HDW2831T")]),
+    "Printer": ("PRN", [("HP", "LaserJet Pro M404"), ("Brother", "HL-L2350DW"), ("Canon", "imageCLASS MF445dw"), ("Epson", "WF-C5790")]),
+    "Other": ("OTH", [("APC", "Smart-UPS 1500"), ("Synology", "DS920+"), ("Logitech", "Rally Bar")]),
+}
+
+TICKET_TITLES = {
+    "PC": ["Computer running slow", "Blue screen on startup", "Cannot log in to workstation", "Keyboard not responding"],
+    "Server": ["Server unreachable", "Disk space critical on file server", "Backup job failing", "RAID degraded"],
+    "Network": ["Intermittent network drops", "No internet in office", "Wi-Fi coverage poor in meeting room", "Switch port down"],
+    "CCTV": ["Camera feed offline", "Recording not retained", "Night vision not working"],
+    "Printer": ["Printer paper jam", "Printer offline", "Scanning to email fails", "Toner replacement needed"],
+    "Other": ["UPS beeping", "NAS not accessible", "Video conferencing unit not starting"],
+    None: ["Email not syncing", "Request new user account", "Software installation request", "Password reset needed"],
+}
+ASSET_DESCRIPTIONS = {
+    "Laptop": ["Dell Latitude 5520 - Field Laptop", "Lenovo ThinkPad T14", "HP EliteBook 840"],
+    "Desktop": ["Dell OptiPlex 7090 - Spare", "HP ProDesk 400"],
+    "Monitor": ['27" Dell UltraSharp Monitor', '24" HP P24 Monitor'],
+    "Network_Equipment": ["Cisco Meraki MR36 Access Point", "Spare 24-port Switch", "4G Failover Router"],
+    "Tool": ["Network Cable Tester", "Crimping Tool Kit", "Label Printer", "Multimeter"],
+    "Other": ["Portable Projector", "USB-C Docking Station"],
+}
+
+def allowed_values(column: Column) -> List[str]:
+    """Values permitted by a `column IN (...)` CheckConstraint on the column's table"""
+    for constraint in column.table.constraints:
+        if not isinstance(constraint, CheckConstraint):
+            continue
+        expression = constraint.sqltext
+        if (isinstance(expression, BinaryExpression) and expression.operator is operators.in_op
+                and getattr(expression.left, "name", None) == column.name):
+            return list(expression.right.value)
+    raise LookupError(f"no IN constraint on {column.table.name}.{column.name}")
+
+def _require(column: Column, *values: str):
+    missing = set(values) - set(allowed_values(column))
+    if missing:
+        raise ValueError(f"{column.table.name}.{column.name} no longer allows {sorted(missing)}")
+
+class Picker:
+    """Weighted random choice over a column's allowed values"""
+
+    def __init__(self, rng: random.Random, column: Column):
+        values = allowed_values(column)
+        weights = WEIGHTS.get(f"{column.table.name}.{column.name}", {})
+        unknown = set(weights) - set(values)
+        if unknown:
+            raise ValueError(f"{column.table.name}.{column.name} does not allow {sorted(unknown)}")
+        self.rng = rng
+        self.values = values
+        self.cumulative = []
+        total = 0
+        for value in values:
+            total += weights.get(value, 1)
+            self.cumulative.append(total)
+
+    def __call__(self) -> str:
+        return self.values[bisect.bisect_right(self.cumulative, self.rng.random() * self.cumulative[-1])]
+
+class Plan:
+    """Row counts for one dataset"""
+
+    def __init__(self, tickets: int, clients: Optional[int] = None, technicians: Optional[int] = None):
+        self.tickets = tickets
+        self.clients = clients or max(10, tickets // 40)
+        self.technicians = technicians or max(5, tickets // 5000)
+        self.admins = max(2, self.technicians // 20)
+        self.client_users = max(5, self.clients // 4)
+        self.users = self.admins + self.technicians + self.client_users
+        self.assets = self.technicians * 4
+        self.asset_requests = self.assets * 3
+        self.notifications = min(self.users * 20, tickets * 2)
+
+    def __str__(self):
+        return (f"{self.users} users ({self.admins} admins, {self.technicians} technicians), {self.clients} clients, "
+                f"~{self.clients * 4} devices, {self.tickets} tickets, {self.assets} assets, "
+                f"{self.asset_requests} asset requests, {self.notifications} notifications")
+
+class Generator:
+    """Produces rows as tuples in the column order given by COLUMNS"""
+
+    COLUMNS = {
+        "users": ["id", "name", "email", "role", "avatar", "password"],
+        "clients": ["id", "name", "contact_person", "email", "phone", "address", "type", "created_at"],
+        "devices": ["id", "client_id", "device_code", "device_type", "manufacturer", "model", "serial_number",
+                    "purchase_date", "warranty_expiry", "status", "location", "notes"],
+        "service_requests": ["id", "ticket_id", "client_id", "device_id", "title", "description", "status", "priority",
+                             "assigned_to", "submitted_by", "created_at", "updated_at", "assigned_at", "resolution_notes"],
+        "company_assets": ["id", "asset_tag", "asset_type", "description", "location", "status", "assigned_to", "last_maintenance"],
+        "asset_requests": ["id", "asset_id", "requested_by", "request_type", "asset_type", "reason", "status", "created_at"],
+        "notifications": ["id", "user_id", "title", "message", "is_read", "type", "created_at"],
+    }
+
+    def __init__(self, plan: Plan, seed: int, now: datetime, password_hash: str):
+        self.plan = plan
+        self.rng = random.Random(seed)
+        self.now = now
+        self.start = now - timedelta(days=HISTORY_DAYS)
+        self.password_hash = password_hash
+        self.client_type = Picker(self.rng, Client.type)
+        self.device_type = Picker(self.rng, Device.device_type)
+        self.device_status = Picker(self.rng, Device.status)
+        self.priority = Picker(self.rng, ServiceRequest.priority)
+        self.asset_type = Picker(self.rng, CompanyAsset.asset_type)
+        self.asset_status = Picker(self.rng, CompanyAsset.status)
+        self.request_type = Picker(self.rng, AssetRequest.request_type)
+        # Values the generation logic below spells out itself
+        _require(User.role, "admin", "technician", "client")
+        _require(ServiceRequest.status, "open", "assigned", "in_progress", "resolved", "closed")
+        _require(AssetRequest.status, "pending", "approved", "rejected")
+        _require(Notification.type, "admin", "user")
+
+        # User ids: admins first, then technicians, then client users
+        self.admin_ids = range(1, plan.admins + 1)
+        self.technician_ids = range(plan.admins + 1, plan.admins + plan.technicians + 1)
+        self.client_user_ids = range(plan.admins + plan.technicians + 1, plan.users + 1)
+        # Filled in by devices(): each client's devices are contiguous ids, (first id, count) per client
+        self.client_devices: List[Tuple[int, int]] = []
+        self.device_types: List[str] = []
+        self.client_cumulative: List[float] = []
+
+    def _person(self) -> Tuple[str, str]:
+        return self.rng.choice(FIRST_NAMES), self.rng.choice(LAST_NAMES)
+
+    def _moment(self, start: datetime, end: datetime) -> datetime:
+        return start + timedelta(seconds=self.rng.random() * (end - start).total_seconds())
+
+    def users(self) -> Iterator[tuple]:
+        for user_id in range(1, self.plan.users + 1):
+            role = "admin" if user_id in self.admin_ids else "technician" if user_id in self.technician_ids else "client"
+            first, last = self._person()
+            domain = "example.com" if role == "client" else "mercury.com"
+            yield (user_id, f"{first} {last}", f"{first.lower()}.{last.lower()}.{user_id}@{domain}", role, None, self.password_hash)
+
+    def clients(self) -> Iterator[tuple]:
+        # A few large managed sites, many small customers: ticket volume per client follows a Pareto curve
+        total = 0.0
+        for client_id in range(1, self.plan.clients + 1):
+            kind = self.client_type()
+            first, last = self._person()
+            if kind == "managed_site":
+                name = f"{self.rng.choice(COMPANY_WORDS)} {self.rng.choice(COMPANY_KINDS)} {self.rng.choice(COMPANY_SUFFIXES)}"
+                weight = self.rng.paretovariate(1.2)
+            else:
+                name = f"{first} {last}"
+                weight = self.rng.paretovariate(3.0) / 4
+            total += weight
+            self.client_cumulative.append(total)
+            yield (
+                client_id, name, f"{first} {last}", f"contact{client_id}@client{client_id}.example.com",
+                f"+1-555-{self.rng.randrange(10000):04d}",
+                f"{self.rng.randrange(1, 999)} {self.rng.choice(STREETS)}, {self.rng.choice(CITIES)}",
+                kind, self._moment(self.start, self.now - timedelta(days=30)),
+            )
+
+    def devices(self) -> Iterator[tuple]:
+        device_id = 0
+        for client_id in range(1, self.plan.clients + 1):
+            # Busier clients have more equipment; individuals usually one or two devices
+            share = (self.client_cumulative[client_id - 1] - (self.client_cumulative[client_id - 2] if client_id > 1 else 0))
+            count = max(1, min(500, int(share / self.client_cumulative[-1] * self.plan.clients * 4 + self.rng.random())))
+            self.client_devices.append((device_id + 1, count))
+            for _ in range(count):
+                device_id += 1
+                device_type = self.device_type()
+                self.device_types.append(device_type)
+                prefix, models = DEVICE_MODELS.get(device_type, DEVICE_MODELS["Other"])
+                manufacturer, model = self.rng.choice(models)
+                purchased = (self.now - timedelta(days=self.rng.randrange(30, 6 * 365))).date()
+                yield (
+                    device_id, client_id, f"{prefix}-{device_id:06d}", device_type, manufacturer, model,
+                    f"SN{self.rng.getrandbits(40):012X}", purchased,
+                    purchased + timedelta(days=365 * self.rng.choice((1, 2, 3, 3, 5))),
+                    self.device_status(), self.rng.choice(LOCATIONS), None,
+                )
+
+    def _ticket_status(self, age_days: float) -> str:
+        # Old tickets are almost all finished; the recent ones make up the open backlog
+        finished = min(0.98, 0.3 + age_days / 30)
+        roll = self.rng.random()
+        if roll < finished:
+            return "closed" if self.rng.random() < 0.7 else "resolved"
+        return self.rng.choice(("open", "assigned", "in_progress"))
+
+    def service_requests(self) -> Iterator[tuple]:
+        span = (self.now - self.start).total_seconds()
+        for ticket in range(1, self.plan.tickets + 1):
+            # Ids increase with created_at, as they would in production
+            created = self.start + timedelta(seconds=span * (ticket - self.rng.random()) / self.plan.tickets)
+            client_index = bisect.bisect_right(self.client_cumulative, self.rng.random() * self.client_cumulative[-1])
+            client_id = min(client_index, self.plan.clients - 1) + 1
+            first_device, count = self.client_devices[client_id - 1]
+            device_id = first_device + self.rng.randrange(count) if self.rng.random() < 0.85 else None
+            device_type = self.device_types[device_id - 1] if device_id else None
+            title = self.rng.choice(TICKET_TITLES.get(device_type, TICKET_TITLES[None]))
+            status = self._ticket_status((self.now - created).total_seconds() / 86400)
+            assigned_to = assigned_at = resolution = None
+            updated = created
+            if status != "open":
+                assigned_to = self.rng.choice(self.technician_ids)
+                assigned_at = created + timedelta(minutes=self.rng.randrange(5, 8 * 60))
+                updated = assigned_at
+            if status in ("resolved", "closed"):
+                updated = min(self.now, assigned_at + timedelta(hours=self.rng.expovariate(1 / 30)))
+                resolution = f"Resolved on site by technician #{assigned_to}: {title.lower()} fixed."
+            submitter = self.rng.choice(self.client_user_ids) if self.rng.random() < 0.6 else self.rng.choice(self.admin_ids)
+            yield (
+                ticket, f"TKT-{created.year}-{ticket:07d}", client_id, device_id, title,
+                f"{title}. Reported by the client on {created:%d %b %Y}; see device notes for history.",
+                status, self.priority(), assigned_to, submitter, created, updated, assigned_at, resolution,
+            )
+
+    def company_assets(self) -> Iterator[tuple]:
+        for asset_id in range(1, self.plan.assets + 1):
+            asset_type = self.asset_type()
+            status = self.asset_status()
+            last_maintenance = None
+            if self.rng.random() < 0.8:
+                last_maintenance = (self.now - timedelta(days=self.rng.randrange(0, 400))).date()
+            yield (
+                asset_id, f"ASSET-{asset_id:06d}", asset_type,
+                self.rng.choice(ASSET_DESCRIPTIONS.get(asset_type, ASSET_DESCRIPTIONS["Other"])),
+                "IT Storage" if status == "available" else self.rng.choice(LOCATIONS), status,
+                self.rng.choice(self.technician_ids) if status == "assigned_to_tech" else None, last_maintenance,
+            )
+
+    def asset_requests(self) -> Iterator[tuple]:
+        span = (self.now - self.start).total_seconds()
+        for request_id in range(1, self.plan.asset_requests + 1):
+            created = self.start + timedelta(seconds=span * (request_id - self.rng.random()) / self.plan.asset_requests)
+            request_type = self.request_type()
+            asset_id = asset_type = None
+            if request_type == "assignment":
+                asset_type = self.asset_type()
+            else:
+                asset_id = self.rng.randrange(1, self.plan.assets + 1)
+            # Requests from the last fortnight may still be waiting for an admin
+            if self.now - created < timedelta(days=14) and self.rng.random() < 0.6:
+                status = "pending"
+            else:
+                status = "approved" if self.rng.random() < 0.8 else "rejected"
+            yield (
+                request_id, asset_id, self.rng.choice(self.technician_ids), request_type, asset_type,
+                f"{request_type.capitalize()} needed for upcoming site visits", status, created,
+            )
+
+    def notifications(self) -> Iterator[tuple]:
+        for notification_id in range(1, self.plan.notifications + 1):
+            user_id = self.rng.randrange(1, self.plan.users + 1)
+            created = self._moment(self.start, self.now)
+            ticket = self.rng.randrange(1, self.plan.tickets + 1)
+            yield (
+                notification_id, user_id, "Service request updated",
+                f"Ticket TKT-{created.year}-{ticket:07d} has a new update.",
+                1 if self.now - created > timedelta(days=7) or self.rng.random() < 0.3 else 0,
+                "admin" if user_id in self.admin_ids else "user", created,
+            )
+
+def _chunks(rows: Iterable[tuple], size: int) -> Iterator[List[tuple]]:
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def _copy(engine, table: Table, columns: Sequence[str], rows: Iterable[tuple]) -> int:
+    """Stream rows into table with COPY ... FROM STDIN, one transaction per table"""
+    sql = f"COPY {table.name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)"
+    written = 0
+    connection = engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        for chunk in _chunks(rows, CHUNK_ROWS):
+            buffer = io.StringIO()
+            # csv writes None as an unquoted empty field, which COPY reads as NULL
+            csv.writer(buffer).writerows(chunk)
+            buffer.seek(0)
+            cursor.copy_expert(sql, buffer)
+            written += len(chunk)
+        connection.commit()
+    finally:
+        connection.close()
+    return written
+
+def _insert(engine, table: Table, columns: Sequence[str], rows: Iterable[tuple]) -> int:
+    written = 0
+    with engine.begin() as connection:
+        for chunk in _chunks(rows, CHUNK_ROWS):
+            connection.execute(insert(table), [dict(zip(columns, row)) for row in chunk])
+            written += len(chunk)
+    return written
+
+def _existing_rows(engine) -> int:
+    with engine.connect() as connection:
+        return sum(connection.execute(select(func.count()).select_from(model.__table__)).scalar() for model in TABLES)
+
+def _truncate(engine):
+    names = [model.__tablename__ for model in TABLES] + ["client_summary_counts"]
+    with engine.begin() as connection:
+        if engine.dialect.name == "postgresql":
+            connection.execute(text(f"TRUNCATE {', '.join(names)} RESTART IDENTITY CASCADE"))
+        else:
+            for table in reversed(Base.metadata.sorted_tables):
+                if table.name in names:
+                    connection.execute(delete(table))
+
+def _finish(engine):
+    if engine.dialect.name != "postgresql":
+        return
+    with engine.begin() as connection:
+        # Ids were supplied explicitly, so move each sequence past them
+        for model in TABLES:
+            name = model.__tablename__
+            connection.execute(text(
+                f"SELECT setval(pg_get_serial_sequence('{name}', 'id'), COALESCE((SELECT max(id) FROM {name}), 0) + 1, false)"
+            ))
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        connection.execute(text(f"ANALYZE {', '.join(model.__tablename__ for model in TABLES)}"))
+
+async def _rebuild_summaries() -> int:
+    from app.database import SessionLocal
+    from app.services.client_summary_service import ClientSummaryService
+    db = SessionLocal()
+    try:
+        return await ClientSummaryService.rebuild(db)
+    finally:
+        db.close()
+
+def generate(plan: Plan, seed: int = 0, now: Optional[datetime] = None, password: str = "benchmark",
+             truncate: bool = False, verbose: bool = True) -> Dict[str, int]:
+    """Load a dataset into settings.DATABASE_URL; returns rows written per table"""
+    from app.services.passwords import hash_password
+
+    engine = get_engine()
+    if truncate:
+        _truncate(engine)
+    elif _existing_rows(engine):
+        raise SystemExit("The database already has data; pass --truncate to replace it")
+
+    # One hash for everyone: bcrypt per user would dominate the load time
+    generator = Generator(plan, seed, now or datetime.now(timezone.utc).replace(microsecond=0), asyncio.run(hash_password(password)))
+    load = _copy if engine.dialect.name == "postgresql" else _insert
+    written = {}
+    for model in TABLES:
+        name = model.__tablename__
+        started = time.perf_counter()
+        written[name] = load(engine, model.__table__, Generator.COLUMNS[name], getattr(generator, name)())
+        if verbose:
+            elapsed = time.perf_counter() - started
+            print(f"{name:<18} {written[name]:>11,} rows  {elapsed:7.1f} s  {written[name] / max(elapsed, 1e-9):>10,.0f} rows/s")
+    _finish(engine)
+    written["client_summary_counts"] = asyncio.run(_rebuild_summaries())
+    return written
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tickets", type=int, default=100_000, help="service requests to create (default 100000)")
+    parser.add_argument("--clients", type=int, help="default: tickets / 40")
+    parser.add_argument("--technicians", type=int, help="default: tickets / 5000")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--now", type=date.fromisoformat, help="date the history ends on (default today); fix it with --seed for identical data")
+    parser.add_argument("--password", default="benchmark")
+    parser.add_argument("--truncate", action="store_true", help="empty the tables first")
+    args = parser.parse_args()
+
+    plan = Plan(args.tickets, args.clients, args.technicians)
+    now = datetime.combine(args.now, datetime.min.time(), timezone.utc) if args.now else None
+    print(f"Generating {plan}")
+    written = generate(plan, args.seed, now, args.password, args.truncate)
+    print(f"client summary counters rebuilt: {written['client_summary_counts']} rows")
+
+if __name__ == "__main__":
+    main()
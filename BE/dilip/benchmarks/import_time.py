@@ -0,0 +1,100 @@
+"""Cold-start cost of the API: import time and app construction.
+
+Each measurement runs in a fresh interpreter, several times, and the median
+is kept (milliseconds):
+
+  import_app_main   `import app.main` (python -X importtime, cumulative)
+  create_app        create_app() with every router
+  create_app_lazy   create_app(lazy_routers=True)
+  import_fastapi    `import fastapi` (python -X importtime, cumulative), the reference
+
+Also lists the slowest imports behind a full create_app(). Absolute times
+depend on the machine, so the baseline (benchmarks/baselines/import_time.json)
+holds each measurement as a multiple of import_fastapi from the same run.
+Exits 1 when one of those regresses past the baseline; --update rewrites
+the baseline instead.
+
+    python benchmarks/import_time.py [--runs 5] [--threshold 0.25] [--update]
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import _baseline
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+REFERENCE = "import_fastapi"
+_IMPORT_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)$")
+
+_CREATE = """
+import time
+started = time.perf_counter()
+from app.main import create_app
+create_app({args})
+print((time.perf_counter() - started) * 1000)
+"""
+
+def _python(code: str, *flags: str) -> subprocess.CompletedProcess:
+    return subprocess.run([sys.executable, *flags, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+
+def _imports(stderr: str):
+    """(module, self ms, cumulative ms, depth) for each line of -X importtime output"""
+    for line in stderr.splitlines():
+        match = _IMPORT_LINE.match(line)
+        if match:
+            yield match.group(4), int(match.group(1)) / 1000, int(match.group(2)) / 1000, len(match.group(3)) // 2
+
+def _import_ms(module: str) -> float:
+    imports = _imports(_python(f"import {module}", "-X", "importtime").stderr)
+    return next(cumulative for name, _, cumulative, _ in imports if name == module)
+
+def measure(runs: int):
+    samples = {"import_app_main": [], "create_app": [], "create_app_lazy": [], REFERENCE: []}
+    for _ in range(runs):
+        samples[REFERENCE].append(_import_ms("fastapi"))
+        samples["import_app_main"].append(_import_ms("app.main"))
+        samples["create_app"].append(float(_python(_CREATE.format(args="")).stdout))
+        samples["create_app_lazy"].append(float(_python(_CREATE.format(args="lazy_routers=True")).stdout))
+    return {name: round(statistics.median(values), 1) for name, values in samples.items()}
+
+def normalised(results):
+    """Each measurement but the reference, as a multiple of the reference"""
+    return {name: round(value / results[REFERENCE], 3) for name, value in results.items() if name != REFERENCE}
+
+def slowest_imports(limit: int = 15):
+    stderr = _python("from app.main import create_app; create_app()", "-X", "importtime").stderr
+    top_level = [(module, cumulative) for module, _, cumulative, depth in _imports(stderr) if depth <= 1]
+    return sorted(top_level, key=lambda item: item[1], reverse=True)[:limit]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed relative slowdown (default 0.25)")
+    parser.add_argument("--min-delta-ms", type=float, default=20, help="ignore slowdowns smaller than this")
+    parser.add_argument("--update", action="store_true", help="store these results as the new baseline")
+    args = parser.parse_args()
+
+    results = measure(args.runs)
+    relative = normalised(results)
+    for name, value in results.items():
+        print(f"{name:<18} {value:8.1f} ms" + (f"  ({relative[name]:.2f}x {REFERENCE})" if name in relative else ""))
+    print("\nslowest imports behind create_app():")
+    for module, cumulative in slowest_imports():
+        print(f"  {cumulative:8.1f} ms  {module}")
+
+    if args.update:
+        _baseline.save("import_time", relative)
+        print(f"\nbaseline written to {_baseline.path('import_time')}")
+        return
+    failed = _baseline.regressions(relative, _baseline.load("import_time"), args.threshold, args.min_delta_ms / results[REFERENCE])
+    if failed:
+        print("\nimport time regressed:\n  " + "\n  ".join(failed))
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,336 @@
+"""End-to-end HTTP load test.
+
+Drives the API with concurrent clients for a fixed time and reports
+throughput and p50/p95/p99 latency per route. The traffic is a mix of
+list/detail reads across every router, ticket updates (assign, progress,
+resolve) and creates, 70/20/10 by default (--mix). Ids are sampled from
+the database first, so point it at a dataset from generate_data.py; the
+password of the admin it logs in as is that script's --password.
+
+By default the app runs in this process behind httpx's ASGI transport,
+which measures the application without a network stack. --uvicorn starts
+run.py (the pre-fork launcher, --workers API workers) on --port instead,
+and --url targets a server that is already running.
+
+Results are written to --output as JSON. The p50 and p95 of each route are
+compared against the baseline stored by --update (benchmarks/baselines/
+load_test.json, recorded on the machine and dataset the gate runs on), and
+the run exits 1 when any regresses past --threshold or when more than
+--max-error-rate of the requests fail.
+
+    python benchmarks/load_test.py --duration 60 --concurrency 32 [--uvicorn --workers 4]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import signal
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import httpx
+import _baseline
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+SAMPLE_SIZE = 1000
+
+# Throttling would measure the rate limiter rather than the app
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+sys.path.insert(0, ROOT)
+
+class Dataset:
+    """Ids to aim requests at, sampled from the database"""
+
+    def __init__(self):
+        from sqlalchemy import func, select
+        from app.database import get_engine
+        from app.models import AssetRequest, Client, CompanyAsset, Device, Notification, ServiceRequest, User
+
+        def sample(*columns, where=None):
+            query = select(*columns).order_by(func.random()).limit(SAMPLE_SIZE)
+            if where is not None:
+                query = query.where(where)
+            rows = connection.execute(query).all()
+            return [row if len(columns) > 1 else row[0] for row in rows]
+
+        with get_engine().connect() as connection:
+            self.admin_email = connection.execute(select(User.email).where(User.role == "admin").order_by(User.id).limit(1)).scalar()
+            self.technicians = sample(User.id, where=User.role == "technician")
+            self.users = sample(User.id)
+            # /clients serves the users with the client role
+            self.client_users = sample(User.id, where=User.role == "client")
+            self.clients = sample(Client.id)
+            self.devices = sample(Device.id, Device.serial_number)
+            self.tickets = sample(ServiceRequest.id, ServiceRequest.ticket_id, ServiceRequest.client_id)
+            self.assets = sample(CompanyAsset.id)
+            self.asset_requests = sample(AssetRequest.id)
+            self.notifications = sample(Notification.id)
+        if not (self.admin_email and self.technicians and self.clients and self.devices and self.tickets and self.assets and self.client_users):
+            raise SystemExit("The database has no usable dataset; load one with benchmarks/generate_data.py")
+
+# An operation turns (dataset, rng) into (method, url, json body)
+Operation = Callable[[Dataset, random.Random], Tuple[str, str, Optional[dict]]]
+
+# (weight, route label, operation) within each kind
+READS: List[Tuple[int, str, Operation]] = [
+    (10, "GET /service-requests/{id}", lambda d, r: ("GET", f"/service-requests/{r.choice(d.tickets)[0]}", None)),
+    (4, "GET /service-requests/{id}?include", lambda d, r: ("GET", f"/service-requests/{r.choice(d.tickets)[0]}?include=client,device,assigned_technician", None)),
+    (5, "GET /service-requests/ticket/{ticket_id}", lambda d, r: ("GET", f"/service-requests/ticket/{r.choice(d.tickets)[1]}", None)),
+    (6, "GET /service-requests/client/{id}", lambda d, r: ("GET", f"/service-requests/client/{r.choice(d.clients)}", None)),
+    (3, "GET /service-requests/technician/{id}", lambda d, r: ("GET", f"/service-requests/technician/{r.choice(d.technicians)}", None)),
+    (5, "GET /service-requests/open/tickets", lambda d, r: ("GET", "/service-requests/open/tickets", None)),
+    (3, "GET /service-requests/batch", lambda d, r: ("GET", f"/service-requests/batch?ids={','.join(str(t[0]) for t in r.sample(d.tickets, min(20, len(d.tickets))))}", None)),
+    (8, "GET /devices/{id}", lambda d, r: ("GET", f"/devices/{r.choice(d.devices)[0]}", None)),
+    (5, "GET /devices/client/{id}", lambda d, r: ("GET", f"/devices/client/{r.choice(d.clients)}", None)),
+    (3, "GET /devices/lookup", lambda d, r: ("GET", f"/devices/lookup?q={r.choice(d.devices)[1][:6]}", None)),
+    (2, "GET /devices/warranty-expiring", lambda d, r: ("GET", "/devices/warranty-expiring", None)),
+    (5, "GET /clients/{id}", lambda d, r: ("GET", f"/clients/{r.choice(d.client_users)}", None)),
+    (4, "GET /client-records/{id}/summary", lambda d, r: ("GET", f"/client-records/{r.choice(d.clients)}/summary", None)),
+    (4, "GET /users/{id}", lambda d, r: ("GET", f"/users/{r.choice(d.users)}", None)),
+    (2, "GET /users/role/technician", lambda d, r: ("GET", "/users/role/technician", None)),
+    (3, "GET /company-assets/{id}", lambda d, r: ("GET", f"/company-assets/{r.choice(d.assets)}", None)),
+    (3, "GET /company-assets/available", lambda d, r: ("GET", "/company-assets/available", None)),
+    (2, "GET /asset-requests/pending", lambda d, r: ("GET", "/asset-requests/pending", None)),
+    (2, "GET /asset-requests/user/{id}", lambda d, r: ("GET", f"/asset-requests/user/{r.choice(d.technicians)}", None)),
+    (4, "GET /notifications/?user_id", lambda d, r: ("GET", f"/notifications/?user_id={r.choice(d.users)}", None)),
+    (5, "GET /dashboard/stats", lambda d, r: ("GET", "/dashboard/stats", None)),
+    (1, "GET /dashboard/detailed-stats", lambda d, r: ("GET", "/dashboard/detailed-stats", None)),
+    (3, "GET /search", lambda d, r: ("GET", f"/search?q={r.choice(d.tickets)[1][-5:]}", None)),
+    (3, "GET /auth/me", lambda d, r: ("GET", "/auth/me", None)),
+    (1, "POST /batch", lambda d, r: ("POST", "/batch", {"operations": [
+        {"method": "GET", "path": f"/service-requests/{r.choice(d.tickets)[0]}"},
+        {"method": "GET", "path": "/devices/client/$0.client_id"},
+    ]})),
+]
+
+def _update_ticket(d: Dataset, r: random.Random):
+    ticket_id = r.choice(d.tickets)[0]
+    status = r.choice(("assigned", "in_progress", "resolved"))
+    body = {"status": status}
+    if status == "assigned":
+        body.update(assigned_to=r.choice(d.technicians), assigned_at=datetime.now(timezone.utc).isoformat())
+    elif status == "resolved":
+        body["resolution_notes"] = "Resolved during load test"
+    return "PUT", f"/service-requests/{ticket_id}", body
+
+UPDATES: List[Tuple[int, str, Operation]] = [
+    (1, "PUT /service-requests/{id}", _update_ticket),
+]
+
+_created = iter(range(1, sys.maxsize))
+_run_tag = f"{os.getpid():x}{int(time.time()):x}"
+
+def _create_ticket(d: Dataset, r: random.Random):
+    _, _, client_id = r.choice(d.tickets)
+    return "POST", "/service-requests/", {
+        "ticket_id": f"LOAD-{_run_tag}-{next(_created)}",
+        "client_id": client_id,
+        "title": "Printer offline",
+        "description": "Created by the load test",
+        "status": "open",
+        "priority": r.choice(("low", "medium", "high", "urgent")),
+        "submitted_by": r.choice(d.users),
+    }
+
+CREATES: List[Tuple[int, str, Operation]] = [
+    (6, "POST /service-requests/", _create_ticket),
+    (3, "POST /notifications/", lambda d, r: ("POST", "/notifications/", {
+        "user_id": r.choice(d.users), "title": "Service request updated", "message": "Load test notification", "type": "user",
+    })),
+    (1, "POST /asset-requests/", lambda d, r: ("POST", "/asset-requests/", {
+        "requested_by": r.choice(d.technicians), "request_type": "assignment", "asset_type": "Laptop",
+        "reason": "Load test", "status": "pending",
+    })),
+]
+
+class Mix:
+    """Picks operations: first the kind by --mix, then a route by its weight"""
+
+    def __init__(self, read: float, update: float, create: float):
+        self.kinds = [(READS, read), (UPDATES, update), (CREATES, create)]
+
+    def pick(self, rng: random.Random) -> Tuple[str, Operation]:
+        operations = rng.choices([ops for ops, _ in self.kinds], [share for _, share in self.kinds])[0]
+        _, label, operation = rng.choices(operations, [weight for weight, _, _ in operations])[0]
+        return label, operation
+
+async def _client_loop(client: httpx.AsyncClient, dataset: Dataset, mix: Mix, rng: random.Random,
+                       measure_from: float, until: float, samples: Dict[str, List[Tuple[float, int]]]):
+    while time.perf_counter() < until:
+        label, operation = mix.pick(rng)
+        method, url, body = operation(dataset, rng)
+        started = time.perf_counter()
+        try:
+            status = (await client.request(method, url, json=body)).status_code
+        except httpx.HTTPError:
+            status = 0
+        if started >= measure_from:
+            samples[label].append((time.perf_counter() - started, status))
+
+def _summarize(samples: Dict[str, List[Tuple[float, int]]], seconds: float) -> dict:
+    routes = {}
+    for label, results in sorted(samples.items()):
+        ok = sorted(latency * 1000 for latency, status in results if 200 <= status < 400)
+        route = {
+            "requests": len(results),
+            "errors": sum(1 for _, status in results if not (200 <= status < 400) and status != 503),
+            "shed": sum(1 for _, status in results if status == 503),
+            "throughput": round(len(results) / seconds, 1),
+        }
+        if len(ok) >= 2:
+            cuts = statistics.quantiles(ok, n=100, method="inclusive")
+            route.update(p50_ms=round(cuts[49], 2), p95_ms=round(cuts[94], 2), p99_ms=round(cuts[98], 2))
+        routes[label] = route
+    total = sum(route["requests"] for route in routes.values())
+    return {
+        "requests": total,
+        "throughput": round(total / seconds, 1),
+        "errors": sum(route["errors"] for route in routes.values()),
+        "shed": sum(route["shed"] for route in routes.values()),
+        "routes": routes,
+    }
+
+async def run(client: httpx.AsyncClient, dataset: Dataset, mix: Mix, concurrency: int, duration: float,
+              warmup: float, password: str, seed: int) -> dict:
+    login = await client.post("/auth/login", data={"username": dataset.admin_email, "password": password})
+    if login.status_code != 200:
+        raise SystemExit(f"Could not log in as {dataset.admin_email}: {login.status_code} {login.text}")
+    client.headers["Authorization"] = f"Bearer {login.json()['access_token']}"
+
+    samples: Dict[str, List[Tuple[float, int]]] = defaultdict(list)
+    measure_from = time.perf_counter() + warmup
+    until = measure_from + duration
+    await asyncio.gather(*(
+        _client_loop(client, dataset, mix, random.Random(seed * 1000 + i), measure_from, until, samples)
+        for i in range(concurrency)
+    ))
+    return _summarize(samples, duration)
+
+async def _in_process(args, dataset: Dataset, mix: Mix) -> dict:
+    from app.main import create_app
+
+    app = create_app()
+    async with app.router.lifespan_context(app):
+        # Unhandled errors count as 500s, as they would behind a server
+        transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=args.timeout) as client:
+            return await run(client, dataset, mix, args.concurrency, args.duration, args.warmup, args.password, args.seed)
+
+async def _against(url: str, args, dataset: Dataset, mix: Mix) -> dict:
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=url, timeout=args.timeout, limits=limits) as client:
+        return await run(client, dataset, mix, args.concurrency, args.duration, args.warmup, args.password, args.seed)
+
+def _start_server(args) -> subprocess.Popen:
+    env = dict(os.environ, WEB_HOST="127.0.0.1", WEB_PORT=str(args.port), WEB_WORKERS=str(args.workers), JOB_WORKER_PROCESSES="0")
+    server = subprocess.Popen([sys.executable, "run.py"], cwd=ROOT, env=env)
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise SystemExit(f"run.py exited with {server.returncode}")
+        try:
+            if httpx.get(f"http://127.0.0.1:{args.port}/", timeout=1).status_code == 200:
+                return server
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    _stop_server(server)
+    raise SystemExit("The server did not start within 60 s")
+
+def _stop_server(server: subprocess.Popen):
+    server.send_signal(signal.SIGTERM)
+    try:
+        server.wait(timeout=60)
+    except subprocess.TimeoutExpired:
+        server.kill()
+        server.wait()
+
+def _baseline_values(results: dict) -> Dict[str, float]:
+    values = {}
+    for label, route in results["routes"].items():
+        for metric in ("p50_ms", "p95_ms"):
+            if metric in route:
+                values[f"{label} {metric}"] = route[metric]
+    return values
+
+def _print(results: dict):
+    print(f"{'route':<44} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7} {'shed':>6}")
+    for label, route in results["routes"].items():
+        percentiles = "".join(f" {route[metric]:>8.1f}" if metric in route else f" {'-':>8}" for metric in ("p50_ms", "p95_ms", "p99_ms"))
+        print(f"{label:<44} {route['throughput']:>8.1f}{percentiles} {route['errors']:>7} {route['shed']:>6}")
+    print(f"\ntotal {results['throughput']:.1f} req/s, {results['requests']} requests, "
+          f"{results['errors']} errors, {results['shed']} shed (503)")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--uvicorn", action="store_true", help="serve the app with run.py instead of in-process")
+    target.add_argument("--url", help="load an already running server, e.g. http://127.0.0.1:8002")
+    parser.add_argument("--workers", type=int, default=1, help="API workers with --uvicorn (WEB_WORKERS)")
+    parser.add_argument("--port", type=int, default=8099, help="port for --uvicorn")
+    parser.add_argument("--duration", type=float, default=30, help="measured seconds (default 30)")
+    parser.add_argument("--warmup", type=float, default=5, help="seconds of load before measuring (default 5)")
+    parser.add_argument("--concurrency", type=int, default=32, help="clients with a request in flight")
+    parser.add_argument("--mix", default="70/20/10", help="read/update/create percentages (default 70/20/10)")
+    parser.add_argument("--timeout", type=float, default=30, help="per-request timeout in seconds")
+    parser.add_argument("--password", default="benchmark", help="password of the generated users")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="results file (default benchmarks/results/load_test-<time>.json)")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed relative slowdown per route (default 0.25)")
+    parser.add_argument("--min-delta-ms", type=float, default=5, help="ignore slowdowns smaller than this")
+    parser.add_argument("--max-error-rate", type=float, default=0.01, help="fail above this share of failed requests")
+    parser.add_argument("--update", action="store_true", help="store these results as the new baseline")
+    args = parser.parse_args()
+
+    mix = Mix(*(float(part) for part in args.mix.split("/")))
+    dataset = Dataset()
+    if args.url:
+        results = asyncio.run(_against(args.url, args, dataset, mix))
+    elif args.uvicorn:
+        server = _start_server(args)
+        try:
+            results = asyncio.run(_against(f"http://127.0.0.1:{args.port}", args, dataset, mix))
+        finally:
+            _stop_server(server)
+    else:
+        results = asyncio.run(_in_process(args, dataset, mix))
+
+    results = {
+        "started_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "target": args.url or (f"uvicorn x{args.workers}" if args.uvicorn else "in-process"),
+        "concurrency": args.concurrency,
+        "duration": args.duration,
+        "mix": args.mix,
+        **results,
+    }
+    _print(results)
+    output = args.output or os.path.join(RESULTS_DIR, f"load_test-{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+        f.write("\n")
+    print(f"results written to {output}")
+
+    if args.update:
+        _baseline.save("load_test", _baseline_values(results))
+        print(f"baseline written to {_baseline.path('load_test')}")
+        return
+    failed = _baseline.regressions(_baseline_values(results), _baseline.load("load_test"), args.threshold, args.min_delta_ms)
+    error_rate = results["errors"] / max(results["requests"], 1)
+    if error_rate > args.max_error_rate:
+        failed.append(f"error rate {error_rate:.1%} above {args.max_error_rate:.1%}")
+    if failed:
+        print("\nload test regressed:\n  " + "\n  ".join(failed))
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Login throughput at a fixed bcrypt cost.
+
+Runs concurrent password checks the way /auth/login does and reports
+logins per second and the worst event-loop stall seen meanwhile, once with
+verification on the hashing pool and once inline on the loop for
+comparison.
+
+    python benchmarks/login_throughput.py --rounds 10 --logins 64 --concurrency 16
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+def _parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=10, help="bcrypt cost factor (default 10)")
+    parser.add_argument("--logins", type=int, default=64, help="logins per run")
+    parser.add_argument("--concurrency", type=int, default=16, help="logins in flight at once")
+    parser.add_argument("--threads", type=int, default=4, help="hashing pool size (PASSWORD_HASH_THREADS)")
+    return parser.parse_args()
+
+async def _loop_lag(stop: asyncio.Event, tick: float = 0.005) -> float:
+    """Worst delay of a tick scheduled every `tick` seconds until stop is set"""
+    worst = 0.0
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(tick)
+        worst = max(worst, time.perf_counter() - started - tick)
+    return worst
+
+async def _run(label: str, verify, stored: str, logins: int, concurrency: int):
+    gate = asyncio.Semaphore(concurrency)
+
+    async def login():
+        async with gate:
+            matches, _ = await verify("correct horse", stored)
+            assert matches
+
+    stop = asyncio.Event()
+    lag = asyncio.create_task(_loop_lag(stop))
+    started = time.perf_counter()
+    await asyncio.gather(*(login() for _ in range(logins)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    print(f"{label:<8} {logins / elapsed:8.1f} logins/s   worst loop stall {await lag * 1000:8.1f} ms")
+
+async def main():
+    args = _parse_args()
+    # Settings are read at import, so fix the cost before the app is loaded
+    os.environ["PASSWORD_BCRYPT_ROUNDS"] = str(args.rounds)
+    os.environ["PASSWORD_HASH_THREADS"] = str(args.threads)
+    from app.services import passwords
+
+    stored = await passwords.hash_password("correct horse")
+
+    async def inline(password, stored_hash):
+        return passwords._verify(password, stored_hash)
+
+    print(f"bcrypt rounds={args.rounds} logins={args.logins} concurrency={args.concurrency} threads={args.threads}")
+    await _run("pool", passwords.verify_password, stored, args.logins, args.concurrency)
+    await _run("inline", inline, stored, args.logins, args.concurrency)
+
+if __name__ == "__main__":
+    asyncio.run(main())
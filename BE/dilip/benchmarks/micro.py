@@ -0,0 +1,185 @@
+"""Micro-benchmarks for service and serialization hot paths.
+
+Each benchmark is timed on its own, per layer, so a slowdown seen end to
+end (benchmarks/load_test.py) can be traced to the query, the ORM, Pydantic
+or JWT handling:
+
+  devices.get_all            DeviceService.get_all (query + ORM loading)
+  tickets.get_open           ServiceRequestService.get_open_tickets
+  dashboard.detailed_stats   DashboardService.get_detailed_stats
+  validate.service_requests  List[ServiceRequest] from ORM rows (Pydantic)
+  validate.devices           List[Device] from ORM rows
+  dump.service_requests      the same list serialized to JSON
+  jwt.encode                 UserService.create_access_token
+  jwt.decode                 token check as done by dependencies.current_user
+
+For each it reports ops/s, time per op and, from a separate tracemalloc
+run, the peak memory traced during one op and the memory still held by its
+result, with the packages that allocated most of it.
+
+With --sizes the database at DATABASE_URL is REPLACED by a generated
+dataset of each size in turn (tickets, see generate_data.py); without it
+the benchmarks run once on the data already there.
+
+    python benchmarks/micro.py --sizes 1000,10000,100000 [--only jwt] [--update]
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+import tracemalloc
+from collections import Counter
+from typing import Callable, Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import _baseline
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from pydantic import TypeAdapter
+from app import schemas
+from app.config import settings
+from app.database import SessionLocal
+from app.services.dashboard_service import DashboardService
+from app.services.device_service import DeviceService
+from app.services.service_request_service import ServiceRequestService
+from app.services.user_service import UserService
+import jwt
+
+_service_requests = TypeAdapter(List[schemas.ServiceRequest])
+_devices = TypeAdapter(List[schemas.Device])
+# One loop for every call, so its setup is not timed with each op
+_loop = asyncio.new_event_loop()
+
+def _query(method: Callable) -> Callable[[], object]:
+    """One call of an async service method on a fresh session, as a request would make it"""
+    def run():
+        db = SessionLocal()
+        try:
+            return _loop.run_until_complete(method(db))
+        finally:
+            db.close()
+    return run
+
+def _fixtures() -> Dict[str, object]:
+    db = SessionLocal()
+    try:
+        tickets = _loop.run_until_complete(ServiceRequestService.get_all(db))
+        devices = _loop.run_until_complete(DeviceService.get_all(db))
+    finally:
+        db.close()
+    return {
+        "tickets": tickets,
+        "devices": devices,
+        "validated_tickets": _service_requests.validate_python(tickets, from_attributes=True),
+        "token": UserService.create_access_token({"sub": "1", "role": "admin"}),
+    }
+
+def benchmarks(fixtures: Dict[str, object]) -> Dict[str, Callable[[], object]]:
+    return {
+        "devices.get_all": _query(DeviceService.get_all),
+        "tickets.get_open": _query(ServiceRequestService.get_open_tickets),
+        "dashboard.detailed_stats": _query(DashboardService.get_detailed_stats),
+        "validate.service_requests": lambda: _service_requests.validate_python(fixtures["tickets"], from_attributes=True),
+        "validate.devices": lambda: _devices.validate_python(fixtures["devices"], from_attributes=True),
+        "dump.service_requests": lambda: _service_requests.dump_json(fixtures["validated_tickets"]),
+        "jwt.encode": lambda: UserService.create_access_token({"sub": "1", "role": "admin"}),
+        "jwt.decode": lambda: jwt.decode(fixtures["token"], settings.SECRET_KEY, algorithms=[settings.ALGORITHM]),
+    }
+
+def _package(filename: str) -> str:
+    """Top-level package a traced frame belongs to, e.g. sqlalchemy, pydantic, app"""
+    parts = filename.replace("\\", "/").split("/")
+    if "site-packages" in parts:
+        return parts[parts.index("site-packages") + 1].split(".")[0]
+    if "app" in parts:
+        return "app"
+    return "stdlib" if "lib" in parts else os.path.basename(filename)
+
+def _timed(op: Callable[[], object], seconds: float) -> Dict[str, float]:
+    op()  # warm caches, compiled statements and the pool
+    runs = 0
+    started = time.perf_counter()
+    elapsed = 0.0
+    while runs < 3 or elapsed < seconds:
+        op()
+        runs += 1
+        elapsed = time.perf_counter() - started
+    return {"ops_per_s": round(runs / elapsed, 1), "us_per_op": round(elapsed / runs * 1e6, 1)}
+
+def _allocations(op: Callable[[], object]) -> Dict[str, object]:
+    tracemalloc.start(10)
+    try:
+        before = tracemalloc.take_snapshot()
+        tracemalloc.reset_peak()
+        result = op()
+        _, peak = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    by_package = Counter()
+    for stat in after.compare_to(before, "traceback"):
+        by_package[_package(stat.traceback[-1].filename)] += stat.size_diff
+    del result
+    return {
+        "peak_kib": round(peak / 1024, 1),
+        "retained_kib": round(sum(by_package.values()) / 1024, 1),
+        "retained_by_package_kib": {name: round(size / 1024, 1) for name, size in by_package.most_common(4) if size >= 1024},
+    }
+
+def run(size: Optional[int], seconds: float, only: List[str]) -> Dict[str, dict]:
+    fixtures = _fixtures()
+    label = f"@{size}" if size else ""
+    results = {}
+    for name, op in benchmarks(fixtures).items():
+        if only and not any(name.startswith(prefix) for prefix in only):
+            continue
+        result = {**_timed(op, seconds), **_allocations(op)}
+        results[f"{name}{label}"] = result
+        packages = ", ".join(f"{package} {kib:.0f}" for package, kib in result["retained_by_package_kib"].items())
+        print(f"{name + label:<34} {result['ops_per_s']:>10.1f} {result['us_per_op']:>12.1f} "
+              f"{result['peak_kib']:>10.1f} {result['retained_kib']:>10.1f}   {packages}")
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", help="comma-separated ticket counts; replaces the data in DATABASE_URL")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--seconds", type=float, default=2, help="minimum timed seconds per benchmark")
+    parser.add_argument("--only", default="", help="comma-separated name prefixes, e.g. jwt,validate")
+    parser.add_argument("--output", help="write the results as JSON")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed relative slowdown (default 0.25)")
+    parser.add_argument("--min-delta-us", type=float, default=5, help="ignore slowdowns smaller than this")
+    parser.add_argument("--update", action="store_true", help="store these results as the new baseline")
+    args = parser.parse_args()
+    only = [prefix for prefix in args.only.split(",") if prefix]
+
+    print(f"{'benchmark':<34} {'ops/s':>10} {'us/op':>12} {'peak KiB':>10} {'held KiB':>10}   held by")
+    results = {}
+    if args.sizes:
+        import generate_data
+        for size in (int(part) for part in args.sizes.split(",")):
+            generate_data.generate(generate_data.Plan(size), args.seed, truncate=True, verbose=False)
+            results.update(run(size, args.seconds, only))
+    else:
+        results.update(run(None, args.seconds, only))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+            f.write("\n")
+    timings = {f"{name} us_per_op": result["us_per_op"] for name, result in results.items()}
+    if args.update:
+        _baseline.save("micro", timings)
+        print(f"\nbaseline written to {_baseline.path('micro')}")
+        return
+    failed = _baseline.regressions(timings, _baseline.load("micro"), args.threshold, args.min_delta_us)
+    if failed:
+        print("\nmicro-benchmarks regressed:\n  " + "\n  ".join(failed))
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""Latency under overload, with and without admission control.
+
+Drives AdmissionMiddleware directly with open-loop (Poisson) arrivals at
+a multiple of what a simulated backend can serve. The backend stands in
+for a database pool of fixed size: each request waits for one of
+--pool connections (the wait is recorded the way the real pool records
+it) and holds it for --service-ms. A third of the traffic is low
+priority (listings), a third normal and a third writes.
+
+Reports admitted-request latency per time slice and the share shed at each
+priority. Without admission control latency keeps climbing as the queue
+grows; with it, latency levels off near the target while excess low
+priority traffic gets 503s.
+
+    python benchmarks/overload.py --overload 2 --seconds 10
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from app.database import pool_wait
+from starlette.routing import Route, Router
+from app.middleware.admission import LOW, AdmissionController, AdmissionMiddleware, admission_priority, priority
+
+_REQUESTS = [("GET", "/devices/"), ("GET", "/devices/7"), ("PUT", "/devices/7")]
+
+@admission_priority(LOW)
+async def _list_devices(request):
+    pass
+
+async def _device(request):
+    pass
+
+# Only read for each route's priority tag; the backend below serves every request
+_APP = SimpleNamespace(router=Router(routes=[
+    Route("/devices/", _list_devices, methods=["GET"]),
+    Route("/devices/{device_id}", _device, methods=["GET", "PUT"]),
+]))
+_PRIORITY_NAMES = {0: "low", 1: "normal", 2: "high"}
+
+def _backend(pool: asyncio.Semaphore, service_seconds: float):
+    async def app(scope, receive, send):
+        pool_wait.start()
+        started = time.perf_counter()
+        async with pool:
+            pool_wait.finish(time.perf_counter() - started)
+            await asyncio.sleep(random.expovariate(1 / service_seconds))
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+    return app
+
+async def _run(label: str, app, rate: float, seconds: float, slices: int):
+    results = []  # (started, latency, status, priority)
+
+    async def request(method: str, path: str):
+        status = None
+
+        async def send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+
+        scope = {"type": "http", "method": method, "path": path, "headers": [], "app": _APP}
+        started = time.perf_counter()
+        await app(scope, None, send)
+        results.append((started, time.perf_counter() - started, status, priority(scope)))
+
+    begin = time.perf_counter()
+    tasks = []
+    while time.perf_counter() - begin < seconds:
+        method, path = random.choice(_REQUESTS)
+        tasks.append(asyncio.create_task(request(method, path)))
+        await asyncio.sleep(random.expovariate(rate))
+    await asyncio.gather(*tasks)
+
+    print(f"\n{label}")
+    width = seconds / slices
+    for index in range(slices):
+        latencies = sorted(latency for started, latency, status, _ in results
+                           if status == 200 and index * width <= started - begin < (index + 1) * width)
+        if latencies:
+            p99 = latencies[int(len(latencies) * 0.99) - 1 if len(latencies) > 1 else 0]
+            print(f"  {index * width:5.1f}-{(index + 1) * width:4.1f}s  admitted {len(latencies):5d}  "
+                  f"p50 {statistics.median(latencies) * 1000:7.1f} ms  p99 {p99 * 1000:7.1f} ms")
+    for level, name in _PRIORITY_NAMES.items():
+        statuses = [status for _, _, status, request_priority in results if request_priority == level]
+        print(f"  {name:<6} shed {statuses.count(503) / max(1, len(statuses)):6.1%} of {len(statuses)}")
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pool", type=int, default=10, help="simulated connections")
+    parser.add_argument("--service-ms", type=float, default=20, help="mean time a request holds a connection")
+    parser.add_argument("--overload", type=float, default=2.0, help="offered load as a multiple of capacity")
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--slices", type=int, default=5)
+    parser.add_argument("--latency-target-ms", type=float, default=100)
+    args = parser.parse_args()
+
+    service_seconds = args.service_ms / 1000
+    rate = args.overload * args.pool / service_seconds
+    print(f"capacity {args.pool / service_seconds:.0f} req/s, offered {rate:.0f} req/s")
+
+    await _run("no admission control", _backend(asyncio.Semaphore(args.pool), service_seconds), rate, args.seconds, args.slices)
+    controller = AdmissionController(64, 4, 512, args.latency_target_ms / 1000, service_seconds)
+    guarded = AdmissionMiddleware(_backend(asyncio.Semaphore(args.pool), service_seconds), controller)
+    await _run("admission control (AIMD)", guarded, rate, args.seconds, args.slices)
+    print(f"  final concurrency limit {controller.limit:.1f}")
+
+if __name__ == "__main__":
+    asyncio.run(main())
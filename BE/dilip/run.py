@@ -1,5 +1,20 @@
-import uvicorn
+import multiprocessing
+from app import server, worker
+from app.config import settings
 from app.main import app
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="127.0.0.1", port=8002, reload=False) 
\ No newline at end of file
+    # Background job workers run next to the API and are stopped with it
+    workers = [
+        multiprocessing.Process(target=worker.main, name=f"job-worker-{i}", daemon=True)
+        for i in range(settings.JOB_WORKER_PROCESSES)
+    ]
+    for process in workers:
+        process.start()
+    try:
+        server.serve(app)
+    finally:
+        for process in workers:
+            process.terminate()
+        for process in workers:
+            process.join()
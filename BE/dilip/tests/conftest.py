@@ -0,0 +1,23 @@
+import pytest
+from sqlalchemy import BigInteger, create_engine
+from sqlalchemy.ext.compiler import compiles
+from app.database import Base, SessionLocal
+from app.models import Job, TaskRun
+
+@compiles(BigInteger, "sqlite")
+def _sqlite_bigint(type_, compiler, **kw):
+    # SQLite only autoincrements an INTEGER PRIMARY KEY
+    return "INTEGER"
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    Base.metadata.create_all(engine, tables=[Job.__table__, TaskRun.__table__])
+    yield engine
+    engine.dispose()
+
+@pytest.fixture
+def db(engine):
+    session = SessionLocal(bind=engine)
+    yield session
+    session.close()
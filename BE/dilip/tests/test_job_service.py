@@ -0,0 +1,92 @@
+import asyncio
+from datetime import timedelta
+from app.config import settings
+from app.models import Job
+from app.services.job_service import JobService, _now
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+def enqueue(db, name="test.job", **kwargs):
+    job = run(JobService.enqueue(db, name, **kwargs))
+    db.commit()
+    return job
+
+def test_claim_takes_due_jobs_by_priority(db):
+    low = enqueue(db, priority=0)
+    high = enqueue(db, priority=5)
+    enqueue(db, delay_seconds=3600)
+
+    claimed = run(JobService.claim(db, "default", queue_limit=10, wanted=10, worker_id="w1"))
+
+    assert [job.id for job in claimed] == [high.id, low.id]
+    assert all(job.status == "running" and job.attempts == 1 and job.locked_by == "w1" for job in claimed)
+    assert run(JobService.claim(db, "default", queue_limit=10, wanted=10, worker_id="w2")) == []
+
+def test_claim_respects_queue_limit_across_workers(db):
+    for _ in range(5):
+        enqueue(db)
+    enqueue(db, queue="exports")
+
+    first = run(JobService.claim(db, "default", queue_limit=3, wanted=2, worker_id="w1"))
+    second = run(JobService.claim(db, "default", queue_limit=3, wanted=2, worker_id="w2"))
+    third = run(JobService.claim(db, "default", queue_limit=3, wanted=2, worker_id="w3"))
+
+    assert (len(first), len(second), len(third)) == (2, 1, 0)
+    # Other queues have limits of their own
+    assert len(run(JobService.claim(db, "exports", queue_limit=1, wanted=1, worker_id="w3"))) == 1
+
+    run(JobService.complete(db, first[0]))
+    assert len(run(JobService.claim(db, "default", queue_limit=3, wanted=2, worker_id="w3"))) == 1
+
+def test_failed_job_is_retried_with_backoff_then_failed(db, monkeypatch):
+    monkeypatch.setattr(settings, "JOB_RETRY_BASE_SECONDS", 10)
+    monkeypatch.setattr(settings, "JOB_RETRY_MAX_SECONDS", 3600)
+    job = enqueue(db, max_attempts=2)
+
+    claimed, = run(JobService.claim(db, "default", queue_limit=1, wanted=1, worker_id="w1"))
+    before = _now()
+    run(JobService.fail(db, claimed, "boom"))
+    db.expire_all()
+    retried = db.get(Job, job.id)
+    assert retried.status == "queued" and retried.last_error == "boom" and retried.locked_by is None
+    # First retry waits between half and all of the base delay
+    delay = (retried.run_at.replace(tzinfo=before.tzinfo) - before).total_seconds()
+    assert 4 <= delay <= 11
+    assert run(JobService.claim(db, "default", queue_limit=1, wanted=1, worker_id="w1")) == []
+
+    db.query(Job).filter(Job.id == job.id).update({"run_at": _now() - timedelta(seconds=1)})
+    db.commit()
+    claimed, = run(JobService.claim(db, "default", queue_limit=1, wanted=1, worker_id="w1"))
+    assert claimed.attempts == 2
+    run(JobService.fail(db, claimed, "boom again"))
+    db.expire_all()
+    assert db.get(Job, job.id).status == "failed"
+
+def test_permanent_failure_is_not_retried(db):
+    job = enqueue(db)
+    claimed, = run(JobService.claim(db, "default", queue_limit=1, wanted=1, worker_id="w1"))
+    run(JobService.fail(db, claimed, "bad payload", retry=False))
+    db.expire_all()
+    assert db.get(Job, job.id).status == "failed"
+
+def test_stale_running_jobs_are_requeued(db):
+    job = enqueue(db)
+    run(JobService.claim(db, "default", queue_limit=1, wanted=1, worker_id="w1"))
+    db.query(Job).filter(Job.id == job.id).update(
+        {"locked_at": _now() - timedelta(seconds=settings.JOB_LOCK_TIMEOUT_SECONDS + 1)}
+    )
+    db.commit()
+
+    assert run(JobService.requeue_stale(db)) == 1
+    db.expire_all()
+    assert db.get(Job, job.id).status == "queued"
+
+def test_periodic_job_is_enqueued_once_per_interval(db):
+    first = run(JobService.enqueue_periodic(db, "test.sweep", 3600))
+    again = run(JobService.enqueue_periodic(db, "test.sweep", 3600))
+
+    assert first is not None and again is None
+    assert db.query(Job).filter(Job.name == "test.sweep").count() == 1
+    # Due again once the interval has passed
+    assert run(JobService.enqueue_periodic(db, "test.sweep", 0)) is not None